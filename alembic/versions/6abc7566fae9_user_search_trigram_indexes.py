@@ -0,0 +1,33 @@
+"""User search trigram indexes
+
+Revision ID: 6abc7566fae9
+Revises: c3767d7d7cbb
+Create Date: 2026-10-18 18:09:01.910079
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6abc7566fae9'
+down_revision: Union[str, None] = 'c3767d7d7cbb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TRIGRAM_COLUMNS = ['first_name', 'second_name', 'email', 'nickname']
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for column in TRIGRAM_COLUMNS:
+        op.create_index(f'ix_user_{column}_trgm', 'user', [column], unique=False,
+                        postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    for column in TRIGRAM_COLUMNS:
+        op.drop_index(f'ix_user_{column}_trgm', table_name='user', postgresql_using='gin')
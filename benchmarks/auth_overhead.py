@@ -0,0 +1,45 @@
+"""Per-request cost of the get_current_user dependency: claim-bearing tokens, and legacy
+tokens with and without the principal cache.
+
+Run against a scratch database migrated to head, from the repo root:
+
+    python -m benchmarks.auth_overhead
+"""
+import asyncio
+from jose import jwt
+from config import SECRET_KEY, ALGORITHM
+from db.async_db import AsyncSessionLocal
+from repository.user import principal_cache
+from services.auth import create_access_token, create_user_access_token, get_current_user
+from repository.user import get_user_by_id_db
+from benchmarks.common import create_schema, seed_user, measure, report
+
+
+async def main():
+    await create_schema()
+    async with AsyncSessionLocal() as db:
+        user_id = await seed_user(db, nickname='bench_auth')
+        claims_token = await create_user_access_token(db, await get_user_by_id_db(db, user_id))
+    access_token = create_access_token({"sub": str(user_id)})
+
+    async def decode_only():
+        jwt.decode(access_token, SECRET_KEY, algorithms=ALGORITHM)
+
+    async def authenticate(cached, token=access_token):
+        if not cached:
+            principal_cache.clear()
+        async with AsyncSessionLocal() as db:
+            await get_current_user(db, token)
+
+    rows = [
+        ("jwt decode only", await measure(decode_only, repeat=1000)),
+        ("get_current_user, cache miss", await measure(lambda: authenticate(False), repeat=1000)),
+        ("get_current_user, cache hit", await measure(lambda: authenticate(True), repeat=1000)),
+        ("get_current_user, claims", await measure(lambda: authenticate(False, claims_token), repeat=1000)),
+    ]
+    report("Authentication overhead per request", rows)
+    print(f"  principal cache: {principal_cache.stats()}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
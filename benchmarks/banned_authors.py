@@ -0,0 +1,49 @@
+"""Feed latency with the banned-author NOT IN subquery versus the author_banned flag.
+
+Reuses the plan-check seed (20,000 users, 1% banned, 200,000 posts). Run against a
+scratch database migrated to head, from the repo root:
+
+    python -m benchmarks.banned_authors
+"""
+import asyncio
+from sqlalchemy.future import select
+import models
+from db.async_db import AsyncSessionLocal
+from benchmarks.common import create_schema, measure, report
+from benchmarks.explain_plans import seed
+
+
+def feed_query(condition, topic_ids=None):
+    query = select(models.Post).where(condition)
+    if topic_ids:
+        query = query.where(models.Post.topic_id.in_(topic_ids))
+    return query.order_by(models.Post.created_at.desc(), models.Post.id.desc()).offset(500).limit(10)
+
+
+async def main():
+    await create_schema()
+    not_in_subquery = models.Post.user_id.not_in(
+        select(models.User.id)
+        .where(models.User.banned_is == True)
+    )
+    flag = models.Post.author_banned == False
+
+    async with AsyncSessionLocal() as db:
+        await seed(db)
+
+        async def run(query):
+            result = await db.execute(query)
+            return result.scalars().all()
+
+        rows = [
+            ("NOT IN subquery, feed", await measure(lambda: run(feed_query(not_in_subquery)))),
+            ("author_banned flag, feed", await measure(lambda: run(feed_query(flag)))),
+            ("NOT IN subquery, topics", await measure(lambda: run(feed_query(not_in_subquery, [3, 4])))),
+            ("author_banned flag, topics", await measure(lambda: run(feed_query(flag, [3, 4])))),
+        ]
+
+    report("GET /posts/ banned-author filter, 1% banned users", rows)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,101 @@
+"""Pick password hash parameters for a target verification latency on this host.
+
+Run on the production hardware (or an identical instance) and copy the printed
+settings into the environment:
+
+    python -m benchmarks.calibrate_password_hash --target-ms 250
+    python -m benchmarks.calibrate_password_hash --scheme argon2 --memory-kib 65536
+
+argon2 needs the argon2-cffi package. Logins already stored with weaker parameters are
+rehashed transparently the next time the user signs in.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from passlib.hash import bcrypt, argon2
+from passlib.exc import MissingBackendError
+
+
+PASSWORD = 'calibration-password'
+BCRYPT_MIN_ROUNDS = 10
+BCRYPT_MAX_ROUNDS = 18
+
+
+def verify_ms(handler, samples):
+    stored = handler.hash(PASSWORD)
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        handler.verify(PASSWORD, stored)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate_bcrypt(target_ms, samples):
+    chosen = None
+    for rounds in range(BCRYPT_MIN_ROUNDS, BCRYPT_MAX_ROUNDS + 1):
+        elapsed = verify_ms(bcrypt.using(rounds=rounds), samples)
+        print(f"  bcrypt rounds={rounds:<3} {elapsed:8.1f} ms")
+        if elapsed > target_ms:
+            break
+        chosen = rounds
+
+    if chosen is None:
+        print(f"bcrypt rounds={BCRYPT_MIN_ROUNDS} already exceeds {target_ms} ms; keeping the minimum.")
+        chosen = BCRYPT_MIN_ROUNDS
+    return {
+        'PASSWORD_HASH_SCHEME': 'bcrypt',
+        'PASSWORD_BCRYPT_ROUNDS': chosen,
+    }
+
+
+def calibrate_argon2(target_ms, samples, memory_kib, parallelism):
+    try:
+        argon2.get_backend()
+    except MissingBackendError:
+        sys.exit("argon2 calibration needs the argon2-cffi package")
+
+    chosen = None
+    for time_cost in range(1, 21):
+        handler = argon2.using(time_cost=time_cost, memory_cost=memory_kib, parallelism=parallelism)
+        elapsed = verify_ms(handler, samples)
+        print(f"  argon2 time_cost={time_cost:<3} {elapsed:8.1f} ms")
+        if elapsed > target_ms:
+            break
+        chosen = time_cost
+
+    if chosen is None:
+        sys.exit(f"argon2 with {memory_kib} KiB already exceeds {target_ms} ms; lower --memory-kib")
+    return {
+        'PASSWORD_HASH_SCHEME': 'argon2',
+        'PASSWORD_ARGON2_TIME_COST': chosen,
+        'PASSWORD_ARGON2_MEMORY_COST': memory_kib,
+        'PASSWORD_ARGON2_PARALLELISM': parallelism,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scheme', choices=['bcrypt', 'argon2'], default='bcrypt')
+    parser.add_argument('--target-ms', type=float, default=250,
+                        help="highest acceptable median verification time")
+    parser.add_argument('--samples', type=int, default=5)
+    parser.add_argument('--memory-kib', type=int, default=65536, help="argon2 memory cost")
+    parser.add_argument('--parallelism', type=int, default=min(os.cpu_count() or 1, 4), help="argon2 lanes")
+    args = parser.parse_args()
+
+    print(f"Calibrating {args.scheme} for a {args.target_ms:g} ms verification target")
+    if args.scheme == 'bcrypt':
+        settings = calibrate_bcrypt(args.target_ms, args.samples)
+    else:
+        settings = calibrate_argon2(args.target_ms, args.samples, args.memory_kib, args.parallelism)
+
+    print()
+    for name, value in settings.items():
+        print(f"{name}={value}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+import statistics
+import time
+from sqlalchemy import text
+from db.async_db import engine
+from db.sync_db import Base
+
+
+async def create_schema():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+
+async def seed_user(db, nickname='bench', banned=False):
+    result = await db.execute(text("""
+        INSERT INTO "user" (first_name, second_name, nickname, email, password_hash, banned_is)
+        VALUES ('Bench', 'User', :nickname, :email, 'x', :banned)
+        ON CONFLICT (nickname) DO UPDATE SET banned_is = EXCLUDED.banned_is
+        RETURNING id
+    """), {"nickname": nickname, "email": f'{nickname}@bench.local', "banned": banned})
+    user_id = result.scalar()
+    await db.commit()
+    return user_id
+
+
+async def measure(fn, repeat=20, warmup=3):
+    for _ in range(warmup):
+        await fn()
+
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - started) * 1000)
+
+    samples.sort()
+    return {
+        "p50_ms": round(statistics.median(samples), 3),
+        "p99_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.99))], 3),
+        "max_ms": round(samples[-1], 3),
+    }
+
+
+def report(title, rows):
+    print(title)
+    for name, stats in rows:
+        formatted = "  ".join(f"{key}={value}" for key, value in stats.items())
+        print(f"  {name:<32} {formatted}")
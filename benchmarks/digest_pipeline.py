@@ -0,0 +1,90 @@
+"""Digest job throughput and memory at increasing subscriber counts.
+
+Seeds followers of a pool of authors with posts inside the digest window, runs
+services.digest.run_digest and reports duration, users/s and the peak resident
+set size of the process. Peak memory should stay flat as the user count grows.
+Run against a scratch database migrated to head, from the repo root:
+
+    python -m benchmarks.digest_pipeline [users ...]
+"""
+import asyncio
+import resource
+import sys
+from sqlalchemy import text
+from db.async_db import AsyncSessionLocal
+from services.digest import run_digest
+from benchmarks.common import create_schema, report
+
+
+AUTHORS = 2_000
+POSTS_PER_AUTHOR = 3
+FOLLOWS_PER_USER = 5
+
+
+async def seed(db, users):
+    seeded = (await db.execute(text(
+        "SELECT count(*) FROM \"user\" WHERE nickname LIKE 'digest\\_reader\\_%'"
+    ))).scalar()
+    if seeded < AUTHORS:
+        await db.execute(text("""
+            INSERT INTO "user" (first_name, second_name, nickname, email, password_hash)
+            SELECT 'Author', 'Digest', 'digest_author_' || n, 'digest_author_' || n || '@bench.local', 'x'
+            FROM generate_series(1, CAST(:authors AS integer)) AS n
+            ON CONFLICT DO NOTHING
+        """), {"authors": AUTHORS})
+    if seeded < users:
+        await db.execute(text("""
+            INSERT INTO "user" (first_name, second_name, nickname, email, password_hash)
+            SELECT 'Reader', 'Digest', 'digest_reader_' || n, 'digest_reader_' || n || '@bench.local', 'x'
+            FROM generate_series(CAST(:seeded AS integer) + 1, CAST(:users AS integer)) AS n
+        """), {"seeded": seeded, "users": users})
+        await db.execute(text("""
+            INSERT INTO subscription (subscriber_id, subscribed_id)
+            SELECT r.id, a.id
+            FROM "user" r
+            CROSS JOIN generate_series(1, CAST(:follows AS integer)) AS f
+            JOIN "user" a ON a.nickname = 'digest_author_' || ((r.id * 7919 + f * 104729) % CAST(:authors AS integer) + 1)
+            WHERE r.nickname LIKE 'digest\\_reader\\_%'
+            ON CONFLICT DO NOTHING
+        """), {"follows": FOLLOWS_PER_USER, "authors": AUTHORS})
+    await db.execute(text("DELETE FROM post WHERE title LIKE 'Digest post %'"))
+    await db.execute(text("""
+        INSERT INTO post (title, content, user_id, created_at)
+        SELECT 'Digest post ' || a.id || '-' || n, 'body', a.id, now() - n * interval '10 minutes'
+        FROM "user" a CROSS JOIN generate_series(1, CAST(:posts AS integer)) AS n
+        WHERE a.nickname LIKE 'digest\\_author\\_%'
+    """), {"posts": POSTS_PER_AUTHOR})
+    await db.execute(text("DELETE FROM digest_run"))
+    await db.execute(text("DELETE FROM email_outbox"))
+    await db.commit()
+    for table in ('"user"', 'post', 'subscription'):
+        await db.execute(text(f"ANALYZE {table}"))
+
+
+async def main():
+    await create_schema()
+    sizes = [int(size) for size in sys.argv[1:]] or [20_000, 100_000]
+
+    rows = []
+    for users in sorted(sizes):
+        async with AsyncSessionLocal() as db:
+            await seed(db, users)
+
+        totals = await run_digest()
+
+        rows.append((f"{users} readers", {
+            "emails": totals.users,
+            "posts": totals.posts,
+            "seconds": round(totals.duration_seconds, 2),
+            "users_per_s": round(totals.users / totals.duration_seconds),
+            "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        }))
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(text("DELETE FROM email_outbox"))
+        await db.commit()
+    report("digest pipeline", rows)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
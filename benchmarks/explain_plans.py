@@ -0,0 +1,186 @@
+"""Query plans of the repository layer.
+
+Seeds a scratch database (SQLALCHEMY_DATABASE_URL, migrated to head), calls
+each repository read query, captures the SQL it sends and runs
+EXPLAIN (FORMAT JSON) on it. Prints the indexes each query uses and exits
+non-zero if any query plans a sequential scan over one of the large tables:
+
+    python -m benchmarks.explain_plans
+
+tests/test_query_plans.py runs the same cases under pytest and also checks
+which index each one uses.
+"""
+import asyncio
+import json
+import sys
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from sqlalchemy import event, text
+from db.async_db import engine, AsyncSessionLocal
+from repository.post import get_post_db, get_all_posts_db
+from repository.subscription import search_subscriptions_db, get_user_subscriptions_on_db
+from repository.auth import get_token_db
+from repository.user import get_all_users_db, search_users_db
+from repository.timeline import is_popular_author_db, get_pushed_timeline_db, get_pulled_timeline_db
+from benchmarks.common import create_schema
+
+
+USERS = 20_000
+POSTS = 200_000
+SMALL_TABLES = {'roles', 'topics', 'sex', 'country'}
+RESET_TOKEN = "0cc175b9c0f1b6a831c399e269772661"
+
+
+async def seed(db):
+    seeded = (await db.execute(text("SELECT count(*) FROM \"user\" WHERE nickname LIKE 'plan\\_%'"))).scalar()
+    if seeded:
+        return
+
+    await db.execute(text("""
+        INSERT INTO topics (title) SELECT 'Topic ' || n FROM generate_series(1, 50) AS n
+    """))
+    await db.execute(text("""
+        INSERT INTO "user" (first_name, second_name, nickname, email, password_hash, banned_is, created_at)
+        SELECT 'First' || n, 'Second' || n, 'plan_' || n, 'plan_' || n || '@plan.local', 'x',
+               n % 100 = 0, now() - n * interval '1 minute'
+        FROM generate_series(1, CAST(:users AS integer)) AS n
+    """), {"users": USERS})
+    await db.execute(text("""
+        INSERT INTO post (title, content, topic_id, user_id, created_at)
+        SELECT 'Plan post ' || n, md5(n::text), t.id, u.id, now() - n * interval '1 second'
+        FROM generate_series(1, CAST(:posts AS integer)) AS n
+        JOIN LATERAL (SELECT id FROM topics ORDER BY id OFFSET n % 50 LIMIT 1) t ON true
+        JOIN LATERAL (SELECT id FROM "user" WHERE nickname = 'plan_' || (n % CAST(:users AS integer) + 1)) u ON true
+    """), {"posts": POSTS, "users": USERS})
+    await db.execute(text("""
+        INSERT INTO subscription (subscriber_id, subscribed_id)
+        SELECT DISTINCT a.id, b.id
+        FROM generate_series(1, CAST(:users AS integer) * 5) AS n
+        JOIN "user" a ON a.nickname = 'plan_' || (n % CAST(:users AS integer) + 1)
+        JOIN "user" b ON b.nickname = 'plan_' || ((n * 7919) % CAST(:users AS integer) + 1)
+        WHERE a.id <> b.id
+        ON CONFLICT DO NOTHING
+    """), {"users": USERS})
+    await db.execute(text(
+        'UPDATE post SET author_banned = true FROM "user" WHERE post.user_id = "user".id AND "user".banned_is'
+    ))
+    await db.execute(text(
+        'UPDATE subscription SET subscriber_banned = u1.banned_is, subscribed_banned = u2.banned_is '
+        'FROM "user" u1, "user" u2 WHERE subscriber_id = u1.id AND subscribed_id = u2.id'
+    ))
+    await db.execute(text("""
+        INSERT INTO tokens (reset_token_digest, reset_token_expire, user_id)
+        SELECT sha256(convert_to(md5(n::text), 'UTF8')), now() - interval '1 day', NULL
+        FROM generate_series(1, 100000) AS n
+    """))
+    await db.execute(text("""
+        INSERT INTO timeline (user_id, post_id, created_at)
+        SELECT s.subscriber_id, p.id, p.created_at
+        FROM subscription s
+        JOIN LATERAL (SELECT id, created_at FROM post WHERE user_id = s.subscribed_id LIMIT 5) p ON true
+        ON CONFLICT DO NOTHING
+    """))
+    await db.commit()
+    for table in ('topics', '"user"', 'post', 'subscription', 'tokens', 'timeline'):
+        await db.execute(text(f"ANALYZE {table}"))
+
+
+def sequential_scans(plan):
+    found = []
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") not in SMALL_TABLES:
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found.extend(sequential_scans(child))
+    return found
+
+
+def index_names(plan):
+    found = {plan["Index Name"]} if "Index Name" in plan else set()
+    for child in plan.get("Plans", []):
+        found |= index_names(child)
+    return found
+
+
+async def explain_cases():
+    """Returns (case name, [plan]) for every case, one plan per statement the case sent."""
+    await create_schema()
+
+    async with AsyncSessionLocal() as db:
+        await seed(db)
+        user = (await db.execute(text(
+            "SELECT id FROM \"user\" WHERE nickname = 'plan_42'"
+        ))).scalar()
+        post = (await db.execute(text("SELECT id, created_at FROM post ORDER BY id DESC LIMIT 1"))).one()
+
+    current_user = SimpleNamespace(id=user, banned_is=False)
+    after = (post.created_at, post.id)
+    week_ago = (datetime.now() - timedelta(days=7)).isoformat()
+
+    cases = [
+        ("get_post_db", lambda db: get_post_db(db, post.id)),
+        ("get_all_posts_db", lambda db: get_all_posts_db(
+            db, None, None, None, None, None, 1, current_user, include_total=False)),
+        ("get_all_posts_db cursor", lambda db: get_all_posts_db(
+            db, None, None, None, None, None, 1, current_user, after, include_total=False)),
+        ("get_all_posts_db topics", lambda db: get_all_posts_db(
+            db, '3,4', None, None, None, None, 1, current_user)),
+        ("get_all_posts_db dates", lambda db: get_all_posts_db(
+            db, None, week_ago, None, None, None, 1, current_user, include_total=False)),
+        ("get_all_posts_db q", lambda db: get_all_posts_db(
+            db, None, None, None, None, None, 1, current_user, q='plan')),
+        ("search_subscriptions_db", lambda db: search_subscriptions_db(db, current_user)),
+        ("get_user_subscriptions_on_db", lambda db: get_user_subscriptions_on_db(db, current_user)),
+        ("get_token_db", lambda db: get_token_db(db, SimpleNamespace(token=RESET_TOKEN))),
+        ("get_all_users_db", lambda db: get_all_users_db(db, None, None, None, 'created_at', 'new', 3)),
+        ("search_users_db", lambda db: search_users_db(db, 'plan_42', 1)),
+        ("is_popular_author_db", lambda db: is_popular_author_db(db, user, 1000)),
+        ("get_pushed_timeline_db", lambda db: get_pushed_timeline_db(db, user, None, 10)),
+        ("get_pulled_timeline_db", lambda db: get_pulled_timeline_db(db, user, None, 10)),
+    ]
+
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+    statements = []
+    try:
+        for name, run in cases:
+            captured.clear()
+            async with AsyncSessionLocal() as db:
+                await run(db)
+            statements.append((name, list(captured)))
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+    explained = []
+    async with engine.connect() as conn:
+        for name, case_statements in statements:
+            plans = []
+            for statement, parameters in case_statements:
+                result = await conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters)
+                plan = result.scalar()
+                plan = json.loads(plan) if isinstance(plan, str) else plan
+                plans.append(plan[0]["Plan"])
+            explained.append((name, plans))
+    return explained
+
+
+async def main():
+    failures = []
+    for name, plans in await explain_cases():
+        scans = [scan for plan in plans for scan in sequential_scans(plan)]
+        indexes = sorted(set().union(*(index_names(plan) for plan in plans)))
+        status = "SEQ SCAN on " + ", ".join(scans) if scans else "ok"
+        print(f"{name:<32} {status:<24} {', '.join(indexes)}")
+        if scans:
+            failures.append(name)
+
+    if failures:
+        print(f"{len(failures)} queries regressed to sequential scans")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
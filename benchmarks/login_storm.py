@@ -0,0 +1,79 @@
+"""GET /posts/ latency while concurrent logins hammer bcrypt.
+
+Runs the app in-process (httpx ASGI transport), so every request shares one event loop,
+as it would on a single worker. Compares bcrypt inline on the loop (PASSWORD_HASH_WORKERS=0,
+the old behaviour) with the bounded hashing executor. Against a scratch database migrated
+to head, from the repo root:
+
+    python -m benchmarks.login_storm
+"""
+import asyncio
+import os
+import httpx
+from sqlalchemy import text
+from config import PWD_CONTEXT, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING
+from db.async_db import AsyncSessionLocal
+from main import app
+from repository.user import get_user_by_id_db
+from services import hashing
+from services.auth import create_user_access_token
+from benchmarks.common import create_schema, seed_user, measure, report
+
+
+LOGIN_CONCURRENCY = int(os.getenv('LOGIN_CONCURRENCY', 8))
+REQUESTS = int(os.getenv('REQUESTS', 50))
+PASSWORD = 'bench-password'
+
+
+async def login_storm(client, email, stop, statuses):
+    while not stop.is_set():
+        response = await client.post('/auth/login/', data={'username': email, 'password': PASSWORD})
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+
+async def run_phase(client, email, executor, concurrency=LOGIN_CONCURRENCY):
+    hashing.hashing_executor = executor
+    stop = asyncio.Event()
+    statuses = {}
+    storm = [asyncio.create_task(login_storm(client, email, stop, statuses)) for _ in range(concurrency)]
+
+    async def get_posts():
+        response = await client.get('/posts/')
+        response.raise_for_status()
+
+    try:
+        stats = await measure(get_posts, repeat=REQUESTS, warmup=3)
+    finally:
+        stop.set()
+        await asyncio.gather(*storm)
+    stats['logins'] = sum(statuses.values())
+    stats['rejected_503'] = statuses.get(503, 0)
+    return stats
+
+
+async def main():
+    await create_schema()
+    async with AsyncSessionLocal() as db:
+        user_id = await seed_user(db, nickname='bench_login')
+        await db.execute(text('UPDATE "user" SET password_hash = :hash WHERE id = :id'),
+                         {'hash': PWD_CONTEXT.hash(PASSWORD), 'id': user_id})
+        await db.commit()
+        user = await get_user_by_id_db(db, user_id)
+        access_token = await create_user_access_token(db, user)
+        email = user.email
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench',
+                                 cookies={'access_token': access_token}) as client:
+        rows = [
+            ("no logins", await run_phase(client, email, hashing.hashing_executor, concurrency=0)),
+            ("bcrypt inline on the loop", await run_phase(
+                client, email, hashing.HashingExecutor(0, LOGIN_CONCURRENCY))),
+            (f"executor, {PASSWORD_HASH_WORKERS} workers", await run_phase(
+                client, email, hashing.HashingExecutor(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING))),
+        ]
+    report(f"GET /posts/ during a login storm ({LOGIN_CONCURRENCY} concurrent logins)", rows)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,103 @@
+"""Cross-worker notification delivery over Postgres LISTEN/NOTIFY.
+
+Starts two uvicorn processes of this module's app, standing in for two
+workers behind one load balancer, and connects odd user ids to the first and
+even ones to the second. A single publish on the first worker must reach
+every client on both. Reports NOTIFY payload count, publish time and delivery
+latency. Needs SQLALCHEMY_DATABASE_URL; from the repo root:
+
+    python -m benchmarks.notification_bus [clients]
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from contextlib import asynccontextmanager
+import httpx
+from fastapi import FastAPI
+from db.async_db import AsyncSessionLocal
+from routers import notification
+from services.notification import notification_bus, Notification, NotificationType
+from benchmarks.websocket_fanout import free_port, raise_fd_limit, wait_for_server, open_clients, receive, percentile
+
+
+CLIENTS = 2_000
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    listener = asyncio.create_task(notification_bus.run())
+    yield
+    listener.cancel()
+
+
+app = FastAPI(lifespan=lifespan)
+app.include_router(notification.router)
+
+
+@app.post('/publish')
+async def publish(first: int, last: int):
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        frame = Notification(type=NotificationType.new_post, text="User with id 0 created new post!").to_json_str()
+        payloads = await notification_bus.publish(db, list(range(first, last + 1)), frame)
+        await db.commit()
+    return {'payloads': payloads, 'publish_ms': round((time.perf_counter() - started) * 1000, 3)}
+
+
+@app.get('/stats')
+async def stats():
+    return {**notification_bus.stats(), 'sockets': notification_bus.conn_manager.connections}
+
+
+def start_worker(port):
+    return subprocess.Popen(
+        [sys.executable, '-c', 'import resource, uvicorn; '
+         'resource.setrlimit(resource.RLIMIT_NOFILE, (resource.getrlimit(resource.RLIMIT_NOFILE)[1],) * 2); '
+         f'uvicorn.run("benchmarks.notification_bus:app", port={port}, log_level="warning", backlog=4096)'],
+        env={**os.environ, 'PYTHONPATH': os.getcwd()},
+    )
+
+
+async def main():
+    clients_count = int(sys.argv[1]) if len(sys.argv) > 1 else CLIENTS
+    raise_fd_limit()
+    ports = [free_port(), free_port()]
+    workers = [start_worker(port) for port in ports]
+    try:
+        https = [httpx.AsyncClient(base_url=f'http://127.0.0.1:{port}', timeout=120) for port in ports]
+        for http in https:
+            await wait_for_server(http)
+
+        clients = []
+        for index, port in enumerate(ports):
+            clients.append(await open_clients(port, range(index + 1, clients_count + 1, 2)))
+        await asyncio.sleep(0.5)
+
+        started = time.perf_counter()
+        receivers = [[asyncio.create_task(receive(client, 1, started, timeout=10)) for client in worker_clients]
+                     for worker_clients in clients]
+        result = (await https[0].post('/publish', params={'first': 1, 'last': clients_count})).json()
+        print(f"published to {clients_count} users from worker 1: payloads={result['payloads']}  "
+              f"publish_ms={result['publish_ms']}")
+        for index, worker_receivers in enumerate(receivers):
+            received = await asyncio.gather(*worker_receivers)
+            latencies = sorted(elapsed for count, elapsed in received if count)
+            stats = (await https[index].get('/stats')).json()
+            print(f"  worker {index + 1}: received={len(latencies)}/{len(received)}  "
+                  f"p50_ms={percentile(latencies, 0.5):.1f}  last_ms={latencies[-1]:.1f}  "
+                  f"listening_channels={stats['channels']}  notifications_received={stats['received']}")
+
+        for worker_clients in clients:
+            await asyncio.gather(*(client.close() for client in worker_clients), return_exceptions=True)
+        for http in https:
+            await http.aclose()
+    finally:
+        for worker in workers:
+            worker.terminate()
+            worker.wait()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,93 @@
+"""POST /posts/ latency against follower count, with and without the post-commit dispatcher.
+
+For authors with 0 to 100k followers, times create_post_with_notification (the
+post commits together with its notification_dispatch row) and the previous inline
+path (load every follower, publish, then insert the post). Also reports how long
+the dispatcher then takes to notify all followers of the queued posts, which is
+timed separately so it does not share the single event loop with the requests.
+Run against a scratch database migrated to head, from the repo root:
+
+    python -m benchmarks.post_dispatch
+"""
+import asyncio
+from types import SimpleNamespace
+from sqlalchemy import text
+from db.async_db import AsyncSessionLocal
+from repository.notification import next_notification_id_db
+from repository.post import create_post_db
+from repository.subscription import search_subscriptions_db
+from services.notification import notification_service, post_dispatcher, post_notification
+from services.post import create_post_with_notification
+from services.timeline import fan_out_post
+from benchmarks.common import create_schema, seed_user, measure, report
+
+
+FOLLOWERS = [0, 1_000, 10_000, 100_000]
+
+
+async def seed_followers(db, author_id, followers):
+    await db.execute(text("""
+        INSERT INTO "user" (first_name, second_name, nickname, email, password_hash)
+        SELECT 'Follower', 'Dispatch', 'dispatch_follower_' || n, 'dispatch_follower_' || n || '@bench.local', 'x'
+        FROM generate_series(1, CAST(:followers AS integer)) AS n
+        ON CONFLICT DO NOTHING
+    """), {"followers": followers})
+    await db.execute(text("""
+        INSERT INTO subscription (subscriber_id, subscribed_id)
+        SELECT id, CAST(:author AS integer) FROM "user"
+        WHERE nickname LIKE 'dispatch\\_follower\\_%'
+          AND CAST(substr(nickname, 19) AS integer) <= CAST(:followers AS integer)
+        ON CONFLICT DO NOTHING
+    """), {"author": author_id, "followers": followers})
+    await db.commit()
+    await db.execute(text("ANALYZE subscription"))
+
+
+async def inline_create_post(db, current_user):
+    subscriptions = await search_subscriptions_db(db, current_user)
+    notification = post_notification(await next_notification_id_db(db), current_user.id)
+    await notification_service.deliver(db, [sub.subscriber_id for sub in subscriptions], notification.id,
+                                       notification.to_json_str())
+    post = await create_post_db(db, 'Dispatch post', None, 'body', None, current_user)
+    await fan_out_post(db, post)
+    return post
+
+
+async def main():
+    await create_schema()
+
+    rows = []
+    for followers in FOLLOWERS:
+        async with AsyncSessionLocal() as db:
+            author_id = await seed_user(db, nickname=f'dispatch_author_{followers}')
+            await seed_followers(db, author_id, followers)
+        current_user = SimpleNamespace(id=author_id)
+
+        async def inline():
+            async with AsyncSessionLocal() as db:
+                await inline_create_post(db, current_user)
+
+        async def dispatched():
+            async with AsyncSessionLocal() as db:
+                await create_post_with_notification(db, 'Dispatch post', None, 'body', None, current_user)
+
+        before = await measure(inline, repeat=5, warmup=1)
+        after = await measure(dispatched, repeat=5, warmup=1)
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await post_dispatcher.drain()
+        rows.append((f"{followers} followers inline", before))
+        rows.append((f"{followers} followers dispatched", {
+            **after, "drain_ms": round((loop.time() - started) * 1000, 1),
+        }))
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(text("DELETE FROM post WHERE title = 'Dispatch post'"))
+        await db.commit()
+    report("create post latency", rows)
+    print(f"dispatcher: {post_dispatcher.stats()}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,63 @@
+"""Compare OFFSET paging against keyset (cursor) paging on GET /posts/.
+
+Run against a scratch database (SQLALCHEMY_DATABASE_URL), from the repo root:
+
+    python -m benchmarks.posts_pagination
+
+BENCH_POSTS controls how many posts are seeded (page 10,000 needs 100,000+).
+"""
+import asyncio
+import os
+from types import SimpleNamespace
+from sqlalchemy import text
+from db.async_db import AsyncSessionLocal
+from repository.post import get_all_posts_db
+from benchmarks.common import create_schema, seed_user, measure, report
+
+
+POSTS = int(os.getenv('BENCH_POSTS', 101_000))
+DEEP_PAGE = 10_000
+
+
+async def seed_posts(db, user_id):
+    existing = (await db.execute(text("SELECT count(*) FROM post"))).scalar()
+    if existing >= POSTS:
+        return
+    await db.execute(text("""
+        INSERT INTO post (title, content, user_id, created_at)
+        SELECT 'Post ' || n, repeat('lorem ipsum ', 20), :user_id, now() - n * interval '1 second'
+        FROM generate_series(CAST(:start AS integer), CAST(:stop AS integer)) AS n
+    """), {"user_id": user_id, "start": existing + 1, "stop": POSTS})
+    await db.commit()
+    await db.execute(text("ANALYZE post"))
+
+
+async def main():
+    await create_schema()
+    async with AsyncSessionLocal() as db:
+        user_id = await seed_user(db)
+        await seed_posts(db, user_id)
+        current_user = SimpleNamespace(id=user_id)
+
+        deep = await db.execute(text(
+            "SELECT created_at, id FROM post ORDER BY created_at DESC, id DESC OFFSET :offset LIMIT 1"
+        ), {"offset": (DEEP_PAGE - 1) * 10 - 1})
+        deep_after = tuple(deep.one())
+
+        async def offset_page(page):
+            return await get_all_posts_db(db, None, None, None, None, None, page, current_user)
+
+        async def cursor_page(after):
+            return await get_all_posts_db(db, None, None, None, None, None, 1, current_user, after)
+
+        rows = [
+            ("offset page 1", await measure(lambda: offset_page(1))),
+            (f"offset page {DEEP_PAGE}", await measure(lambda: offset_page(DEEP_PAGE))),
+            (f"cursor page {DEEP_PAGE}", await measure(lambda: cursor_page(deep_after))),
+        ]
+
+    report(f"GET /posts/ pagination, {POSTS} posts", rows)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
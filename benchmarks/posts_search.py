@@ -0,0 +1,61 @@
+"""Compare the ILIKE substring filter against full-text search (q=) on GET /posts/.
+
+Run against a scratch database (SQLALCHEMY_DATABASE_URL), from the repo root:
+
+    python -m benchmarks.posts_search
+
+Seeds BENCH_SEARCH_POSTS posts; one in every 1,000 mentions the searched word.
+"""
+import asyncio
+import os
+from types import SimpleNamespace
+from sqlalchemy import text
+from db.async_db import AsyncSessionLocal
+from repository.post import get_all_posts_db
+from benchmarks.common import create_schema, seed_user, measure, report
+
+
+POSTS = int(os.getenv('BENCH_SEARCH_POSTS', 200_000))
+WORD = 'zephyr'
+
+
+async def seed_posts(db, user_id):
+    existing = (await db.execute(text("SELECT count(*) FROM post WHERE user_id = :user_id"),
+                                 {"user_id": user_id})).scalar()
+    if existing >= POSTS:
+        return
+    await db.execute(text("""
+        INSERT INTO post (title, content, user_id, created_at)
+        SELECT 'Search post ' || n,
+               repeat(md5(n::text) || ' ', 50) || CASE WHEN n % 1000 = 0 THEN :word ELSE 'breeze' END,
+               :user_id, now() - n * interval '1 second'
+        FROM generate_series(CAST(:start AS integer), CAST(:stop AS integer)) AS n
+    """), {"user_id": user_id, "word": WORD, "start": existing + 1, "stop": POSTS})
+    await db.commit()
+    await db.execute(text("ANALYZE post"))
+
+
+async def main():
+    await create_schema()
+    async with AsyncSessionLocal() as db:
+        user_id = await seed_user(db, nickname='bench_search')
+        await seed_posts(db, user_id)
+        current_user = SimpleNamespace(id=user_id)
+
+        async def ilike_search():
+            return await get_all_posts_db(db, None, None, None, WORD, None, 1, current_user, include_total=False)
+
+        async def full_text_search():
+            return await get_all_posts_db(db, None, None, None, None, None, 1, current_user, include_total=False,
+                                          q=WORD)
+
+        rows = [
+            ("content= (ILIKE)", await measure(ilike_search, repeat=10)),
+            ("q= (tsvector + GIN)", await measure(full_text_search, repeat=10)),
+        ]
+
+    report(f"GET /posts/ search for '{WORD}', {POSTS} seeded posts", rows)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
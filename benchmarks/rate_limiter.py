@@ -0,0 +1,54 @@
+"""Per-request overhead of the in-process auth rate limiter.
+
+Pure CPU, no database needed:
+
+    python -m benchmarks.rate_limiter
+"""
+import asyncio
+import time
+from services.rate_limit import TokenBucketLimiter
+from benchmarks.common import report
+
+
+KEYS = 10_000
+CALLS = 1_000_000
+
+
+def per_call(elapsed):
+    return {"ns_per_call": round(elapsed / CALLS * 1e9), "calls": CALLS}
+
+
+def bench_take(limiter, keys):
+    now = time.monotonic()
+    started = time.perf_counter()
+    for i in range(CALLS):
+        limiter.take(keys[i % KEYS], now)
+    return per_call(time.perf_counter() - started)
+
+
+async def bench_hit(limiter, keys):
+    started = time.perf_counter()
+    for i in range(CALLS):
+        await limiter.hit(keys[i % KEYS])
+    return per_call(time.perf_counter() - started)
+
+
+async def main():
+    keys = [f'10.0.{i // 256}.{i % 256}' for i in range(KEYS)]
+    allowing = TokenBucketLimiter(per_minute=10 ** 9, burst=10 ** 9)
+    limiting = TokenBucketLimiter(per_minute=1, burst=1)
+
+    rows = [
+        ("take(), allowed", bench_take(allowing, keys)),
+        ("take(), limited", bench_take(limiting, keys)),
+        ("await hit(), allowed", await bench_hit(allowing, keys)),
+    ]
+
+    started = time.perf_counter()
+    swept = limiting.sweep(time.monotonic() + 3600)
+    rows.append(("sweep", {"keys": swept, "ms": round((time.perf_counter() - started) * 1000, 3)}))
+    report(f"Token bucket limiter, {KEYS} keys", rows)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,64 @@
+"""Reset-token lookup latency with 1M stale tokens, and the cost of purging them.
+
+Run against a scratch database migrated to head, from the repo root:
+
+    python -m benchmarks.reset_token_lookup
+"""
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from sqlalchemy import text
+from db.async_db import AsyncSessionLocal
+from repository.auth import reset_token_db, get_token_db
+from services.auth import purge_reset_tokens
+from benchmarks.common import create_schema, seed_user, measure, report
+
+
+STALE_TOKENS = 1_000_000
+
+
+async def seed_stale_tokens(db):
+    await db.execute(text("""
+        INSERT INTO tokens (reset_token_digest, reset_token_expire, user_id)
+        SELECT sha256(convert_to('stale-' || n || '-' || CAST(:run AS text), 'UTF8')),
+               now() - interval '1 day' - n * interval '1 second', NULL
+        FROM generate_series(1, CAST(:count AS integer)) AS n
+    """), {"count": STALE_TOKENS, "run": uuid.uuid4().hex})
+    await db.commit()
+    await db.execute(text("ANALYZE tokens"))
+
+
+async def main():
+    await create_schema()
+    async with AsyncSessionLocal() as db:
+        user_id = await seed_user(db, nickname='bench_reset')
+        await seed_stale_tokens(db)
+        live_token = uuid.uuid4().hex
+        await reset_token_db(db, live_token, datetime.utcnow() + timedelta(days=1), SimpleNamespace(id=user_id))
+
+        async def lookup(token):
+            await get_token_db(db, SimpleNamespace(token=token))
+
+        rows = [
+            ("lookup live, 1M stale rows", await measure(lambda: lookup(live_token), repeat=200)),
+            ("lookup unknown, 1M stale rows", await measure(lambda: lookup(uuid.uuid4().hex), repeat=200)),
+        ]
+
+    started = time.perf_counter()
+    purged = await purge_reset_tokens()
+    elapsed = time.perf_counter() - started
+    rows.append(("purge expired", {"rows": purged, "seconds": round(elapsed, 2),
+                                   "rows_per_s": round(purged / elapsed) if elapsed else None}))
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(text("ANALYZE tokens"))
+        rows.append(("lookup live, after purge", await measure(
+            lambda: get_token_db(db, SimpleNamespace(token=live_token)), repeat=200)))
+
+    report("Reset token lookup by SHA-256 digest", rows)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,174 @@
+"""WebSocket fan-out: one notification to 10k local clients, then a burst with stalled readers.
+
+Starts this module's app (the notification router plus a broadcast hook) under
+uvicorn in a subprocess, opens the clients from this process and reports how
+long the broadcast takes to enqueue and to reach every client. The burst phase
+mixes clients that never read with clients that do, and shows the live ones
+keep receiving while the stalled ones hit their queue bound. From the repo root:
+
+    python -m benchmarks.websocket_fanout [clients]
+"""
+import asyncio
+import os
+import resource
+import socket
+import subprocess
+import sys
+import time
+import httpx
+import websockets
+from fastapi import FastAPI
+from routers import notification
+from services.auth import create_access_token
+from services.notification import manager, Notification, NotificationType
+
+
+CLIENTS = 10_000
+LIVE = 20
+STALLED = 20
+BURST_MESSAGES = 200
+BURST_BYTES = 64 * 1024
+BURST_INTERVAL_MS = 5
+
+app = FastAPI()
+app.include_router(notification.router)
+
+
+@app.post('/broadcast')
+async def broadcast(count: int = 1, size: int = 0, interval_ms: float = 0, users: str = None):
+    user_ids = [int(user_id) for user_id in users.split(',')] if users else list(manager.active_connections)
+    text = Notification(type=NotificationType.new_post, text='x' * size).to_json_str()
+    enqueue = 0.0
+    for _ in range(count):
+        started = time.perf_counter()
+        manager.send_multiple(user_ids, text)
+        enqueue += time.perf_counter() - started
+        if interval_ms:
+            await asyncio.sleep(interval_ms / 1000)
+    return {'enqueue_ms': round(enqueue * 1000, 3), **manager.stats()}
+
+
+@app.get('/stats')
+async def stats():
+    return manager.stats()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def raise_fd_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+async def wait_for_server(http):
+    for _ in range(100):
+        try:
+            await http.get('/stats')
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError("benchmark server did not start")
+
+
+def stalled_socket(port):
+    sock = socket.socket()
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    sock.connect(('127.0.0.1', port))
+    sock.setblocking(False)
+    return sock
+
+
+def access_cookie(user_id):
+    token = create_access_token({"sub": str(user_id), "role_id": None, "role": None, "banned": False, "ver": 0})
+    return {'Cookie': f'access_token={token}'}
+
+
+def connect(port, user_id, stalled=False):
+    return websockets.connect(f'ws://127.0.0.1:{port}/notification/{user_id}', ping_interval=None, max_size=None,
+                              close_timeout=1, compression=None, max_queue=1 if stalled else 32,
+                              sock=stalled_socket(port) if stalled else None, extra_headers=access_cookie(user_id))
+
+
+async def open_clients(port, user_ids, stalled=False, batch=250):
+    clients = []
+    for first in range(0, len(user_ids), batch):
+        clients.extend(await asyncio.gather(*(
+            connect(port, user_id, stalled) for user_id in user_ids[first:first + batch]
+        )))
+    return clients
+
+
+def percentile(samples, fraction):
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+async def receive(client, count, started, timeout=30):
+    received = 0
+    try:
+        while received < count:
+            await asyncio.wait_for(client.recv(), timeout)
+            received += 1
+    except asyncio.TimeoutError:
+        pass
+    return received, (time.perf_counter() - started) * 1000
+
+
+async def main():
+    clients_count = int(sys.argv[1]) if len(sys.argv) > 1 else CLIENTS
+    raise_fd_limit()
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, '-c', 'import resource, sys, uvicorn; '
+         'resource.setrlimit(resource.RLIMIT_NOFILE, (resource.getrlimit(resource.RLIMIT_NOFILE)[1],) * 2); '
+         f'uvicorn.run("benchmarks.websocket_fanout:app", port={port}, log_level="warning", ws_ping_interval=None, '
+         'backlog=4096)'],
+        env={**os.environ, 'PYTHONPATH': os.getcwd()},
+    )
+    try:
+        async with httpx.AsyncClient(base_url=f'http://127.0.0.1:{port}', timeout=120) as http:
+            await wait_for_server(http)
+
+            started = time.perf_counter()
+            clients = await open_clients(port, range(1, clients_count + 1))
+            print(f"opened {len(clients)} clients in {time.perf_counter() - started:.1f}s")
+
+            started = time.perf_counter()
+            receivers = [asyncio.create_task(receive(client, 1, started)) for client in clients]
+            result = (await http.post('/broadcast')).json()
+            latencies = sorted(elapsed for _, elapsed in await asyncio.gather(*receivers))
+            print(f"one notification to {len(clients)} clients")
+            print(f"  enqueue_ms={result['enqueue_ms']}  delivered_p50_ms={percentile(latencies, 0.5):.1f}  "
+                  f"delivered_p99_ms={percentile(latencies, 0.99):.1f}  last_ms={latencies[-1]:.1f}")
+
+            stalled_ids = range(clients_count + 1, clients_count + STALLED + 1)
+            stalled = await open_clients(port, stalled_ids, stalled=True)
+            live = clients[:LIVE]
+            user_ids = ','.join(str(user_id) for user_id in [*range(1, LIVE + 1), *stalled_ids])
+            started = time.perf_counter()
+            receivers = [asyncio.create_task(receive(client, BURST_MESSAGES, started, timeout=5)) for client in live]
+            result = (await http.post('/broadcast', params={
+                'count': BURST_MESSAGES, 'size': BURST_BYTES, 'interval_ms': BURST_INTERVAL_MS, 'users': user_ids,
+            })).json()
+            received = await asyncio.gather(*receivers)
+            print(f"{BURST_MESSAGES} x {BURST_BYTES // 1024}KiB every {BURST_INTERVAL_MS}ms to {len(live)} live "
+                  f"and {len(stalled)} stalled clients")
+            print(f"  enqueue_ms={result['enqueue_ms']}  live_received={sum(count for count, _ in received)}/"
+                  f"{BURST_MESSAGES * len(live)}  max_queue_depth={result['max_queue_depth']}  "
+                  f"dropped_messages={result['dropped_messages']}  "
+                  f"slow_consumers_disconnected={result['slow_consumers_disconnected']}")
+
+            clients.extend(stalled)
+            for first in range(0, len(clients), 1000):
+                await asyncio.gather(*(client.close() for client in clients[first:first + 1000]),
+                                     return_exceptions=True)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
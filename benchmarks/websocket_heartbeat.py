@@ -0,0 +1,75 @@
+"""Idle eviction and connection caps with 50k simulated sockets.
+
+Registers in-memory sockets on a manager with the opt-in application heartbeat
+(WEBSOCKET_APP_HEARTBEAT) and short settings, keeps half of them answering
+pings and lets the other half go silent like dead TCP peers. Reports how long the single timer-wheel task spends per sweep, how
+quickly the silent half is evicted, and how sockets past the per-worker and
+per-user caps are rejected:
+
+    python -m benchmarks.websocket_heartbeat [sockets]
+"""
+import asyncio
+import sys
+import time
+from connection import ConnectionManager
+from benchmarks.common import report
+from benchmarks.websocket_registry import SimulatedSocket
+
+
+SOCKETS = 50_000
+PING_INTERVAL = 2
+IDLE_TIMEOUT = 6
+TICK = 0.25
+
+
+async def main():
+    sockets_count = int(sys.argv[1]) if len(sys.argv) > 1 else SOCKETS
+    capped = ConnectionManager(max_connections=2, max_connections_per_user=1)
+    caps = [await capped.connect(user_id, SimulatedSocket()) is not None for user_id in (1, 1, 2, 3)]
+
+    manager = ConnectionManager(max_connections=sockets_count, max_connections_per_user=2, app_heartbeat=True,
+                                ping_interval=PING_INTERVAL, idle_timeout=IDLE_TIMEOUT, tick=TICK)
+    connections = [await manager.connect(index // 2 + 1, SimulatedSocket()) for index in range(sockets_count)]
+    alive = connections[::2]
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    sweeps = []
+    evicted_at = None
+    while evicted_at is None and loop.time() - started < IDLE_TIMEOUT * 4:
+        await asyncio.sleep(TICK)
+        for connection in alive:
+            if connection.websocket.received:
+                connection.websocket.received = 0
+                manager.touch(connection)
+        sweep_started = time.perf_counter()
+        manager.sweep()
+        sweeps.append(time.perf_counter() - sweep_started)
+        if evicted_at is None and manager.evicted_connections == sockets_count - len(alive):
+            evicted_at = loop.time() - started
+
+    sweeps.sort()
+    report(f"{sockets_count} sockets, ping every {PING_INTERVAL}s, idle timeout {IDLE_TIMEOUT}s", [
+        ("timer wheel", {
+            "slots": len(manager.wheel),
+            "sweeps": len(sweeps),
+            "p50_sweep_ms": round(sweeps[len(sweeps) // 2] * 1000, 2),
+            "max_sweep_ms": round(sweeps[-1] * 1000, 2),
+        }),
+        ("silent half", {
+            "evicted": manager.evicted_connections,
+            "all_evicted_after_s": round(evicted_at, 2) if evicted_at is not None else None,
+        }),
+        ("answering half", {
+            "live": manager.connections,
+            "pings": manager.pings,
+        }),
+        ("caps 2/worker 1/user", {
+            "accepted": caps,
+            "rejected": capped.rejected_connections,
+        }),
+    ])
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
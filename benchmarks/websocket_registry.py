@@ -0,0 +1,90 @@
+"""Connection registry cost with 50k simulated sockets.
+
+Registers in-memory sockets (40k users, a quarter of them with a second
+device), reports the registry memory per idle connection, the cost of one
+encode-once broadcast to every socket and of tearing the registry down:
+
+    python -m benchmarks.websocket_registry [sockets]
+"""
+import asyncio
+import gc
+import sys
+import time
+import tracemalloc
+from connection import ConnectionManager
+from services.notification import Notification, NotificationType
+from benchmarks.common import report
+
+
+SOCKETS = 50_000
+
+
+class SimulatedSocket:
+    __slots__ = ('received',)
+
+    def __init__(self):
+        self.received = 0
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        self.received += 1
+
+    async def close(self, code=1000):
+        pass
+
+
+def traced_bytes():
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+async def main():
+    sockets_count = int(sys.argv[1]) if len(sys.argv) > 1 else SOCKETS
+    users_count = sockets_count * 4 // 5
+    sockets = [SimulatedSocket() for _ in range(sockets_count)]
+    manager = ConnectionManager(max_connections=sockets_count)
+
+    tracemalloc.start()
+    before = traced_bytes()
+    started = time.perf_counter()
+    connections = [await manager.connect(index % users_count + 1, socket) for index, socket in enumerate(sockets)]
+    connect_s = time.perf_counter() - started
+    registry_bytes = traced_bytes() - before
+    tracemalloc.stop()
+
+    frame = Notification(type=NotificationType.new_post, text="User with id 1 created new post!").to_json_str()
+    users = list(range(1, users_count + 1))
+    started = time.perf_counter()
+    enqueued = manager.send_multiple(users, frame)
+    enqueue_s = time.perf_counter() - started
+    while manager.sent < enqueued:
+        await asyncio.sleep(0)
+    delivered_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for connection in connections:
+        manager.disconnect(connection)
+    disconnect_s = time.perf_counter() - started
+
+    report(f"{sockets_count} sockets / {users_count} users", [
+        ("idle registry", {
+            "bytes_per_connection": round(registry_bytes / sockets_count),
+            "total_mb": round(registry_bytes / 2 ** 20, 1),
+            "connect_us": round(connect_s / sockets_count * 1e6, 2),
+        }),
+        ("broadcast", {
+            "frames": enqueued,
+            "enqueue_ms": round(enqueue_s * 1000, 1),
+            "delivered_ms": round(delivered_s * 1000, 1),
+        }),
+        ("teardown", {
+            "disconnect_us": round(disconnect_s / sockets_count * 1e6, 2),
+            "left": len(manager.active_connections),
+        }),
+    ])
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,351 @@
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    def __init__(self, ttl: float, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()
+
+    def get(self, key, default=None):
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return default
+
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value, ttl: float | None = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def pop_matching(self, predicate):
+        for key in [key for key in self._data if predicate(key)]:
+            del self._data[key]
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else None,
+            'entries': len(self._data),
+            'maxsize': self.maxsize,
+        }
+
+    def __len__(self):
+        return len(self._data)
+
+
+class LRUByteCache:
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: OrderedDict = OrderedDict()
+
+    async def get(self, key):
+        item = self._data.get(key)
+        if item is None or item[0] <= time.monotonic():
+            if item is not None:
+                self._discard(key)
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    async def set(self, key, value: bytes, ttl: float | None = None):
+        entry_size = len(key) + len(value)
+        if entry_size > self.max_bytes:
+            return
+
+        self._discard(key)
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self.size += entry_size
+        while self.size > self.max_bytes:
+            self._discard(next(iter(self._data)))
+            self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': 'lru',
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else None,
+            'evictions': self.evictions,
+            'entries': len(self._data),
+            'bytes': self.size,
+            'max_bytes': self.max_bytes,
+        }
+
+    def _discard(self, key):
+        item = self._data.pop(key, None)
+        if item is not None:
+            self.size -= len(key) + len(item[1])
+
+
+class RedisError(Exception):
+    pass
+
+
+class RedisClient:
+    """Speaks the Redis wire protocol (RESP2) over a small pool of connections.
+
+    Every command, including waiting for a free connection, is bounded by
+    timeout. A connection that fails or times out mid-reply is closed rather
+    than reused, since its next read would return the stale reply."""
+
+    connect_timeout = 1.0
+    timeout = 0.5
+    pool_size = 8
+
+    def __init__(self, url: str):
+        parsed = urlsplit(url)
+        self.host = parsed.hostname or 'localhost'
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.database = int(parsed.path.lstrip('/') or 0)
+        self.timeouts = 0
+        self._idle = []
+        self._slots = asyncio.Semaphore(self.pool_size)
+
+    async def execute(self, *args):
+        try:
+            return await asyncio.wait_for(self._execute(args), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+
+    async def _execute(self, args):
+        async with self._slots:
+            connection = self._idle.pop() if self._idle else await self._connect()
+            try:
+                reply = await self._roundtrip(connection, args)
+            except BaseException:
+                self._close(connection)
+                raise
+            self._idle.append(connection)
+            return reply
+
+    async def _connect(self):
+        connection = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.connect_timeout)
+        try:
+            if self.password:
+                await self._roundtrip(connection, ('AUTH', self.password))
+            if self.database:
+                await self._roundtrip(connection, ('SELECT', self.database))
+        except BaseException:
+            self._close(connection)
+            raise
+        return connection
+
+    @staticmethod
+    def _close(connection):
+        connection[1].close()
+
+    async def _roundtrip(self, connection, args):
+        reader, writer = connection
+        writer.write(self._encode(args))
+        await writer.drain()
+        return await self._read_reply(reader)
+
+    @staticmethod
+    def _encode(args):
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        return b''.join(parts)
+
+    async def _read_reply(self, reader):
+        line = await reader.readuntil(b'\r\n')
+        kind, payload = line[:1], line[1:-2]
+        if kind == b'+':
+            return payload
+        if kind == b'-':
+            raise RedisError(payload.decode())
+        if kind == b':':
+            return int(payload)
+        if kind == b'$':
+            length = int(payload)
+            if length < 0:
+                return None
+            data = await reader.readexactly(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            length = int(payload)
+            if length < 0:
+                return None
+            return [await self._read_reply(reader) for _ in range(length)]
+        raise RedisError(f"Unexpected reply {line!r}")
+
+
+class RedisCache:
+    def __init__(self, url: str, ttl: float, prefix: str = 'cache:'):
+        self.client = RedisClient(url)
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    async def get(self, key):
+        try:
+            value = await self.client.execute('GET', self.prefix + key)
+        except (OSError, asyncio.TimeoutError, RedisError):
+            logger.warning("Response cache read failed", exc_info=True)
+            self.errors += 1
+            value = None
+
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key, value: bytes, ttl: float | None = None):
+        ttl_ms = int((self.ttl if ttl is None else ttl) * 1000)
+        try:
+            await self.client.execute('SET', self.prefix + key, value, 'PX', ttl_ms)
+        except (OSError, asyncio.TimeoutError, RedisError):
+            logger.warning("Response cache write failed", exc_info=True)
+            self.errors += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': 'redis',
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else None,
+            'evictions': None,
+            'errors': self.errors,
+            'timeouts': self.client.timeouts,
+        }
+
+
+def create_response_cache(url: str | None, max_bytes: int, ttl: float):
+    if url:
+        return RedisCache(url, ttl)
+    return LRUByteCache(max_bytes, ttl)
+
+
+class _RevocationGeneration:
+    __slots__ = ('bits', 'revoked', 'expires_at')
+
+    def __init__(self, size: int):
+        self.bits = bytearray((size + 7) // 8)
+        self.revoked: dict = {}
+        self.expires_at = 0.0
+
+
+class RevocationFilter:
+    """Bloom filter in front of an exact set of revoked ids with their expiry times.
+
+    Ids live in two generations with their own bits: new ids go to the current
+    one, and prune() drops the previous generation once everything in it has
+    expired, so expired ids are shed in O(1) without rebuilding bits on the loop."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._current = _RevocationGeneration(self.size)
+        self._previous = None
+        self.filtered = 0
+        self.false_positives = 0
+        self.rotations = 0
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def _generations(self):
+        if self._previous is None:
+            return (self._current,)
+        return (self._current, self._previous)
+
+    def add(self, key, expires_at: float):
+        if any(key in generation.revoked for generation in self._generations()):
+            return
+        generation = self._current
+        generation.revoked[key] = expires_at
+        generation.expires_at = max(generation.expires_at, expires_at)
+        bits = generation.bits
+        for position in self._positions(key):
+            bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        positions = self._positions(key)
+        maybe = False
+        for generation in self._generations():
+            bits = generation.bits
+            if all(bits[position >> 3] & (1 << (position & 7)) for position in positions):
+                if key in generation.revoked:
+                    return True
+                maybe = True
+        if maybe:
+            self.false_positives += 1
+        else:
+            self.filtered += 1
+        return False
+
+    def prune(self, now: float):
+        if self._previous is not None and self._previous.expires_at > now:
+            return
+        if self._previous is None and not self._current.revoked:
+            return
+        self._previous = self._current
+        self._current = _RevocationGeneration(self.size)
+        self.rotations += 1
+
+    def stats(self):
+        return {
+            'revoked': len(self),
+            'generations': len(self._generations()),
+            'rotations': self.rotations,
+            'bloom_bits': self.size,
+            'bloom_hashes': self.hashes,
+            'filtered': self.filtered,
+            'false_positives': self.false_positives,
+        }
+
+    def __len__(self):
+        return sum(len(generation.revoked) for generation in self._generations())
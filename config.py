@@ -3,22 +3,104 @@ from fastapi_mail import ConnectionConfig
 from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer
 from dotenv import load_dotenv
-from services.notification import NotificationService
-from services.files import FileSerivce
-from connection import ConnectionManager
 
 
 load_dotenv()
 
 reset_link = f"https://127.0.0.1/auth/reset-password/confirm?token="
+timeline_link = "https://127.0.0.1/posts/timeline"
 SQLALCHEMY_DATABASE_URL = os.getenv('SQLALCHEMY_DATABASE_URL')
 ALGORITHM = 'HS256'
 SECRET_KEY = os.getenv('SECRET_KEY')
 REFRESH_SECRET_KEY = os.getenv('REFRESH_SECRET_KEY')
 ACCESS_TOKEN_EXPIRE_MINUTES = 25
 REFRESH_TOKEN_EXPIRE_DAYS = 15
-PWD_CONTEXT = CryptContext(schemes=['bcrypt'], deprecated='auto')
+PASSWORD_HASH_SCHEME = os.getenv('PASSWORD_HASH_SCHEME', 'bcrypt')
+PASSWORD_BCRYPT_ROUNDS = int(os.getenv('PASSWORD_BCRYPT_ROUNDS', 12))
+PASSWORD_ARGON2_TIME_COST = int(os.getenv('PASSWORD_ARGON2_TIME_COST', 3))
+PASSWORD_ARGON2_MEMORY_COST = int(os.getenv('PASSWORD_ARGON2_MEMORY_COST', 65536))
+PASSWORD_ARGON2_PARALLELISM = int(os.getenv('PASSWORD_ARGON2_PARALLELISM', 4))
+PASSWORD_HASH_OPTIONS = {
+    'bcrypt__rounds': PASSWORD_BCRYPT_ROUNDS,
+    'bcrypt__min_rounds': PASSWORD_BCRYPT_ROUNDS,
+    'bcrypt__max_rounds': PASSWORD_BCRYPT_ROUNDS,
+}
+if PASSWORD_HASH_SCHEME == 'argon2':
+    PASSWORD_HASH_OPTIONS.update({
+        'argon2__time_cost': PASSWORD_ARGON2_TIME_COST,
+        'argon2__min_rounds': PASSWORD_ARGON2_TIME_COST,
+        'argon2__max_rounds': PASSWORD_ARGON2_TIME_COST,
+        'argon2__memory_cost': PASSWORD_ARGON2_MEMORY_COST,
+        'argon2__parallelism': PASSWORD_ARGON2_PARALLELISM,
+    })
+PWD_CONTEXT = CryptContext(schemes=list(dict.fromkeys([PASSWORD_HASH_SCHEME, 'bcrypt'])), deprecated='auto',
+                           **PASSWORD_HASH_OPTIONS)
 OAuth2_SCHEME = OAuth2PasswordBearer(tokenUrl='auth/login')
+POSTS_COUNT_CACHE_TTL_SECONDS = int(os.getenv('POSTS_COUNT_CACHE_TTL_SECONDS', 30))
+POSTS_COUNT_CACHE_SIZE = int(os.getenv('POSTS_COUNT_CACHE_SIZE', 1024))
+TIMELINE_FANOUT_MAX_FOLLOWERS = int(os.getenv('TIMELINE_FANOUT_MAX_FOLLOWERS', 1000))
+TIMELINE_MAX_LENGTH = int(os.getenv('TIMELINE_MAX_LENGTH', 800))
+TIMELINE_TRIM_INTERVAL_SECONDS = int(os.getenv('TIMELINE_TRIM_INTERVAL_SECONDS', 300))
+TIMELINE_TRIM_USER_BATCH_SIZE = int(os.getenv('TIMELINE_TRIM_USER_BATCH_SIZE', 500))
+RESPONSE_CACHE_URL = os.getenv('RESPONSE_CACHE_URL')
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv('RESPONSE_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv('RESPONSE_CACHE_TTL_SECONDS', 60))
+PRINCIPAL_CACHE_TTL_SECONDS = int(os.getenv('PRINCIPAL_CACHE_TTL_SECONDS', 60))
+PRINCIPAL_CACHE_SIZE = int(os.getenv('PRINCIPAL_CACHE_SIZE', 10000))
+TOKEN_VERSIONS_REFRESH_SECONDS = int(os.getenv('TOKEN_VERSIONS_REFRESH_SECONDS', 5))
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', 64))
+REFRESH_REVOCATION_CAPACITY = int(os.getenv('REFRESH_REVOCATION_CAPACITY', 1_000_000))
+REFRESH_REVOCATION_ERROR_RATE = float(os.getenv('REFRESH_REVOCATION_ERROR_RATE', 0.001))
+REFRESH_REVOCATION_PRUNE_INTERVAL_SECONDS = int(os.getenv('REFRESH_REVOCATION_PRUNE_INTERVAL_SECONDS', 3600))
+REFRESH_REVOCATION_PURGE_BATCH_SIZE = int(os.getenv('REFRESH_REVOCATION_PURGE_BATCH_SIZE', 5000))
+REFRESH_REVOCATION_FLUSH_INTERVAL_SECONDS = float(os.getenv('REFRESH_REVOCATION_FLUSH_INTERVAL_SECONDS', 0.05))
+REFRESH_REVOCATION_FLUSH_BATCH_SIZE = int(os.getenv('REFRESH_REVOCATION_FLUSH_BATCH_SIZE', 1000))
+REFRESH_REVOCATION_FLUSH_MAX_ATTEMPTS = int(os.getenv('REFRESH_REVOCATION_FLUSH_MAX_ATTEMPTS', 5))
+RESET_TOKEN_PURGE_INTERVAL_SECONDS = int(os.getenv('RESET_TOKEN_PURGE_INTERVAL_SECONDS', 3600))
+RESET_TOKEN_PURGE_BATCH_SIZE = int(os.getenv('RESET_TOKEN_PURGE_BATCH_SIZE', 5000))
+RATE_LIMIT_URL = os.getenv('RATE_LIMIT_URL')
+RATE_LIMIT_SWEEP_INTERVAL_SECONDS = int(os.getenv('RATE_LIMIT_SWEEP_INTERVAL_SECONDS', 60))
+AUTH_RATE_LIMIT_IP_PER_MINUTE = int(os.getenv('AUTH_RATE_LIMIT_IP_PER_MINUTE', 30))
+AUTH_RATE_LIMIT_IP_BURST = int(os.getenv('AUTH_RATE_LIMIT_IP_BURST', 10))
+AUTH_RATE_LIMIT_ACCOUNT_PER_MINUTE = int(os.getenv('AUTH_RATE_LIMIT_ACCOUNT_PER_MINUTE', 5))
+AUTH_RATE_LIMIT_ACCOUNT_BURST = int(os.getenv('AUTH_RATE_LIMIT_ACCOUNT_BURST', 5))
+AUTH_RATE_LIMIT_ACCOUNT_TOTAL_PER_MINUTE = int(os.getenv('AUTH_RATE_LIMIT_ACCOUNT_TOTAL_PER_MINUTE', 300))
+AUTH_RATE_LIMIT_ACCOUNT_TOTAL_BURST = int(os.getenv('AUTH_RATE_LIMIT_ACCOUNT_TOTAL_BURST', 100))
+AUTH_MAX_CONCURRENCY = int(os.getenv('AUTH_MAX_CONCURRENCY', 32))
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv('EMAIL_OUTBOX_BATCH_SIZE', 50))
+EMAIL_OUTBOX_POLL_SECONDS = float(os.getenv('EMAIL_OUTBOX_POLL_SECONDS', 1))
+EMAIL_OUTBOX_LEASE_SECONDS = int(os.getenv('EMAIL_OUTBOX_LEASE_SECONDS', 300))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv('EMAIL_OUTBOX_MAX_ATTEMPTS', 8))
+EMAIL_OUTBOX_RETRY_BASE_SECONDS = int(os.getenv('EMAIL_OUTBOX_RETRY_BASE_SECONDS', 30))
+EMAIL_OUTBOX_RETRY_MAX_SECONDS = int(os.getenv('EMAIL_OUTBOX_RETRY_MAX_SECONDS', 3600))
+EMAIL_SMTP_TIMEOUT_SECONDS = float(os.getenv('EMAIL_SMTP_TIMEOUT_SECONDS', 30))
+EMAIL_SMTP_IDLE_SECONDS = float(os.getenv('EMAIL_SMTP_IDLE_SECONDS', 60))
+DIGEST_INTERVAL_SECONDS = int(os.getenv('DIGEST_INTERVAL_SECONDS', 86400))
+DIGEST_CHECK_SECONDS = int(os.getenv('DIGEST_CHECK_SECONDS', 300))
+DIGEST_FETCH_SIZE = int(os.getenv('DIGEST_FETCH_SIZE', 2000))
+DIGEST_CHUNK_SIZE = int(os.getenv('DIGEST_CHUNK_SIZE', 500))
+DIGEST_MAX_POSTS = int(os.getenv('DIGEST_MAX_POSTS', 10))
+WEBSOCKET_SEND_QUEUE_SIZE = int(os.getenv('WEBSOCKET_SEND_QUEUE_SIZE', 64))
+WEBSOCKET_SLOW_CONSUMER_POLICY = os.getenv('WEBSOCKET_SLOW_CONSUMER_POLICY', 'drop')
+WEBSOCKET_CLOSE_TIMEOUT_SECONDS = float(os.getenv('WEBSOCKET_CLOSE_TIMEOUT_SECONDS', 5))
+WEBSOCKET_APP_HEARTBEAT = os.getenv('WEBSOCKET_APP_HEARTBEAT', 'false').lower() == 'true'
+WEBSOCKET_PING_INTERVAL_SECONDS = float(os.getenv('WEBSOCKET_PING_INTERVAL_SECONDS', 20))
+WEBSOCKET_IDLE_TIMEOUT_SECONDS = float(os.getenv('WEBSOCKET_IDLE_TIMEOUT_SECONDS', 60))
+WEBSOCKET_HEARTBEAT_TICK_SECONDS = float(os.getenv('WEBSOCKET_HEARTBEAT_TICK_SECONDS', 1))
+WEBSOCKET_MAX_CONNECTIONS = int(os.getenv('WEBSOCKET_MAX_CONNECTIONS', 20000))
+WEBSOCKET_MAX_CONNECTIONS_PER_USER = int(os.getenv('WEBSOCKET_MAX_CONNECTIONS_PER_USER', 5))
+NOTIFICATION_SHARDS = int(os.getenv('NOTIFICATION_SHARDS', 256))
+NOTIFICATION_PAYLOAD_LIMIT = int(os.getenv('NOTIFICATION_PAYLOAD_LIMIT', 7900))
+NOTIFICATION_DISPATCH_WORKERS = int(os.getenv('NOTIFICATION_DISPATCH_WORKERS', 2))
+NOTIFICATION_DISPATCH_CHUNK_SIZE = int(os.getenv('NOTIFICATION_DISPATCH_CHUNK_SIZE', 5000))
+NOTIFICATION_DISPATCH_POLL_SECONDS = float(os.getenv('NOTIFICATION_DISPATCH_POLL_SECONDS', 1))
+NOTIFICATION_DISPATCH_LEASE_SECONDS = int(os.getenv('NOTIFICATION_DISPATCH_LEASE_SECONDS', 300))
+NOTIFICATION_REPLAY_PAGE_SIZE = int(os.getenv('NOTIFICATION_REPLAY_PAGE_SIZE', 500))
+NOTIFICATION_REPLAY_MAX_CONCURRENCY = int(os.getenv('NOTIFICATION_REPLAY_MAX_CONCURRENCY', 4))
+NOTIFICATION_RETENTION_DAYS = int(os.getenv('NOTIFICATION_RETENTION_DAYS', 30))
+NOTIFICATION_PRUNE_INTERVAL_SECONDS = int(os.getenv('NOTIFICATION_PRUNE_INTERVAL_SECONDS', 3600))
+NOTIFICATION_PRUNE_BATCH_SIZE = int(os.getenv('NOTIFICATION_PRUNE_BATCH_SIZE', 5000))
 
 
 class Envs:
@@ -28,6 +110,8 @@ class Envs:
     MAIL_PORT = int(os.getenv('MAIL_PORT'))
     MAIL_SERVER = os.getenv('MAIL_SERVER')
     MAIL_FROM_NAME = os.getenv('MAIL_FROM_NAME')
+    MAIL_STARTTLS = os.getenv('MAIL_STARTTLS', 'true').lower() == 'true'
+    MAIL_SSL_TLS = os.getenv('MAIL_SSL_TLS', 'false').lower() == 'true'
 
 
 conf = ConnectionConfig(
@@ -37,7 +121,7 @@ conf = ConnectionConfig(
     MAIL_PORT=Envs.MAIL_PORT,
     MAIL_SERVER=Envs.MAIL_SERVER,
     MAIL_FROM_NAME=Envs.MAIL_FROM_NAME,
-    MAIL_STARTTLS=True,
-    MAIL_SSL_TLS=False,
+    MAIL_STARTTLS=Envs.MAIL_STARTTLS,
+    MAIL_SSL_TLS=Envs.MAIL_SSL_TLS,
 )
 
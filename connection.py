@@ -1,34 +1,250 @@
-from typing import Dict
-from fastapi import WebSocket
+import asyncio
+import math
+from collections import deque
+from typing import Dict, Set
+from fastapi import WebSocket, status
+from config import (WEBSOCKET_SEND_QUEUE_SIZE, WEBSOCKET_SLOW_CONSUMER_POLICY, WEBSOCKET_CLOSE_TIMEOUT_SECONDS,
+                    WEBSOCKET_APP_HEARTBEAT, WEBSOCKET_PING_INTERVAL_SECONDS, WEBSOCKET_IDLE_TIMEOUT_SECONDS, WEBSOCKET_HEARTBEAT_TICK_SECONDS,
+                    WEBSOCKET_MAX_CONNECTIONS, WEBSOCKET_MAX_CONNECTIONS_PER_USER)
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+PING_FRAME = '{"type":"ping"}'
+
+
+class ClientConnection:
+    __slots__ = ('user_id', 'websocket', 'manager', 'queue', 'writer', 'closing', 'replaying', 'missed',
+                 'last_seen', 'slot')
+
+    def __init__(self, user_id: int, websocket: WebSocket, manager, replaying: bool = False):
+        self.user_id = user_id
+        self.websocket = websocket
+        self.manager = manager
+        self.queue = None
+        self.writer = None
+        self.closing = None
+        self.replaying = replaying
+        self.missed = False
+        self.last_seen = 0.0
+        self.slot = None
+
+    def depth(self):
+        return len(self.queue) if self.queue is not None else 0
+
+    def enqueue(self, frame: str):
+        if self.closing is not None:
+            return False
+        if self.queue is None:
+            self.queue = deque()
+        elif len(self.queue) >= self.manager.max_queue:
+            if self.replaying:
+                self.missed = True
+                return True
+            return False
+        self.queue.append(frame)
+        if self.writer is None and not self.replaying:
+            self.writer = asyncio.create_task(self._drain())
+        return True
+
+    def resume(self, keep):
+        self.replaying = False
+        if self.queue is not None:
+            self.queue = deque(frame for frame in self.queue if keep(frame))
+            if self.queue and self.writer is None and self.closing is None:
+                self.writer = asyncio.create_task(self._drain())
+
+    async def _drain(self):
+        try:
+            while self.queue:
+                await self.websocket.send_text(self.queue.popleft())
+                self.manager.sent += 1
+        except Exception:
+            logger.warning(
+                f"Something went wrong while sending message to a user (user_id={self.user_id})")
+            self.manager.drop(self, status.WS_1011_INTERNAL_ERROR)
+        finally:
+            self.writer = None
+            self.queue = None
+
+    def stop(self):
+        self.queue = None
+        if self.writer is not None and self.writer is not asyncio.current_task():
+            self.writer.cancel()
+
+    def abort(self, code: int):
+        if self.closing is not None:
+            return
+        self.stop()
+        self.closing = asyncio.create_task(self._close(code))
+
+    async def _close(self, code: int):
+        try:
+            await asyncio.wait_for(self.websocket.close(code), WEBSOCKET_CLOSE_TIMEOUT_SECONDS)
+        except Exception:
+            pass
+
 
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: Dict[int, WebSocket] = {}
+    """Registry of live notification sockets on this worker.
 
-    async def connect(self, user_id: int, websocket: WebSocket):
+    Dead peers are normally found by the server's WebSocket ping and by failed sends. With
+    app_heartbeat (WEBSOCKET_APP_HEARTBEAT) sockets are also sent PING_FRAME and evicted when
+    silent for idle_timeout. They are tracked on a hashed timer wheel swept by a single task:
+    each connection sits in the slot of its next deadline and activity only updates
+    last_seen, so a connection is looked at again only when its slot comes round."""
+
+    def __init__(self, max_queue: int = WEBSOCKET_SEND_QUEUE_SIZE,
+                 slow_consumer_policy: str = WEBSOCKET_SLOW_CONSUMER_POLICY,
+                 max_connections: int = WEBSOCKET_MAX_CONNECTIONS,
+                 max_connections_per_user: int = WEBSOCKET_MAX_CONNECTIONS_PER_USER,
+                 app_heartbeat: bool = WEBSOCKET_APP_HEARTBEAT,
+                 ping_interval: float = WEBSOCKET_PING_INTERVAL_SECONDS,
+                 idle_timeout: float = WEBSOCKET_IDLE_TIMEOUT_SECONDS,
+                 tick: float = WEBSOCKET_HEARTBEAT_TICK_SECONDS):
+        self.active_connections: Dict[int, Set[ClientConnection]] = {}
+        self.max_queue = max_queue
+        self.slow_consumer_policy = slow_consumer_policy
+        self.max_connections = max_connections
+        self.max_connections_per_user = max_connections_per_user
+        self.app_heartbeat = app_heartbeat
+        self.ping_interval = ping_interval
+        self.idle_timeout = idle_timeout
+        self.tick = tick
+        self.wheel = [set() for _ in range(math.ceil(max(ping_interval, idle_timeout) / tick) + 1)]
+        self.position = 0
+        self.connections = 0
+        self.enqueued = 0
+        self.sent = 0
+        self.dropped_messages = 0
+        self.slow_consumers_disconnected = 0
+        self.rejected_connections = 0
+        self.evicted_connections = 0
+        self.pings = 0
+
+    async def connect(self, user_id: int, websocket: WebSocket, replaying: bool = False):
         await websocket.accept()
-        self.active_connections[user_id] = websocket
+        code = self._rejection_code(user_id)
+        if code is not None:
+            self.rejected_connections += 1
+            logger.warning(f"Rejecting notification socket (user_id={user_id}, code={code})")
+            try:
+                await asyncio.wait_for(websocket.close(code), WEBSOCKET_CLOSE_TIMEOUT_SECONDS)
+            except Exception:
+                pass
+            return None
+        return self.register(user_id, websocket, replaying)
 
-    def disconnect(self, user_id: int):
-        if user_id in self.active_connections:
-            del self.active_connections[user_id]
+    def _rejection_code(self, user_id: int):
+        if self.connections >= self.max_connections:
+            return status.WS_1013_TRY_AGAIN_LATER
+        if len(self.active_connections.get(user_id, ())) >= self.max_connections_per_user:
+            return status.WS_1008_POLICY_VIOLATION
+        return None
 
-    async def send_multiple(self, users: list[int], text: str):
-        for user_id in users:
-            conn = self.active_connections.get(user_id)
+    def register(self, user_id: int, websocket: WebSocket, replaying: bool = False):
+        connection = ClientConnection(user_id, websocket, self, replaying)
+        self.active_connections.setdefault(user_id, set()).add(connection)
+        self.connections += 1
+        self.touch(connection)
+        if self.app_heartbeat:
+            self._schedule(connection, connection.last_seen + self.ping_interval)
+        return connection
 
-            if conn is None:
-                logger.warning(
-                    f"Connection for a user (user_id={user_id}) is not found.")
-                continue
+    def disconnect(self, connection: ClientConnection):
+        connections = self.active_connections.get(connection.user_id)
+        if connections is None or connection not in connections:
+            return
+        connections.discard(connection)
+        if not connections:
+            del self.active_connections[connection.user_id]
+        self.connections -= 1
+        if connection.slot is not None:
+            self.wheel[connection.slot].discard(connection)
+            connection.slot = None
+        connection.stop()
+
+    def touch(self, connection: ClientConnection):
+        connection.last_seen = asyncio.get_running_loop().time()
 
+    def _schedule(self, connection: ClientConnection, deadline: float):
+        now = asyncio.get_running_loop().time()
+        ticks = min(max(1, math.ceil((deadline - now) / self.tick)), len(self.wheel) - 1)
+        connection.slot = (self.position + ticks) % len(self.wheel)
+        self.wheel[connection.slot].add(connection)
+
+    def sweep(self):
+        self.position = (self.position + 1) % len(self.wheel)
+        due, self.wheel[self.position] = self.wheel[self.position], set()
+        now = asyncio.get_running_loop().time()
+        evicted = 0
+        for connection in due:
+            connection.slot = None
+            idle = now - connection.last_seen
+            if idle >= self.idle_timeout:
+                evicted += 1
+                self.drop(connection, status.WS_1001_GOING_AWAY)
+            elif idle >= self.ping_interval:
+                if connection.enqueue(PING_FRAME):
+                    self.pings += 1
+                self._schedule(connection, min(now + self.ping_interval, connection.last_seen + self.idle_timeout))
+            else:
+                self._schedule(connection, connection.last_seen + self.ping_interval)
+        if evicted:
+            self.evicted_connections += evicted
+            logger.info(f"Evicted {evicted} idle notification sockets")
+
+    async def run_heartbeat(self):
+        if not self.app_heartbeat:
+            return
+        while True:
+            await asyncio.sleep(self.tick)
             try:
-                await conn.send_text(text)
+                self.sweep()
             except Exception:
-                logger.warning(
-                    f"Something went wrong while sending message to a user (user_id={user_id})")
\ No newline at end of file
+                logger.exception("WebSocket heartbeat sweep failed")
+
+    def drop(self, connection: ClientConnection, code: int):
+        self.disconnect(connection)
+        connection.abort(code)
+
+    def send_multiple(self, users: list[int], frame: str):
+        delivered = 0
+        slow = []
+        for user_id in users:
+            connections = self.active_connections.get(user_id)
+            if connections is None:
+                continue
+
+            for conn in connections:
+                if conn.enqueue(frame):
+                    delivered += 1
+                else:
+                    slow.append(conn)
+
+        self.dropped_messages += len(slow)
+        if self.slow_consumer_policy == 'disconnect':
+            for conn in slow:
+                self.slow_consumers_disconnected += 1
+                logger.warning(f"Disconnecting slow consumer (user_id={conn.user_id})")
+                self.drop(conn, status.WS_1008_POLICY_VIOLATION)
+
+        self.enqueued += delivered
+        return delivered
+
+    def stats(self):
+        depths = [conn.depth() for connections in self.active_connections.values() for conn in connections]
+        return {
+            'connections': self.connections,
+            'users': len(self.active_connections),
+            'queued_messages': sum(depths),
+            'max_queue_depth': max(depths, default=0),
+            'enqueued': self.enqueued,
+            'sent': self.sent,
+            'dropped_messages': self.dropped_messages,
+            'slow_consumers_disconnected': self.slow_consumers_disconnected,
+            'rejected_connections': self.rejected_connections,
+            'evicted_connections': self.evicted_connections,
+            'pings': self.pings,
+        }
@@ -0,0 +1,78 @@
+import asyncio
+import logging
+import asyncpg
+from config import SQLALCHEMY_DATABASE_URL
+
+
+logger = logging.getLogger(__name__)
+
+RECONNECT_DELAY_SECONDS = 1
+PING_INTERVAL_SECONDS = 30
+
+
+class PgListener:
+    """Holds a dedicated connection LISTENing on channels and reconnects when it drops.
+
+    on_connect runs after every (re)connect so callers can reload anything they missed.
+    Channels can be added and removed at runtime with listen()/unlisten()."""
+
+    def __init__(self, channels, on_notify, on_connect=None, dsn=None):
+        self.channels = list(channels)
+        self.on_notify = on_notify
+        self.on_connect = on_connect
+        self.dsn = dsn or SQLALCHEMY_DATABASE_URL.replace('postgresql+asyncpg://', 'postgresql://', 1)
+        self.connection = None
+        self._channels_lock = asyncio.Lock()
+
+    async def listen(self, channel):
+        async with self._channels_lock:
+            if channel in self.channels:
+                return
+            self.channels.append(channel)
+            if self.connection is not None:
+                await self.connection.add_listener(channel, self._dispatch)
+
+    async def unlisten(self, channel):
+        async with self._channels_lock:
+            if channel not in self.channels:
+                return
+            self.channels.remove(channel)
+            if self.connection is not None:
+                await self.connection.remove_listener(channel, self._dispatch)
+
+    def _dispatch(self, connection, pid, channel, payload):
+        try:
+            self.on_notify(channel, payload)
+        except Exception:
+            logger.exception(f"Failed to handle notification on {channel}")
+
+    async def run(self):
+        while True:
+            try:
+                await self._listen()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception(f"Listener on {', '.join(self.channels)} failed, reconnecting")
+            finally:
+                if self.connection is not None:
+                    await self.connection.close(timeout=1)
+                    self.connection = None
+            await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+
+    async def _listen(self):
+        self.connection = await asyncpg.connect(self.dsn)
+        closed = asyncio.Event()
+        self.connection.add_termination_listener(lambda connection: closed.set())
+        async with self._channels_lock:
+            for channel in self.channels:
+                await self.connection.add_listener(channel, self._dispatch)
+        if self.on_connect is not None:
+            await self.on_connect()
+
+        while not closed.is_set():
+            try:
+                await asyncio.wait_for(closed.wait(), PING_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                async with self._channels_lock:
+                    await self.connection.execute('SELECT 1')
@@ -1,6 +1,15 @@
-from routers import posts, auth, users, admin, topic, subscription, token, notification
+from routers import posts, auth, users, admin, topic, subscription, token, notification, metrics
 from fastapi import FastAPI
 from fastapi.security import OAuth2PasswordBearer
+from contextlib import asynccontextmanager
+from services.timeline import trim_timelines_forever
+from services.auth import refresh_token_versions_forever, purge_reset_tokens_forever
+from services.revocation import revocation_listener, flush_revocations_forever, prune_revocations_forever
+from services.rate_limit import sweep_rate_limits_forever
+from services.outbox import outbox_worker
+from services.digest import run_digest_forever
+from services.notification import manager, notification_bus, post_dispatcher, notification_service
+import asyncio
 import logging
 
 logging.basicConfig(
@@ -15,7 +24,30 @@ logger = logging.getLogger(__name__)
 
 OAuth2_SCHEME = OAuth2PasswordBearer('auth/login/')
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    background_tasks = [
+        asyncio.create_task(trim_timelines_forever()),
+        asyncio.create_task(refresh_token_versions_forever()),
+        asyncio.create_task(revocation_listener.run()),
+        asyncio.create_task(flush_revocations_forever()),
+        asyncio.create_task(prune_revocations_forever()),
+        asyncio.create_task(purge_reset_tokens_forever()),
+        asyncio.create_task(sweep_rate_limits_forever()),
+        asyncio.create_task(outbox_worker.run()),
+        asyncio.create_task(run_digest_forever()),
+        asyncio.create_task(notification_bus.run()),
+        asyncio.create_task(post_dispatcher.run()),
+        asyncio.create_task(notification_service.prune_forever()),
+        asyncio.create_task(manager.run_heartbeat()),
+    ]
+    yield
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 app.include_router(posts.router)
@@ -26,6 +58,7 @@ app.include_router(topic.router)
 app.include_router(subscription.router)
 app.include_router(token.router)
 app.include_router(notification.router)
+app.include_router(metrics.router)
 
 
 @app.get('/')
@@ -1,6 +1,7 @@
 from db.sync_db import Base
-from sqlalchemy import (Column, Integer, String, Boolean,
-                        TIMESTAMP, text, ForeignKey)
+from sqlalchemy import (Column, Integer, BigInteger, SmallInteger, String, Boolean, LargeBinary,
+                        Float, TIMESTAMP, text, ForeignKey, Index, Computed, Sequence)
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import relationship
 
 
@@ -49,10 +50,26 @@ class Post(Base):
     file_path = Column(String)
     created_at = Column(TIMESTAMP(timezone=True), server_default=text('now()'))
     user_id = Column(Integer, ForeignKey('user.id'))
+    author_banned = Column(Boolean, nullable=False, default=False, server_default=text('false'))
+    fanned_out = Column(Boolean, nullable=False, default=False, server_default=text('false'))
+    search_vector = Column(TSVECTOR, Computed(
+        "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(content, '')), 'B')",
+        persisted=True
+    ))
 
     user = relationship('User', back_populates='post')
     topics = relationship('Topics', back_populates='post')
 
+    __table_args__ = (
+        Index('ix_post_visible_created_at', 'created_at', 'id', postgresql_where=text('NOT author_banned')),
+        Index('ix_post_topic_id_created_at', 'topic_id', 'created_at', 'id'),
+        Index('ix_post_user_id_created_at', 'user_id', 'created_at', 'id'),
+        Index('ix_post_pulled_user_id_created_at', 'user_id', 'created_at', 'id',
+              postgresql_where=text('NOT fanned_out')),
+        Index('ix_post_search_vector', 'search_vector', postgresql_using='gin'),
+    )
+
 
 class User(Base):
     __tablename__ = 'user'
@@ -65,6 +82,7 @@ class User(Base):
     password_hash = Column(String, nullable=False)
     role_id = Column(Integer, ForeignKey('roles.id'), default=1)
     banned_is = Column(Boolean, default=False)
+    token_version = Column(Integer, nullable=False, default=0, server_default=text('0'))
     created_at = Column(TIMESTAMP(timezone=True), server_default=text('now()'))
     sex_id = Column(Integer, ForeignKey('sex.id'))
     country_id = Column(Integer, ForeignKey('country.id'))
@@ -82,6 +100,20 @@ class User(Base):
     sex = relationship('Sex', back_populates='user')
     country = relationship('Country', back_populates='user')
 
+    __table_args__ = (
+        Index('ix_user_created_at', 'created_at'),
+        Index('ix_user_banned_id', 'id', postgresql_where=text('banned_is')),
+        Index('ix_user_token_version', 'id', 'token_version', postgresql_where=text('token_version > 0')),
+        Index('ix_user_first_name_trgm', 'first_name', postgresql_using='gin',
+              postgresql_ops={'first_name': 'gin_trgm_ops'}),
+        Index('ix_user_second_name_trgm', 'second_name', postgresql_using='gin',
+              postgresql_ops={'second_name': 'gin_trgm_ops'}),
+        Index('ix_user_email_trgm', 'email', postgresql_using='gin',
+              postgresql_ops={'email': 'gin_trgm_ops'}),
+        Index('ix_user_nickname_trgm', 'nickname', postgresql_using='gin',
+              postgresql_ops={'nickname': 'gin_trgm_ops'}),
+    )
+
 
 
 class Subscription(Base):
@@ -89,16 +121,121 @@ class Subscription(Base):
 
     subscriber_id = Column(Integer, ForeignKey('user.id'), primary_key=True)
     subscribed_id = Column(Integer, ForeignKey('user.id'), primary_key=True)
+    subscriber_banned = Column(Boolean, nullable=False, default=False, server_default=text('false'))
+    subscribed_banned = Column(Boolean, nullable=False, default=False, server_default=text('false'))
+
+    __table_args__ = (
+        Index('ix_subscription_subscribed_id', 'subscribed_id', 'subscriber_id'),
+    )
+
+
+class Timeline(Base):
+    __tablename__ = 'timeline'
+
+    user_id = Column(Integer, ForeignKey('user.id', ondelete='CASCADE'), primary_key=True)
+    post_id = Column(Integer, ForeignKey('post.id', ondelete='CASCADE'), primary_key=True)
+    created_at = Column(TIMESTAMP(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index('ix_timeline_user_id_created_at', 'user_id', 'created_at', 'post_id'),
+    )
 
 
 class Tokens(Base):
     __tablename__ = 'tokens'
 
     id = Column(Integer, nullable=False, primary_key=True, autoincrement=True)
-    reset_token = Column(String, nullable=False)
+    reset_token_digest = Column(LargeBinary(32), nullable=False)
     reset_token_expire = Column(TIMESTAMP, nullable=False)
     user_id = Column(Integer, ForeignKey('user.id'))
 
     user = relationship('User', back_populates='tokens')
 
+    __table_args__ = (
+        Index('ix_tokens_reset_token_digest', 'reset_token_digest', unique=True),
+        Index('ix_tokens_reset_token_expire', 'reset_token_expire'),
+    )
+
+
+class TableVersion(Base):
+    __tablename__ = 'table_version'
+
+    name = Column(String, primary_key=True, nullable=False)
+    version = Column(BigInteger, nullable=False, server_default=text('0'))
+
+
+class RevokedToken(Base):
+    __tablename__ = 'revoked_token'
+
+    jti = Column(String(32), primary_key=True, nullable=False)
+    user_id = Column(Integer, ForeignKey('user.id', ondelete='CASCADE'))
+    expires_at = Column(TIMESTAMP, nullable=False)
+
+    __table_args__ = (
+        Index('ix_revoked_token_expires_at', 'expires_at'),
+    )
+
+
+class EmailOutbox(Base):
+    __tablename__ = 'email_outbox'
+
+    id = Column(BigInteger, primary_key=True, nullable=False)
+    recipient = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    body = Column(String, nullable=False)
+    subtype = Column(String, nullable=False, server_default=text("'html'"))
+    priority = Column(SmallInteger, nullable=False, server_default=text('0'))
+    status = Column(String, nullable=False, server_default=text("'pending'"))
+    attempts = Column(Integer, nullable=False, server_default=text('0'))
+    next_attempt_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text('now()'))
+    last_error = Column(String)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=text('now()'))
+
+    __table_args__ = (
+        Index('ix_email_outbox_pending', 'priority', 'next_attempt_at', 'id', postgresql_where=text("status = 'pending'")),
+    )
+
+
+class DigestRun(Base):
+    __tablename__ = 'digest_run'
+
+    id = Column(Integer, primary_key=True, nullable=False)
+    window_start = Column(TIMESTAMP(timezone=True), nullable=False)
+    window_end = Column(TIMESTAMP(timezone=True), nullable=False)
+    last_user_id = Column(Integer, nullable=False, server_default=text('0'))
+    users = Column(Integer, nullable=False, server_default=text('0'))
+    posts = Column(Integer, nullable=False, server_default=text('0'))
+    started_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text('now()'))
+    finished_at = Column(TIMESTAMP(timezone=True))
+    duration_seconds = Column(Float)
+
+
+notification_id_seq = Sequence('notification_id_seq', metadata=Base.metadata)
+
+
+class Notification(Base):
+    __tablename__ = 'notification'
+
+    user_id = Column(Integer, ForeignKey('user.id', ondelete='CASCADE'), primary_key=True)
+    id = Column(BigInteger, primary_key=True, autoincrement=False)
+    payload = Column(String, nullable=False)
+    created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text('now()'))
+
+    __table_args__ = (
+        Index('ix_notification_created_at', 'created_at', postgresql_using='brin'),
+    )
+
+
+class NotificationDispatch(Base):
+    __tablename__ = 'notification_dispatch'
+
+    id = Column(BigInteger, primary_key=True, server_default=notification_id_seq.next_value())
+    author_id = Column(Integer, ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    last_subscriber_id = Column(Integer, nullable=False, server_default=text('0'))
+    attempts = Column(Integer, nullable=False, server_default=text('0'))
+    next_attempt_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text('now()'))
+    created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text('now()'))
 
+    __table_args__ = (
+        Index('ix_notification_dispatch_next_attempt_at', 'next_attempt_at', 'id'),
+    )
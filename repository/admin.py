@@ -1,6 +1,11 @@
+from repository.user import invalidate_principal, revoke_user_tokens
+
+
 async def change_role_db(db, user, role_id):
     user.role_id = role_id
+    revoke_user_tokens(user)
     db.add(user)
     await db.commit()
     await db.refresh(user)
+    invalidate_principal(user)
     return user
\ No newline at end of file
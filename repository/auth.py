@@ -1,6 +1,9 @@
+import hashlib
 import models
 from datetime import datetime
 from sqlalchemy.future import select
+from sqlalchemy import update, delete, text
+from repository.user import invalidate_principal, revoke_user_tokens
 
 
 async def register_db(db, user, hashed_password):
@@ -20,9 +23,13 @@ async def register_db(db, user, hashed_password):
     return db_user
 
 
+def reset_token_digest(reset_token):
+    return hashlib.sha256(reset_token.encode()).digest()
+
+
 async def reset_token_db(db, reset_token, expire, user):
     reset_token_obj = models.Tokens(
-        reset_token=reset_token,
+        reset_token_digest=reset_token_digest(reset_token),
         reset_token_expire=expire,
         user_id=user.id
     )
@@ -33,7 +40,7 @@ async def reset_token_db(db, reset_token, expire, user):
 
 async def get_token_db(db, request):
     token = await db.execute(
-        select(models.Tokens).where(models.Tokens.reset_token == request.token)
+        select(models.Tokens).where(models.Tokens.reset_token_digest == reset_token_digest(request.token))
     )
     token = token.scalar()
     return token
@@ -45,9 +52,88 @@ async def get_user_by_token_db(db, token):
 
 
 async def change_password_db(db, user, token):
+    revoke_user_tokens(user)
     db.add(user)
     await db.commit()
 
     await db.delete(token)
     await db.commit()
-    return user
\ No newline at end of file
+    await db.refresh(user)
+    invalidate_principal(user)
+    return user
+
+
+async def update_password_hash_db(db, user_id, old_hash, new_hash):
+    result = await db.execute(
+        update(models.User)
+        .where(models.User.id == user_id, models.User.password_hash == old_hash)
+        .values(password_hash=new_hash)
+    )
+    await db.commit()
+    return result.rowcount
+
+
+REVOKED_TOKENS_CHANNEL = 'revoked_refresh_tokens'
+
+
+async def revoke_refresh_tokens_db(db, revocations):
+    """Persist a batch of (jti, user_id, expires_at) revocations and NOTIFY the other workers.
+
+    Rows for users that no longer exist are stored with a NULL user_id instead of failing the
+    batch on the foreign key. Returns the jtis that were new; the rest had already been
+    revoked elsewhere."""
+    result = await db.execute(
+        text("""
+            INSERT INTO revoked_token (jti, user_id, expires_at)
+            SELECT t.jti, "user".id, t.expires_at
+            FROM unnest(CAST(:jtis AS text[]), CAST(:user_ids AS integer[]),
+                        CAST(:expires_at AS timestamp[])) AS t(jti, user_id, expires_at)
+            LEFT JOIN "user" ON "user".id = t.user_id
+            ON CONFLICT (jti) DO NOTHING
+            RETURNING jti
+        """),
+        {
+            'jtis': [jti for jti, _, _ in revocations],
+            'user_ids': [user_id for _, user_id, _ in revocations],
+            'expires_at': [datetime.utcfromtimestamp(expires_at) for _, _, expires_at in revocations],
+        }
+    )
+    inserted = set(result.scalars().all())
+    payloads = [f'{jti}:{expires_at}' for jti, _, expires_at in revocations if jti in inserted]
+    if payloads:
+        await db.execute(
+            text("SELECT pg_notify(:channel, payload) FROM unnest(CAST(:payloads AS text[])) AS payload"),
+            {'channel': REVOKED_TOKENS_CHANNEL, 'payloads': payloads}
+        )
+    await db.commit()
+    return inserted
+
+
+async def get_live_revocations_db(db):
+    result = await db.execute(
+        select(models.RevokedToken.jti, models.RevokedToken.expires_at)
+        .where(models.RevokedToken.expires_at > datetime.utcnow())
+    )
+    return result.all()
+
+
+async def purge_revocations_db(db, batch_size):
+    expired = (
+        select(models.RevokedToken.jti)
+        .where(models.RevokedToken.expires_at <= datetime.utcnow())
+        .limit(batch_size)
+    )
+    result = await db.execute(delete(models.RevokedToken).where(models.RevokedToken.jti.in_(expired)))
+    await db.commit()
+    return result.rowcount
+
+
+async def purge_reset_tokens_db(db, batch_size):
+    expired = (
+        select(models.Tokens.id)
+        .where(models.Tokens.reset_token_expire <= datetime.utcnow())
+        .limit(batch_size)
+    )
+    result = await db.execute(delete(models.Tokens).where(models.Tokens.id.in_(expired)))
+    await db.commit()
+    return result.rowcount
@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.future import select
+from sqlalchemy import func, insert, update
+from sqlalchemy.orm import aliased
+import models
+
+
+DIGEST_LOCK_KEY = 7_210_019
+
+
+async def lock_digest_db(db):
+    locked = await db.execute(select(func.pg_try_advisory_xact_lock(DIGEST_LOCK_KEY)))
+    return locked.scalar()
+
+
+async def start_digest_run_db(db, interval_seconds):
+    latest = await db.execute(
+        select(models.DigestRun.id, models.DigestRun.window_start, models.DigestRun.window_end,
+               models.DigestRun.last_user_id, models.DigestRun.finished_at)
+        .order_by(models.DigestRun.id.desc())
+        .limit(1)
+    )
+    latest = latest.first()
+    if latest is not None and latest.finished_at is None:
+        return latest
+
+    now = datetime.now(timezone.utc)
+    interval = timedelta(seconds=interval_seconds)
+    window_start = latest.window_end if latest is not None else now - interval
+    if now - window_start < interval:
+        return None
+
+    run = await db.execute(
+        insert(models.DigestRun)
+        .values(window_start=window_start, window_end=now)
+        .returning(models.DigestRun.id, models.DigestRun.window_start, models.DigestRun.window_end,
+                   models.DigestRun.last_user_id, models.DigestRun.finished_at)
+    )
+    run = run.one()
+    await db.commit()
+    return run
+
+
+async def stream_digest_rows_db(db, window_start, window_end, after_user_id, max_posts, fetch_size):
+    author = aliased(models.User)
+    recipient = aliased(models.User)
+    newest_first = (models.Post.created_at.desc(), models.Post.id.desc())
+    new_posts = (
+        select(
+            models.Subscription.subscriber_id.label('user_id'),
+            models.Post.id.label('post_id'),
+            models.Post.title,
+            models.Post.created_at,
+            author.nickname.label('author'),
+            func.row_number().over(partition_by=models.Subscription.subscriber_id, order_by=newest_first)
+            .label('position'),
+            func.count().over(partition_by=models.Subscription.subscriber_id).label('total'),
+        )
+        .join(models.Post, models.Post.user_id == models.Subscription.subscribed_id)
+        .join(author, author.id == models.Post.user_id)
+        .where(models.Subscription.subscriber_banned == False)
+        .where(models.Post.author_banned == False)
+        .where(models.Post.created_at > window_start)
+        .where(models.Post.created_at <= window_end)
+        .where(models.Subscription.subscriber_id > after_user_id)
+        .subquery()
+    )
+
+    return await db.stream(
+        select(new_posts, recipient.email, recipient.first_name)
+        .join(recipient, recipient.id == new_posts.c.user_id)
+        .where(new_posts.c.position <= max_posts)
+        .order_by(new_posts.c.user_id, new_posts.c.position)
+        .execution_options(yield_per=fetch_size)
+    )
+
+
+async def save_digest_chunk_db(db, run_id, emails, last_user_id, posts):
+    if emails:
+        await db.execute(insert(models.EmailOutbox), emails)
+    await db.execute(
+        update(models.DigestRun)
+        .where(models.DigestRun.id == run_id)
+        .values(last_user_id=last_user_id,
+                users=models.DigestRun.users + len(emails),
+                posts=models.DigestRun.posts + posts)
+    )
+    await db.commit()
+
+
+async def finish_digest_run_db(db, run_id, duration_seconds):
+    result = await db.execute(
+        update(models.DigestRun)
+        .where(models.DigestRun.id == run_id)
+        .values(finished_at=func.now(), duration_seconds=duration_seconds)
+        .returning(models.DigestRun.users, models.DigestRun.posts, models.DigestRun.duration_seconds)
+    )
+    totals = result.one()
+    await db.commit()
+    return totals
@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.future import select
+from sqlalchemy import text, update, delete, func, tuple_
+import models
+
+
+async def notify_many_db(db, channels, payloads):
+    if channels:
+        await db.execute(
+            text("SELECT pg_notify(channel, payload) "
+                 "FROM unnest(CAST(:channels AS text[]), CAST(:payloads AS text[])) AS t(channel, payload)"),
+            {"channels": channels, "payloads": payloads}
+        )
+
+
+async def next_notification_id_db(db):
+    notification_id = await db.execute(select(models.notification_id_seq.next_value()))
+    return notification_id.scalar()
+
+
+async def add_notifications_db(db, user_ids, notification_id, payload):
+    if user_ids:
+        await db.execute(
+            text("INSERT INTO notification (user_id, id, payload) "
+                 "SELECT user_id, :id, :payload FROM unnest(CAST(:user_ids AS integer[])) AS t(user_id) "
+                 "ON CONFLICT DO NOTHING"),
+            {"user_ids": user_ids, "id": notification_id, "payload": payload}
+        )
+
+
+def add_notification_dispatch_db(db, author_id):
+    dispatch = models.NotificationDispatch(author_id=author_id)
+    db.add(dispatch)
+    return dispatch
+
+
+async def claim_notification_dispatch_db(db, lease_seconds):
+    due = (
+        select(models.NotificationDispatch.id)
+        .where(models.NotificationDispatch.next_attempt_at <= func.now())
+        .order_by(models.NotificationDispatch.next_attempt_at, models.NotificationDispatch.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    result = await db.execute(
+        update(models.NotificationDispatch)
+        .where(models.NotificationDispatch.id.in_(due))
+        .values(attempts=models.NotificationDispatch.attempts + 1,
+                next_attempt_at=func.now() + timedelta(seconds=lease_seconds))
+        .returning(models.NotificationDispatch.id, models.NotificationDispatch.author_id,
+                   models.NotificationDispatch.last_subscriber_id, models.NotificationDispatch.attempts)
+        .execution_options(synchronize_session=False)
+    )
+    dispatch = result.first()
+    await db.commit()
+    return dispatch
+
+
+async def advance_notification_dispatch_db(db, dispatch_id, last_subscriber_id, lease_seconds):
+    await db.execute(
+        update(models.NotificationDispatch)
+        .where(models.NotificationDispatch.id == dispatch_id)
+        .values(last_subscriber_id=last_subscriber_id,
+                next_attempt_at=func.now() + timedelta(seconds=lease_seconds))
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def finish_notification_dispatch_db(db, dispatch_id):
+    await db.execute(delete(models.NotificationDispatch).where(models.NotificationDispatch.id == dispatch_id))
+    await db.commit()
+
+
+async def get_notifications_page_db(db, user_id, after, limit):
+    result = await db.execute(
+        select(models.Notification.id, models.Notification.payload)
+        .where(models.Notification.user_id == user_id)
+        .where(models.Notification.id > after)
+        .order_by(models.Notification.id)
+        .limit(limit)
+    )
+    return result.all()
+
+
+async def prune_notifications_db(db, retention_days, batch_size):
+    expired = (
+        select(models.Notification.user_id, models.Notification.id)
+        .where(models.Notification.created_at < datetime.now(timezone.utc) - timedelta(days=retention_days))
+        .limit(batch_size)
+    )
+    result = await db.execute(
+        delete(models.Notification)
+        .where(tuple_(models.Notification.user_id, models.Notification.id).in_(expired))
+    )
+    await db.commit()
+    return result.rowcount
@@ -0,0 +1,67 @@
+from datetime import timedelta
+from sqlalchemy.future import select
+from sqlalchemy import update, delete, func
+import models
+
+
+# Lower goes first: transactional mail such as password resets is claimed ahead of bulk mail
+# such as digests, so it never waits behind a whole digest run.
+TRANSACTIONAL_PRIORITY = 0
+BULK_PRIORITY = 1
+
+
+def add_outbox_email_db(db, recipient, subject, body, subtype='html', priority=TRANSACTIONAL_PRIORITY):
+    outbox_email = models.EmailOutbox(recipient=recipient, subject=subject, body=body, subtype=subtype,
+                                      priority=priority)
+    db.add(outbox_email)
+    return outbox_email
+
+
+async def claim_outbox_batch_db(db, batch_size, lease_seconds):
+    due = (
+        select(models.EmailOutbox.id)
+        .where(models.EmailOutbox.status == 'pending')
+        .where(models.EmailOutbox.next_attempt_at <= func.now())
+        .order_by(models.EmailOutbox.priority, models.EmailOutbox.next_attempt_at, models.EmailOutbox.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .cte('due')
+        .prefix_with('MATERIALIZED')
+    )
+    # Materialized so the locking subquery runs once: as an IN semi-join Postgres may rescan it
+    # per row and claim more than batch_size.
+    result = await db.execute(
+        update(models.EmailOutbox)
+        .where(models.EmailOutbox.id == due.c.id)
+        .values(attempts=models.EmailOutbox.attempts + 1,
+                next_attempt_at=func.now() + timedelta(seconds=lease_seconds))
+        .returning(models.EmailOutbox.id, models.EmailOutbox.recipient, models.EmailOutbox.subject,
+                   models.EmailOutbox.body, models.EmailOutbox.subtype, models.EmailOutbox.attempts)
+        .execution_options(synchronize_session=False)
+    )
+    batch = result.all()
+    await db.commit()
+    return batch
+
+
+async def mark_outbox_sent_db(db, outbox_ids):
+    if outbox_ids:
+        await db.execute(delete(models.EmailOutbox).where(models.EmailOutbox.id.in_(outbox_ids)))
+        await db.commit()
+
+
+async def mark_outbox_failed_db(db, failures):
+    for outbox_id, error, retry_in in failures:
+        values = {'last_error': error}
+        if retry_in is None:
+            values['status'] = 'failed'
+        else:
+            values['next_attempt_at'] = func.now() + timedelta(seconds=retry_in)
+        await db.execute(
+            update(models.EmailOutbox)
+            .where(models.EmailOutbox.id == outbox_id)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+    if failures:
+        await db.commit()
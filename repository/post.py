@@ -1,17 +1,94 @@
 from sqlalchemy.future import select
 from datetime import datetime
-from sqlalchemy import func
+from sqlalchemy import func, tuple_, text, cast, Date
 from fastapi import status, HTTPException
+from cache import TTLCache, create_response_cache
+from config import (POSTS_COUNT_CACHE_TTL_SECONDS, POSTS_COUNT_CACHE_SIZE, RESPONSE_CACHE_URL, RESPONSE_CACHE_MAX_BYTES,
+                    RESPONSE_CACHE_TTL_SECONDS)
+from repository.versions import bump_table_versions_db
 import models
 
 
+posts_count_cache = TTLCache(ttl=POSTS_COUNT_CACHE_TTL_SECONDS, maxsize=POSTS_COUNT_CACHE_SIZE)
+response_cache = create_response_cache(RESPONSE_CACHE_URL, RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_TTL_SECONDS)
+
+POST_LIST_COLUMNS = (
+    models.Post.id,
+    models.Post.title,
+    models.Post.content,
+    models.Post.topic_id,
+    models.Post.file_path,
+    cast(models.Post.created_at, Date).label('created_at'),
+    models.Post.created_at.label('posted_at'),
+)
+
+SEARCH_CONFIG = 'english'
+SEARCH_HEADLINE_OPTIONS = 'StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MinWords=5, MaxWords=20'
+HTML_ESCAPES = (('&', '&amp;'), ('<', '&lt;'), ('>', '&gt;'), ('"', '&quot;'), ("'", '&#x27;'))
+
+
+def escape_html(column):
+    for char, entity in HTML_ESCAPES:
+        column = func.replace(column, char, entity)
+    return column
+
+
 async def get_post_db(db, post_id):
     post = await db.execute(select(models.Post).filter(models.Post.id == post_id))
     post = post.scalars().first()
     return post
 
 
-async def get_all_posts_db(db, topic_ids, start_date, end_date,content, last_viewed_at, page, current_user):
+async def count_posts_db(db, conditions):
+    total_count = await db.execute(select(func.count()).select_from(models.Post).where(*conditions))
+    return total_count.scalar()
+
+
+async def estimate_posts_count_db(db):
+    estimate = await db.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = 'ix_post_visible_created_at'::regclass"))
+    estimate = estimate.scalar()
+    if estimate is None or estimate < 0:
+        return None
+    return estimate
+
+
+async def get_posts_total_db(db, conditions, filter_key):
+    total_count = posts_count_cache.get(filter_key)
+    if total_count is not None:
+        return total_count
+
+    if not any(filter_key):
+        total_count = await estimate_posts_count_db(db)
+    if total_count is None:
+        total_count = await count_posts_db(db, conditions)
+
+    posts_count_cache.set(filter_key, total_count)
+    return total_count
+
+
+async def search_posts_db(db, conditions, ts_query, offset, limit):
+    rank = func.ts_rank(models.Post.search_vector, ts_query)
+    ranked = (
+        select(models.Post.id, rank.label('rank'))
+        .where(*conditions)
+        .order_by(rank.desc(), models.Post.created_at.desc(), models.Post.id.desc())
+        .offset(offset)
+        .limit(limit)
+        .subquery()
+    )
+    snippet = func.ts_headline(SEARCH_CONFIG, escape_html(models.Post.content), ts_query, SEARCH_HEADLINE_OPTIONS)
+
+    result = await db.execute(
+        select(*POST_LIST_COLUMNS, snippet.label('snippet'))
+        .join(ranked, models.Post.id == ranked.c.id)
+        .order_by(ranked.c.rank.desc(), models.Post.created_at.desc(), models.Post.id.desc())
+    )
+    return result.all()
+
+
+async def get_all_posts_db(db, topic_ids, start_date, end_date,content, last_viewed_at, page, current_user, after=None,
+                           include_total=True, q=None):
 
     posts_per_page = 10
 
@@ -25,71 +102,99 @@ async def get_all_posts_db(db, topic_ids, start_date, end_date,content, last_vie
         topic_id_list = []
         if topic_ids:
             try:
-                topic_id_list = [int(topic_id.strip()) for topic_id in topic_ids.split(',')]
+                topic_id_list = sorted({int(topic_id.strip()) for topic_id in topic_ids.split(',')})
             except ValueError:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="topic_ids must contain only integer values"
                 )
 
-        query = select(models.Post)
-
-        query = query.where(models.Post.user_id.not_in(
-            select(models.User.id)
-            .where(models.User.banned_is == True)
-        ))
+        conditions = [models.Post.author_banned == False]
 
         if topic_id_list:
-            query = query.where(models.Post.topic_id.in_(topic_id_list))
+            conditions.append(models.Post.topic_id.in_(topic_id_list))
 
+        start_datetime = None
         if start_date is not None:
             try:
                 start_datetime = datetime.fromisoformat(start_date)
-                query = query.where(models.Post.created_at >= start_datetime)
+                conditions.append(models.Post.created_at >= start_datetime)
             except ValueError:
-                return [{"error": "Invalid start date format. Please use YYYY-MM-DDT00:00:00."}]
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Invalid start date format. Please use YYYY-MM-DDT00:00:00."
+                )
 
+        end_datetime = None
         if end_date is not None:
             try:
                 end_datetime = datetime.fromisoformat(end_date)
-                query = query.where(models.Post.created_at <= end_datetime)
+                conditions.append(models.Post.created_at <= end_datetime)
             except ValueError:
-                return [{"error": "Invalid end date format. Please use YYYY-MM-DDT00:00:00."}]
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Invalid end date format. Please use YYYY-MM-DDT00:00:00."
+                )
 
+        content = content.lower() if content else None
         if content:
-            query = query.filter(
+            conditions.append(
                 models.Post.content.ilike(f'%{content}%') |
                 models.Post.title.ilike(f'%{content}%')
             )
 
+        last_viewed_datetime = None
         if last_viewed_at is not None:
             try:
                 last_viewed_datetime = datetime.fromisoformat(last_viewed_at)
-                query = query.where(models.Post.created_at > last_viewed_datetime)
+                conditions.append(models.Post.created_at > last_viewed_datetime)
             except ValueError:
-                return [{"error": "Invalid last_viewed_at format. Please use YYYY-MM-DDT00:00:00."}]
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Invalid last_viewed_at format. Please use YYYY-MM-DDT00:00:00."
+                )
+
+        q = q.strip() if q else None
+        if q:
+            if after is not None:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="cursor can not be combined with q, use page instead"
+                )
+            ts_query = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+            conditions.append(models.Post.search_vector.op('@@')(ts_query))
+
+        filter_key = (tuple(topic_id_list), start_datetime, end_datetime, content, last_viewed_datetime, q)
+
+        total_count = None
+        if include_total:
+            total_count = await get_posts_total_db(db, conditions, filter_key)
 
-        query = query.order_by(models.Post.created_at.desc())
-        total_count = await db.execute(func.count(models.Post.id))
-        total_count = total_count.scalar()
+        if q:
+            offset = (page - 1) * posts_per_page
+            all_posts = await search_posts_db(db, conditions, ts_query, offset, posts_per_page)
+            return all_posts, total_count
 
-        total_pages = (total_count + posts_per_page - 1) // posts_per_page
+        query = select(*POST_LIST_COLUMNS).where(*conditions)
+        query = query.order_by(models.Post.created_at.desc(), models.Post.id.desc())
 
-        if page > total_pages:
-            raise HTTPException(status_code=404, detail="Page not found")
+        if after is not None:
+            query = query.where(tuple_(models.Post.created_at, models.Post.id) < tuple_(*after))
+        else:
+            offset = (page - 1) * posts_per_page
+            query = query.offset(offset)
 
-        offset = (page - 1) * posts_per_page
-        query = query.offset(offset)
         query = query.limit(posts_per_page)
 
         result = await db.execute(query)
-        all_posts = result.scalars().all()
+        all_posts = result.all()
 
-        return all_posts
+        return all_posts, total_count
 
 
 async def update_post_db(db, post):
     db.add(post)
+    await bump_table_versions_db(db, 'post')
     await db.commit()
     await db.refresh(post)
 
@@ -108,6 +213,7 @@ async def create_post_db(db, title, topic_id, content, file_path, current_user):
     )
 
     db.add(db_post)
+    await bump_table_versions_db(db, 'post')
     await db.commit()
     await db.refresh(db_post)
 
@@ -117,6 +223,7 @@ async def create_post_db(db, title, topic_id, content, file_path, current_user):
 async def delete_post_db(db, post):
     try:
         await db.delete(post)
+        await bump_table_versions_db(db, 'post')
         await db.commit()
     except Exception as e:
         raise e
@@ -4,22 +4,33 @@ import models
 
 async def search_subscriptions_db(db, current_user):
     subscriptions = await db.execute(
-        select(models.Subscription)
+        select(models.Subscription.subscriber_id, models.Subscription.subscribed_id)
         .where(models.Subscription.subscribed_id == current_user.id)
-        .where(~models.Subscription.subscriber.has(banned_is=True))
+        .where(models.Subscription.subscriber_banned == False)
     )
-    subscriptions = subscriptions.scalars().all()
+    subscriptions = subscriptions.all()
     return subscriptions
 
 
+async def stream_subscriber_ids_db(db, author_id, chunk_size, after=0):
+    return await db.stream_scalars(
+        select(models.Subscription.subscriber_id)
+        .where(models.Subscription.subscribed_id == author_id)
+        .where(models.Subscription.subscriber_id > after)
+        .where(models.Subscription.subscriber_banned == False)
+        .order_by(models.Subscription.subscriber_id)
+        .execution_options(yield_per=chunk_size)
+    )
+
+
 async def get_user_subscriptions_on_db(db, current_user):
 
         subscriptions = await db.execute(
-            select(models.Subscription)
+            select(models.Subscription.subscriber_id, models.Subscription.subscribed_id)
             .where(models.Subscription.subscriber_id == current_user.id)
-            .where(~models.Subscription.subscribed.has(banned_is=True))
+            .where(models.Subscription.subscribed_banned == False)
         )
-        subscriptions = subscriptions.scalars().all()
+        subscriptions = subscriptions.all()
 
         return subscriptions
 
@@ -0,0 +1,123 @@
+from sqlalchemy.future import select
+from sqlalchemy import func, tuple_, insert, delete, update, literal, text, true
+from sqlalchemy.orm import aliased
+import models
+from repository.post import POST_LIST_COLUMNS
+
+
+def not_banned_author():
+    return models.Post.author_banned == False
+
+
+def has_more_followers_than(author_id, max_followers):
+    followers = aliased(models.Subscription)
+    return (
+        select(literal(1))
+        .where(followers.subscribed_id == author_id)
+        .offset(max_followers)
+        .limit(1)
+        .exists()
+    )
+
+
+async def is_popular_author_db(db, author_id, max_followers):
+    result = await db.execute(select(has_more_followers_than(author_id, max_followers)))
+    return result.scalar()
+
+
+async def fan_out_post_db(db, post):
+    await db.execute(
+        insert(models.Timeline)
+        .from_select(
+            ['user_id', 'post_id', 'created_at'],
+            select(models.Subscription.subscriber_id, literal(post.id), literal(post.created_at))
+            .where(models.Subscription.subscribed_id == post.user_id)
+        )
+    )
+    await db.execute(update(models.Post).where(models.Post.id == post.id).values(fanned_out=True))
+    await db.commit()
+
+
+async def remove_author_from_timeline_db(db, user_id, author_id):
+    await db.execute(
+        delete(models.Timeline)
+        .where(models.Timeline.user_id == user_id)
+        .where(models.Timeline.post_id.in_(select(models.Post.id).where(models.Post.user_id == author_id)))
+    )
+
+
+async def get_pushed_timeline_db(db, user_id, after, limit):
+    query = (
+        select(*POST_LIST_COLUMNS)
+        .join(models.Timeline, models.Timeline.post_id == models.Post.id)
+        .where(models.Timeline.user_id == user_id)
+        .where(not_banned_author())
+        .order_by(models.Timeline.created_at.desc(), models.Timeline.post_id.desc())
+        .limit(limit)
+    )
+    if after is not None:
+        query = query.where(tuple_(models.Timeline.created_at, models.Timeline.post_id) < tuple_(*after))
+
+    result = await db.execute(query)
+    return result.all()
+
+
+async def get_pulled_timeline_db(db, user_id, after, limit):
+    followed_authors = (
+        select(models.Subscription.subscribed_id.label('author_id'))
+        .where(models.Subscription.subscriber_id == user_id)
+        .subquery()
+    )
+    recent_posts = (
+        select(models.Post.id)
+        .where(models.Post.user_id == followed_authors.c.author_id)
+        .where(models.Post.fanned_out == False)
+        .where(not_banned_author())
+        .order_by(models.Post.created_at.desc(), models.Post.id.desc())
+        .limit(limit)
+    )
+    if after is not None:
+        recent_posts = recent_posts.where(tuple_(models.Post.created_at, models.Post.id) < tuple_(*after))
+    recent_posts = recent_posts.lateral()
+
+    query = (
+        select(*POST_LIST_COLUMNS)
+        .where(models.Post.id.in_(select(recent_posts.c.id).select_from(followed_authors.join(recent_posts, true()))))
+        .order_by(models.Post.created_at.desc(), models.Post.id.desc())
+        .limit(limit)
+    )
+
+    result = await db.execute(query)
+    return result.all()
+
+
+async def get_overfull_timelines_db(db, max_length):
+    result = await db.execute(
+        select(models.Timeline.user_id)
+        .group_by(models.Timeline.user_id)
+        .having(func.count() > max_length)
+    )
+    return result.scalars().all()
+
+
+async def trim_timelines_db(db, user_ids, max_length):
+    result = await db.execute(
+        text("""
+            DELETE FROM timeline
+            USING (
+                SELECT u.user_id, boundary.created_at, boundary.post_id
+                FROM unnest(CAST(:user_ids AS integer[])) AS u(user_id)
+                CROSS JOIN LATERAL (
+                    SELECT created_at, post_id FROM timeline
+                    WHERE timeline.user_id = u.user_id
+                    ORDER BY created_at DESC, post_id DESC
+                    OFFSET :max_length LIMIT 1
+                ) AS boundary
+            ) AS oldest_kept
+            WHERE timeline.user_id = oldest_kept.user_id
+              AND (timeline.created_at, timeline.post_id) <= (oldest_kept.created_at, oldest_kept.post_id)
+        """),
+        {"user_ids": user_ids, "max_length": max_length}
+    )
+    await db.commit()
+    return result.rowcount
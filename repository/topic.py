@@ -2,6 +2,7 @@ from fastapi import HTTPException, status
 import models
 from sqlalchemy.future import select
 from sqlalchemy import update
+from repository.versions import bump_table_versions_db
 
 
 async def create_topic_db(db, topic):
@@ -9,6 +10,7 @@ async def create_topic_db(db, topic):
         title=topic.title
     )
     db.add(new_topic)
+    await bump_table_versions_db(db, 'topics')
     await db.commit()
     await db.refresh(new_topic)
     return new_topic
@@ -17,6 +19,7 @@ async def create_topic_db(db, topic):
 async def update_topic_db(db, topic, title):
     topic.title = title
     db.add(topic)
+    await bump_table_versions_db(db, 'topics')
     await db.commit()
     await db.refresh(topic)
     return topic
@@ -26,6 +29,7 @@ async def delete_topic_db(db, topic, topic_id):
     try:
         await db.execute(update(models.Post).where(models.Post.topic_id == topic_id).values(topic_id=None))
         await db.delete(topic)
+        await bump_table_versions_db(db, 'topics', 'post')
         await db.commit()
 
         return topic
@@ -35,8 +39,8 @@ async def delete_topic_db(db, topic, topic_id):
 
 
 async def get_topics_db(db):
-    result = await db.execute(select(models.Topics))
-    topics = result.scalars().all()
+    result = await db.execute(select(models.Topics.id, models.Topics.title))
+    topics = result.all()
     return topics
 
 
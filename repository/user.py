@@ -1,21 +1,91 @@
 import models
 from sqlalchemy.future import select
-from sqlalchemy import desc
+from sqlalchemy import desc, func, literal, tuple_, update
+from cache import TTLCache
+from config import PRINCIPAL_CACHE_TTL_SECONDS, PRINCIPAL_CACHE_SIZE
+from repository.post import posts_count_cache
+from repository.versions import bump_table_versions_db
+
+
+BAN_UPDATE_BATCH_SIZE = 5000
+
+principal_cache = TTLCache(ttl=PRINCIPAL_CACHE_TTL_SECONDS, maxsize=PRINCIPAL_CACHE_SIZE)
+token_versions = {}
+
+
+def revoke_user_tokens(user):
+    user.token_version = models.User.token_version + 1
+
+
+def invalidate_principal(user):
+    principal_cache.pop_matching(lambda key: key[0] == user.id)
+    token_versions[user.id] = user.token_version
+
+
+async def get_token_versions_db(db):
+    result = await db.execute(
+        select(models.User.id, models.User.token_version)
+        .where(models.User.token_version > 0)
+    )
+    return dict(result.all())
+
+
+async def set_banned_flag_db(db, model, key_columns, owner_column, flag_column, user_id, ban):
+    while True:
+        batch = (
+            select(*key_columns)
+            .where(owner_column == user_id, flag_column != ban)
+            .limit(BAN_UPDATE_BATCH_SIZE)
+        )
+        result = await db.execute(
+            update(model)
+            .where(tuple_(*key_columns).in_(batch))
+            .values({flag_column.key: ban})
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount < BAN_UPDATE_BATCH_SIZE:
+            return
 
 
 async def ban_user_db(db, user, ban):
     user.banned_is = ban
+    revoke_user_tokens(user)
     db.add(user)
+
+    await set_banned_flag_db(db, models.Post, [models.Post.id], models.Post.user_id,
+                             models.Post.author_banned, user.id, ban)
+    subscription_key = [models.Subscription.subscriber_id, models.Subscription.subscribed_id]
+    await set_banned_flag_db(db, models.Subscription, subscription_key, models.Subscription.subscriber_id,
+                             models.Subscription.subscriber_banned, user.id, ban)
+    await set_banned_flag_db(db, models.Subscription, subscription_key, models.Subscription.subscribed_id,
+                             models.Subscription.subscribed_banned, user.id, ban)
+    await bump_table_versions_db(db, 'post')
+
     await db.commit()
     await db.refresh(user)
+    invalidate_principal(user)
+    posts_count_cache.clear()
     return user
 
 
+USER_LIST_COLUMNS = (
+    models.User.id,
+    models.User.email,
+    models.User.first_name,
+    models.User.second_name,
+    models.User.nickname,
+    models.User.sex_id,
+    models.User.country_id,
+    models.User.banned_is,
+    models.User.created_at,
+)
+
+
 async def get_all_users_db(db, sex_id, country_id, name, order_by, sort_direction, page):
     page_size = 10
 
     async with db:
-        query = select(models.User)
+        query = select(*USER_LIST_COLUMNS)
 
         if sex_id is not None:
             query = query.where(models.User.sex_id == sex_id)
@@ -42,29 +112,47 @@ async def get_all_users_db(db, sex_id, country_id, name, order_by, sort_directio
         query = query.limit(page_size)
 
         result = await db.execute(query)
-        user_list = result.scalars().all()
+        user_list = result.all()
 
         user_list = [user for user in user_list if not user.banned_is]
         return user_list
 
 
-async def search_users_db(db, name):
+async def search_users_db(db, name, page, after=None, page_size=10):
     async with db:
-        query = select(models.User)
-
-        if name is not None:
-            query = query.filter(
+        query = select(*USER_LIST_COLUMNS).where(models.User.banned_is.is_not(True))
+
+        if name:
+            score = func.greatest(
+                func.similarity(models.User.first_name, name),
+                func.similarity(models.User.second_name, name),
+                func.similarity(models.User.email, name),
+                func.similarity(models.User.nickname, name),
+            )
+            query = query.add_columns(score.label('score')).filter(
                 models.User.first_name.ilike(f'%{name}%') |
                 models.User.second_name.ilike(f'%{name}%') |
                 models.User.email.ilike(f'%{name}%') |
                 models.User.nickname.ilike(f'%{name}%')
             )
+            query = query.order_by(score.desc(), models.User.id.desc())
+            if after is not None:
+                query = query.where(tuple_(score, models.User.id) < tuple_(*after))
+        else:
+            query = query.add_columns(literal(0.0).label('score'))
+            query = query.order_by(models.User.id.desc())
+            if after is not None:
+                query = query.where(models.User.id < after[1])
+
+        if after is None and page > 1:
+            query = query.offset((page - 1) * page_size)
+        query = query.limit(page_size)
 
-        user_list = await db.execute(query)
-        user_list = user_list.scalars().all()
-        user_list = [user for user in user_list if not user.banned_is]
+        result = await db.execute(query)
+        user_list = result.all()
+        last_key = (user_list[-1].score, user_list[-1].id) if len(user_list) == page_size else None
 
-        return user_list
+        return user_list, last_key
 
 
 async def get_user_role_db(db, current_user):
@@ -0,0 +1,21 @@
+from sqlalchemy.future import select
+from sqlalchemy.dialects.postgresql import insert
+import models
+
+
+async def bump_table_versions_db(db, *names):
+    upsert = insert(models.TableVersion).values([{'name': name, 'version': 1} for name in sorted(set(names))])
+    await db.execute(
+        upsert.on_conflict_do_update(
+            index_elements=[models.TableVersion.name],
+            set_={'version': models.TableVersion.version + 1}
+        )
+    )
+
+
+async def get_table_versions_db(db, names):
+    result = await db.execute(
+        select(models.TableVersion.name, models.TableVersion.version)
+        .where(models.TableVersion.name.in_(names))
+    )
+    return dict(result.all())
@@ -1,8 +1,8 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, status, Depends
 import schemas
 from sqlalchemy.ext.asyncio import AsyncSession
 from db.async_db import get_db
-from services.auth import get_current_user
+from services.auth import require_role
 from services.admin import change_user_role
 
 
@@ -17,9 +17,9 @@ async def change_role(
     user_id: int,
     role_id: int,
     db: AsyncSession = Depends(get_db),
-    current_user: schemas.users.User = Depends(get_current_user),
+    current_user: schemas.users.User = Depends(require_role('superadmin')),
 ):
-    user = await change_user_role(db, user_id, role_id, current_user)
+    user = await change_user_role(db, user_id, role_id)
     return f"User {user.id} was changed role"
 
 
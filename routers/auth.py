@@ -5,8 +5,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from schemas import users
 import logging
 from schemas.auth import PasswordResetRequest, PasswordResetResponse, PasswordResetToken
-from services.auth import (create_access_token, create_refresh_token, authenticate_user,
+from services.auth import (create_user_access_token, create_refresh_token, authenticate_user,
                            reset_user_password, register_user, reset_password_confirm)
+from services.rate_limit import limit_auth_by_ip, limit_auth_by_account, auth_concurrency
 
 
 logging.basicConfig(level=logging.INFO)
@@ -19,13 +20,15 @@ router = APIRouter(
 )
 
 
-@router.post('/register/', response_model=users.User)
-async def register(user: users.UserCreate, db: AsyncSession = Depends(get_db)):
+@router.post('/register/', response_model=users.User,
+             dependencies=[Depends(limit_auth_by_ip), Depends(auth_concurrency)])
+async def register(request: Request, user: users.UserCreate, db: AsyncSession = Depends(get_db)):
+    await limit_auth_by_account(request, user.email)
     db_user = await register_user(db, user)
     return db_user
 
 
-@router.post("/login/")
+@router.post("/login/", dependencies=[Depends(limit_auth_by_ip), Depends(auth_concurrency)])
 async def login(
     request: Request,
     response: Response,
@@ -33,11 +36,12 @@ async def login(
     username: str = Form(...),
     password: str = Form(...)
 ):
+    await limit_auth_by_account(request, username)
     user = await authenticate_user(db, username, password)
     if not user:
         return JSONResponse(status_code=401, content={"error": "Invalid credentials"})
 
-    access_token = create_access_token({"sub": str(user.id)})
+    access_token = await create_user_access_token(db, user)
     refresh_token = create_refresh_token(user.id)
 
     response.set_cookie(key="access_token", value=access_token, httponly=True)
@@ -46,19 +50,23 @@ async def login(
     return {"access_token": access_token}
 
 
-@router.post("/reset-password", response_model=PasswordResetResponse)
+@router.post("/reset-password", response_model=PasswordResetResponse,
+             dependencies=[Depends(limit_auth_by_ip), Depends(auth_concurrency)])
 async def reset_password(
+    http_request: Request,
     request: PasswordResetRequest,
     db: AsyncSession = Depends(get_db)
 ):
+    await limit_auth_by_account(http_request, request.email)
     token = await reset_user_password(db, request)
     return PasswordResetResponse(message=f"{token} reset instructions sent to your email.")
 
 
-@router.post("/reset-password/confirm", response_model=PasswordResetResponse)
+@router.post("/reset-password/confirm", response_model=PasswordResetResponse,
+             dependencies=[Depends(limit_auth_by_ip), Depends(auth_concurrency)])
 async def confirm_password_reset(
     request: PasswordResetToken,
     db: AsyncSession = Depends(get_db)
 ):
-    user = reset_password_confirm(db, request)
+    user = await reset_password_confirm(db, request)
     return PasswordResetResponse(message="Password reset successfully.")
\ No newline at end of file
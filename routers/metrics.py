@@ -0,0 +1,15 @@
+from fastapi import APIRouter, status, Depends
+import schemas
+from services.auth import require_role
+from services.metrics import snapshot
+
+
+router = APIRouter(
+    prefix='/metrics',
+    tags=['Metrics']
+)
+
+
+@router.get('/', status_code=status.HTTP_200_OK)
+async def metrics(current_user: schemas.users.User = Depends(require_role('admin', 'superadmin'))):
+    return snapshot()
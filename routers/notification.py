@@ -1,5 +1,7 @@
-from fastapi import WebSocket, WebSocketDisconnect, APIRouter
-from services.notification import manager
+from typing import Optional
+from fastapi import WebSocket, WebSocketDisconnect, APIRouter, status
+from services.auth import get_websocket_user
+from services.notification import manager, notification_bus, notification_service
 
 
 router = APIRouter(
@@ -12,12 +14,35 @@ router = APIRouter(
 async def notification_feed(
     user_id: int,
     websocket: WebSocket,
+    since: Optional[int] = None,
 ):
-    await manager.connect(user_id, websocket)
+    """Pushes notification frames, {"id": ..., "type": ..., "text": ...}, to the user's sockets.
+
+    Needs the user's own access_token cookie, otherwise the socket is closed with 1008. With
+    ?since=<id> the notifications after that id are replayed before live ones. Dead peers are
+    found by the server's WebSocket ping (uvicorn --ws-ping-interval/--ws-ping-timeout) and by
+    failed sends. With WEBSOCKET_APP_HEARTBEAT=true the server also sends {"type": "ping"}
+    frames every WEBSOCKET_PING_INTERVAL_SECONDS and closes with 1001 any socket that has not
+    sent a frame for WEBSOCKET_IDLE_TIMEOUT_SECONDS, so clients must answer with any text frame.
+    """
+    principal = await get_websocket_user(websocket)
+    if principal is None or principal.id != user_id:
+        await websocket.close(status.WS_1008_POLICY_VIOLATION)
+        return
+    connection = await manager.connect(user_id, websocket, replaying=since is not None)
+    if connection is None:
+        return
     try:
+        await notification_bus.subscribe(user_id)
+        if since is not None:
+            await notification_service.replay(connection, since)
         while True:
             _ = await websocket.receive_text()
+            manager.touch(connection)
     except WebSocketDisconnect:
-        manager.disconnect(user_id)
+        pass
+    finally:
+        manager.disconnect(connection)
+        notification_bus.unsubscribe(user_id)
 
 
@@ -4,10 +4,14 @@ from schemas import posts, users
 from typing import List, Tuple, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from db.async_db import get_db
-from fastapi.encoders import jsonable_encoder
-from fastapi import status, Depends, APIRouter, Form, UploadFile, File, HTTPException
+from fastapi import status, Depends, APIRouter, Form, UploadFile, File, HTTPException, Request
 from services.auth import get_current_user
-from services.post import delete_posts, update_post_serv, create_post_with_notification, get_all_posts
+from services.etag import check_etag, not_modified
+from services.pagination import encode_cursor
+from services.serialization import rows_adapter, serialize_rows, json_response, raw_json_response
+from services.timeline import get_timeline, TIMELINE_PAGE_SIZE
+from services.post import (delete_posts, update_post_serv, create_post_with_notification, get_all_posts,
+                           posts_page_cache_key, get_cached_posts_page, cache_posts_page)
 
 
 router = APIRouter(
@@ -16,48 +20,106 @@ router = APIRouter(
 )
 
 
+POST_LIST = rows_adapter(posts.PostResponse)
+
+
+def posts_page_response(post_rows, pagination_info, headers=None):
+    return json_response([serialize_rows(POST_LIST, post_rows), pagination_info.model_dump()], headers=headers)
+
+
 @router.get('/', response_model=Tuple[List[posts.PostResponse], posts.PaginationInfo])
 async def all_posts(
+    request: Request,
     topic_ids: str | None = None,
     start_date: str | None = None,
     end_date: str | None = None,
     content: str | None = None,
+    q: str | None = None,
     last_viewed_at: str | None = None,
     page: int = 1,
+    cursor: str | None = None,
+    include_total: bool = True,
     db: AsyncSession = Depends(get_db),
     current_user: users.User = Depends(get_current_user)
 ):
 
+    if current_user.banned_is:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+
+    etag, matched, versions = await check_etag(db, request, ['post'])
+    if matched:
+        return not_modified(etag)
+
+    cache_key = posts_page_cache_key(versions, topic_ids, start_date, end_date, content, q, last_viewed_at, page,
+                                     cursor, include_total)
+    if cache_key:
+        body = await get_cached_posts_page(cache_key)
+        if body is not None:
+            return raw_json_response(body, headers={'ETag': etag})
+
     posts_per_page = 10
-    all_posts = await get_all_posts(db, topic_ids, start_date, end_date, content, last_viewed_at, page, current_user)
-    posts_with_files = []
-    for post in all_posts:
-        post_response = posts.PostResponse(
-            id=post.id,
-            title=post.title,
-            content=post.content,
-            topic_id=post.topic_id or None,
-            file_path=post.file_path,
-            created_at=jsonable_encoder(post.created_at.date()),
-        )
-        posts_with_files.append(post_response)
+    all_posts, total_count = await get_all_posts(db, topic_ids, start_date, end_date, content, last_viewed_at, page,
+                                                 current_user, cursor, include_total, q)
+    total_pages = (total_count + posts_per_page - 1) // posts_per_page if total_count is not None else None
+
+    if all_posts:
+        last_post = all_posts[-1]
+        has_next = len(all_posts) == posts_per_page
+        next_cursor = encode_cursor(last_post.posted_at, last_post.id) if has_next and not q else None
+
+        if cursor:
+            next_page = f"?cursor={next_cursor}" if has_next else None
+            prev_page = None
+        else:
+            next_page = f"?page={page + 1}" if has_next else None
+            prev_page = f"?page={page - 1}" if page > 1 else None
 
-    if posts_with_files:
-        first_post = posts_with_files[0]
-        last_post = posts_with_files[-1]
         pagination_info = posts.PaginationInfo(
             last_viewed_at=last_post.created_at,
-            next_page=f"?page={page + 1}" if len(posts_with_files) == posts_per_page else None,
-            prev_page=f"?page={page - 1}" if page > 1 else None
+            next_page=next_page,
+            prev_page=prev_page,
+            next_cursor=next_cursor,
+            total_count=total_count,
+            total_pages=total_pages
         )
     else:
-        return [], posts.PaginationInfo(
+        pagination_info = posts.PaginationInfo(
             last_viewed_at=datetime.now(),
             next_page=None,
-            prev_page=None
+            prev_page=None,
+            total_count=total_count,
+            total_pages=total_pages
         )
 
-    return posts_with_files, pagination_info
+    response = posts_page_response(all_posts, pagination_info, headers={'ETag': etag})
+    if cache_key:
+        await cache_posts_page(cache_key, response.body)
+    return response
+
+
+@router.get('/timeline', response_model=Tuple[List[posts.PostResponse], posts.PaginationInfo])
+async def timeline(
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: users.User = Depends(get_current_user)
+):
+    timeline_posts = await get_timeline(db, cursor, current_user)
+    if not timeline_posts:
+        return posts_page_response([], posts.PaginationInfo(
+            last_viewed_at=datetime.now(),
+            next_page=None,
+            prev_page=None
+        ))
+
+    last_post = timeline_posts[-1]
+    next_cursor = encode_cursor(last_post.posted_at, last_post.id) if len(timeline_posts) == TIMELINE_PAGE_SIZE else None
+    pagination_info = posts.PaginationInfo(
+        last_viewed_at=last_post.created_at,
+        next_page=f"?cursor={next_cursor}" if next_cursor else None,
+        prev_page=None,
+        next_cursor=next_cursor
+    )
+    return posts_page_response(timeline_posts, pagination_info)
 
 
 @router.post("/", response_model=posts.PostResponse)
@@ -4,6 +4,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from db.async_db import get_db
 from fastapi import Depends, APIRouter, status, HTTPException
 from services.auth import get_current_user
+from services.serialization import rows_adapter, serialize_rows, json_response
 from services.subscription import create_sub, get_user_sub_on, delete_sub, get_user_sub_in
 import models
 
@@ -13,6 +14,8 @@ router = APIRouter(
     tags=['Subscriptions']
 )
 
+SUBSCRIPTION_LIST = rows_adapter(subscription.Subscription)
+
 
 @router.post("/", response_model=subscription.SubscriptionCreate)
 async def create_subscription(
@@ -37,7 +40,7 @@ async def get_user_subscriptions(
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
 
     subscriptions = await get_user_sub_on(db, current_user)
-    return subscriptions
+    return json_response(serialize_rows(SUBSCRIPTION_LIST, subscriptions))
 
 
 @router.get('/incoming/{user_id}', response_model=List[subscription.Subscription])
@@ -49,7 +52,7 @@ async def get_user_subscriptions(
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
 
     subscriptions = await get_user_sub_in(db, current_user)
-    return subscriptions
+    return json_response(serialize_rows(SUBSCRIPTION_LIST, subscriptions))
 
 
 @router.delete("/{subscribed_id}", response_model=subscription.SubscriptionCreate)
@@ -5,8 +5,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 import logging
 import models
-from services.auth import (create_access_token, create_refresh_token,
+from services.auth import (create_user_access_token, create_refresh_token,
                            verify_refresh_token, set_user_authorized_state, get_id_user)
+from services.revocation import is_refresh_token_revoked, revoke_refresh_token
 
 
 logging.basicConfig(level=logging.INFO)
@@ -29,20 +30,23 @@ async def refresh_token(
     if not refresh_token:
         return JSONResponse(status_code=401, content={"error": "No refresh token provided"})
 
-    try:
-        user_id = verify_refresh_token(refresh_token)
-    except Exception as e:
+    payload = verify_refresh_token(refresh_token)
+    if not payload:
         return JSONResponse(status_code=401, content={"error": "Invalid refresh token"})
 
-    if not user_id:
-        return JSONResponse(status_code=401, content={"error": "Invalid refresh token"})
+    if is_refresh_token_revoked(payload["jti"]):
+        logger.warning(f"Revoked refresh token presented for user {payload['user_id']}")
+        return JSONResponse(status_code=401, content={"error": "Refresh token has been revoked"})
 
-    user = await get_id_user(db, user_id)
+    user = await get_id_user(db, payload["user_id"])
     if not user:
         return JSONResponse(status_code=404, content={"error": "User not found"})
 
+    if not revoke_refresh_token(payload):
+        return JSONResponse(status_code=401, content={"error": "Refresh token has been revoked"})
+
     try:
-        new_access_token = create_access_token({"sub": str(user.id)})
+        new_access_token = await create_user_access_token(db, user)
         new_refresh_token = create_refresh_token(user.id)
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": "Failed to create new tokens"})
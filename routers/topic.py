@@ -1,9 +1,11 @@
-from fastapi import status, Depends, APIRouter
+from fastapi import status, Depends, APIRouter, Request
 from schemas import topic, users
 import models
 from sqlalchemy.ext.asyncio import AsyncSession
 from db.async_db import get_db
-from services.auth import get_current_user
+from services.auth import get_current_user, require_role
+from services.etag import check_etag, not_modified
+from services.serialization import rows_adapter, serialize_rows, json_response
 from services.topic import create_new_topic, update_topic_serv, delete_topic_serv, get_topics
 
 
@@ -12,34 +14,41 @@ router = APIRouter(
     tags=['Topics']
 )
 
+TOPIC_LIST = rows_adapter(topic.Topic)
+
 
 @router.post('/', response_model=topic.TopicCreate, status_code=status.HTTP_201_CREATED)
 async def create_topic(topic: topic.TopicCreate, db: AsyncSession = Depends(get_db),
-                      current_user: users.User = Depends(get_current_user)):
-    new_topic = await create_new_topic(db, topic, current_user)
+                      current_user: users.User = Depends(require_role('admin', 'superadmin'))):
+    new_topic = await create_new_topic(db, topic)
     return new_topic
 
 
 @router.put('/update/{topic_id}', response_model=topic.Topic, status_code=status.HTTP_201_CREATED)
 async def update_topic(topic_id: int, title: str, db: AsyncSession = Depends(get_db),
-                      user: models.User = Depends(get_current_user)):
+                      user: models.User = Depends(require_role('admin', 'superadmin'))):
 
-    topic = await update_topic_serv(db, topic_id, title, user)
+    topic = await update_topic_serv(db, topic_id, title)
     return topic
 
 
 @router.delete('/delete/{topic_id}')
 async def delete_topic(topic_id: int, db: AsyncSession = Depends(get_db),
-                       current_user: users.User = Depends(get_current_user)):
+                       current_user: users.User = Depends(require_role('admin', 'superadmin'))):
 
-    topic = await delete_topic_serv(db, topic_id, current_user)
+    topic = await delete_topic_serv(db, topic_id)
     return f'You deleted the topic {topic.id}'
 
 
 @router.get("/", response_model=list[topic.Topic])
 async def all_topics(
+        request: Request,
         current_user: models.User = Depends(get_current_user),
         db: AsyncSession = Depends(get_db)
 ):
+    etag, matched, _ = await check_etag(db, request, ['topics'])
+    if matched:
+        return not_modified(etag)
+
     topics = await get_topics(db)
-    return topics
+    return json_response(serialize_rows(TOPIC_LIST, topics), headers={'ETag': etag})
@@ -1,17 +1,21 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, status, Depends
 from datetime import datetime
 from typing import Tuple, List
 import schemas
 from sqlalchemy.ext.asyncio import AsyncSession
 from db.async_db import get_db
-from services.auth import get_current_user
+from services.auth import get_current_user, require_role
 from services.user import user_ban, get_all_users, search
+from services.pagination import encode_cursor
+from services.serialization import rows_adapter, serialize_rows, json_response
 
 router = APIRouter(
     prefix='/users',
     tags=['Users']
 )
 
+USER_LIST = rows_adapter(schemas.users.UsersForAdmin)
+
 
 @router.get('/', response_model=Tuple[List[schemas.users.UsersForAdmin], schemas.posts.PaginationInfo])
 async def all_users(
@@ -22,11 +26,11 @@ async def all_users(
         sort_direction: str = None,
         page: int = 1,
         db: AsyncSession = Depends(get_db),
-        current_user: schemas.users.User = Depends(get_current_user)
+        current_user: schemas.users.User = Depends(require_role('admin', 'superadmin'))
 ):
     page_size = 10
 
-    user_list = await get_all_users(db, sex_id, country_id, name, order_by, sort_direction, page, current_user)
+    user_list = await get_all_users(db, sex_id, country_id, name, order_by, sort_direction, page)
 
     if user_list:
         first_post = user_list[0]
@@ -43,29 +47,34 @@ async def all_users(
                 prev_page=None
         )
 
-    return user_list, pagination_info
+    return json_response([serialize_rows(USER_LIST, user_list), pagination_info.model_dump()])
 
 
 @router.get('/search/', response_model=Tuple[List[schemas.users.UsersForAdmin], schemas.posts.PaginationInfo])
 async def search_users(
         name: str | None = None,
         page: int = 1,
+        cursor: str | None = None,
         db: AsyncSession = Depends(get_db),
         current_user: schemas.users.User = Depends(get_current_user)
 ):
-    user_list = await search(db, name)
-    page_size = 10
-    start_index = (page - 1) * page_size
-    end_index = start_index + page_size
-    users_to_return = user_list[start_index:end_index]
+    users_to_return, last_key = await search(db, name, page, cursor)
 
     if users_to_return:
-            first_user = users_to_return[0]
             last_user = users_to_return[-1]
+            next_cursor = encode_cursor(*last_key) if last_key else None
+            if cursor:
+                next_page = f"?cursor={next_cursor}" if next_cursor else None
+                prev_page = None
+            else:
+                next_page = f"?page={page + 1}" if next_cursor else None
+                prev_page = f"?page={page - 1}" if page > 1 else None
+
             pagination_info = schemas.posts.PaginationInfo(
                 last_viewed_at=last_user.created_at,
-                next_page=f"?page={page + 1}" if len(users_to_return) == page_size else None,
-                prev_page=f"?page={page - 1}" if page > 1 else None
+                next_page=next_page,
+                prev_page=prev_page,
+                next_cursor=next_cursor
         )
     else:
         pagination_info = schemas.posts.PaginationInfo(
@@ -74,7 +83,7 @@ async def search_users(
                 prev_page=None
         )
 
-    return users_to_return, pagination_info
+    return json_response([serialize_rows(USER_LIST, users_to_return), pagination_info.model_dump()])
 
 
 @router.patch('/ban/{user_id}', status_code=status.HTTP_200_OK)
@@ -82,7 +91,7 @@ async def ban_user(
     user_id: int,
     ban: bool,
     db: AsyncSession = Depends(get_db),
-    current_user: schemas.users.User = Depends(get_current_user),
+    current_user: schemas.users.User = Depends(require_role('admin', 'superadmin')),
 ):
-    user = await user_ban(db, user_id, ban, current_user)
+    user = await user_ban(db, user_id, ban)
     return f'User {user.id} ban {ban}'
@@ -30,6 +30,7 @@ class PostResponse(BaseModel):
     topic_id: int | None
     file_path: str | None
     created_at: datetime
+    snippet: str | None = None
 
     @field_validator('title')
     @classmethod
@@ -60,5 +61,8 @@ class PaginationInfo(BaseModel):
     last_viewed_at: datetime
     next_page: Optional[str]
     prev_page: Optional[str]
+    next_cursor: Optional[str] = None
+    total_count: Optional[int] = None
+    total_pages: Optional[int] = None
 
 
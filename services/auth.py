@@ -1,20 +1,50 @@
-from fastapi import Depends, HTTPException, status, Request
+from fastapi import Depends, HTTPException, status, Request, WebSocket
 from db.async_db import get_db
 from jose import jwt, JWTError
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
+from dataclasses import dataclass
 import logging
+import uuid
 import models
+import asyncio
 from config import (ALGORITHM, SECRET_KEY, ACCESS_TOKEN_EXPIRE_MINUTES, REFRESH_TOKEN_EXPIRE_DAYS,
-                    PWD_CONTEXT)
-from repository.user import get_user_by_email_db, get_user_by_id_db
-from repository.auth import register_db, reset_token_db, get_token_db, get_user_by_token_db, change_password_db
-from services.send_email import send_password_reset_email
+                    TOKEN_VERSIONS_REFRESH_SECONDS, PWD_CONTEXT, RESET_TOKEN_PURGE_INTERVAL_SECONDS,
+                    RESET_TOKEN_PURGE_BATCH_SIZE)
+from db.async_db import AsyncSessionLocal
+from repository.user import (get_user_by_email_db, get_user_by_id_db, get_user_role_db, get_token_versions_db,
+                             principal_cache, token_versions)
+from repository.auth import (register_db, reset_token_db, get_token_db, get_user_by_token_db, change_password_db,
+                             update_password_hash_db, purge_reset_tokens_db)
+from services.send_email import queue_password_reset_email
+from services.metrics import register
+from services.hashing import hash_password, verify_password
 
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+register('principal_cache', principal_cache.stats)
+
+rehash_tasks = set()
+
+
+@dataclass(frozen=True)
+class Principal:
+    id: int
+    role_id: int | None
+    role: str | None
+    banned_is: bool
+
+    @classmethod
+    def from_user(cls, user, role):
+        return cls(id=user.id, role_id=user.role_id, role=role.name if role else None, banned_is=bool(user.banned_is))
+
+    @classmethod
+    def from_claims(cls, payload):
+        return cls(id=int(payload["sub"]), role_id=payload.get("role_id"), role=payload.get("role"),
+                   banned_is=payload["banned"])
+
 
 async def get_user(db: AsyncSession, email):
     user = await get_user_by_email_db(db, email)
@@ -26,10 +56,6 @@ async def get_id_user(db, user_id):
     return user
 
 
-def verify_password(plain_password, hashed_password):
-    return PWD_CONTEXT.verify(plain_password, hashed_password)
-
-
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     if expires_delta:
@@ -41,8 +67,19 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     return encoded_jwt
 
 
+async def create_user_access_token(db, user):
+    role = await get_user_role_db(db, user)
+    return create_access_token({
+        "sub": str(user.id),
+        "role_id": user.role_id,
+        "role": role.name if role else None,
+        "banned": bool(user.banned_is),
+        "ver": user.token_version,
+    })
+
+
 def create_refresh_token(user_id: int, expires_delta: timedelta = None):
-    to_encode = {"user_id": user_id}
+    to_encode = {"user_id": user_id, "jti": uuid.uuid4().hex}
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
@@ -54,11 +91,25 @@ def create_refresh_token(user_id: int, expires_delta: timedelta = None):
 
 async def authenticate_user(db: AsyncSession, email: str, password: str):
     user = await get_user_by_email_db(db, email)
-    if not user or not verify_password(password, user.password_hash):
+    if not user or not await verify_password(password, user.password_hash):
         return False
+
+    if PWD_CONTEXT.needs_update(user.password_hash):
+        task = asyncio.create_task(rehash_password(user.id, user.password_hash, password))
+        rehash_tasks.add(task)
+        task.add_done_callback(rehash_tasks.discard)
     return user
 
 
+async def rehash_password(user_id, old_hash, password):
+    try:
+        new_hash = await hash_password(password)
+        async with AsyncSessionLocal() as db:
+            await update_password_hash_db(db, user_id, old_hash, new_hash)
+    except Exception:
+        logger.exception(f"Password rehash failed for user {user_id}")
+
+
 def create_password_reset_token(data: dict):
     return jwt.encode(data, SECRET_KEY, algorithm=ALGORITHM)
 
@@ -76,7 +127,7 @@ async def get_access_token_from_cookie(request: Request):
 async def get_current_user(
     db: AsyncSession = Depends(get_db),
     access_token: str = Depends(get_access_token_from_cookie)
-) -> models.User:
+) -> Principal:
     try:
         payload = jwt.decode(
             access_token,
@@ -90,6 +141,19 @@ async def get_current_user(
             detail="Invalid access token"
         )
 
+    if "ver" in payload:
+        if payload["ver"] < token_versions.get(user_id, 0):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Access token has been revoked"
+            )
+        return Principal.from_claims(payload)
+
+    cache_key = (user_id, access_token.rsplit('.', 1)[-1])
+    principal = principal_cache.get(cache_key)
+    if principal is not None:
+        return principal
+
     user = await get_user_by_id_db(db, user_id)
     if not user:
         raise HTTPException(
@@ -97,15 +161,56 @@ async def get_current_user(
             detail="User not found"
         )
 
-    return user
+    principal = Principal.from_user(user, await get_user_role_db(db, user))
+    principal_cache.set(cache_key, principal)
+    return principal
 
 
-def verify_refresh_token(token: str) -> int:
+async def get_websocket_user(websocket: WebSocket) -> Principal | None:
+    access_token = websocket.cookies.get("access_token")
+    if not access_token:
+        return None
+    try:
+        async with AsyncSessionLocal() as db:
+            return await get_current_user(db, access_token)
+    except HTTPException:
+        return None
+
+
+def require_role(*roles):
+    async def check_role(current_user: Principal = Depends(get_current_user)) -> Principal:
+        if current_user.role not in roles:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only admins can access this endpoint.")
+        return current_user
+
+    return check_role
+
+
+async def refresh_token_versions():
+    async with AsyncSessionLocal() as db:
+        versions = await get_token_versions_db(db)
+    for user_id, version in versions.items():
+        if version > token_versions.get(user_id, 0):
+            token_versions[user_id] = version
+
+
+async def refresh_token_versions_forever():
+    while True:
+        try:
+            await refresh_token_versions()
+        except Exception:
+            logger.exception("Token version refresh failed")
+        await asyncio.sleep(TOKEN_VERSIONS_REFRESH_SECONDS)
+
+
+def verify_refresh_token(token: str) -> dict | None:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-        return payload["user_id"]
-    except jwt.InvalidTokenError:
+    except JWTError:
         return None
+    if "user_id" not in payload or "jti" not in payload:
+        return None
+    return payload
 
 
 async def set_user_authorized_state(request: Request, user: models.User):
@@ -128,7 +233,7 @@ async def register_user(db, user):
     if db_user:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail='User already exists!')
 
-    hashed_password = PWD_CONTEXT.hash(user.password)
+    hashed_password = await hash_password(user.password)
     db_user = await register_db(db, user, hashed_password)
     return db_user
 
@@ -136,8 +241,8 @@ async def register_user(db, user):
 async def reset_user_password(db, request):
     user = await get_user_by_email_db(db, request.email)
     if user:
-        reset_token = create_password_reset_token(data={"sub": user.email})
-        await send_password_reset_email(user.email, reset_token)
+        reset_token = create_password_reset_token(data={"sub": user.email, "jti": uuid.uuid4().hex})
+        queue_password_reset_email(db, user.email, reset_token)
         expires_delta = timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
         expire = datetime.utcnow() + expires_delta
         reset_token_obj = await reset_token_db(db, reset_token, expire, user)
@@ -158,8 +263,8 @@ async def reset_password_confirm(db, request):
             user = await get_user_by_token_db(db, token)
 
             if user:
-                user.password_hash = PWD_CONTEXT.hash(request.new_password)
-                user = change_password_db(db, user, token)
+                user.password_hash = await hash_password(request.new_password)
+                user = await change_password_db(db, user, token)
 
                 return user
 
@@ -180,4 +285,25 @@ async def reset_password_confirm(db, request):
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Reset token not found.",
             headers={"WWW-Authenticate": "Bearer"},
-        )
\ No newline at end of file
+        )
+
+
+async def purge_reset_tokens():
+    purged = 0
+    async with AsyncSessionLocal() as db:
+        while True:
+            deleted = await purge_reset_tokens_db(db, RESET_TOKEN_PURGE_BATCH_SIZE)
+            purged += deleted
+            if deleted < RESET_TOKEN_PURGE_BATCH_SIZE:
+                return purged
+
+
+async def purge_reset_tokens_forever():
+    while True:
+        await asyncio.sleep(RESET_TOKEN_PURGE_INTERVAL_SECONDS)
+        try:
+            purged = await purge_reset_tokens()
+            if purged:
+                logger.info(f"Purged {purged} expired reset tokens")
+        except Exception:
+            logger.exception("Reset token purge failed")
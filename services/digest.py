@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import time
+from pathlib import Path
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from config import (timeline_link, DIGEST_INTERVAL_SECONDS, DIGEST_CHECK_SECONDS, DIGEST_FETCH_SIZE,
+                    DIGEST_CHUNK_SIZE, DIGEST_MAX_POSTS)
+from db.async_db import AsyncSessionLocal
+from repository.digest import (lock_digest_db, start_digest_run_db, stream_digest_rows_db, save_digest_chunk_db,
+                               finish_digest_run_db)
+from repository.outbox import BULK_PRIORITY
+from services.metrics import register
+
+
+logger = logging.getLogger(__name__)
+
+templates = Environment(
+    loader=FileSystemLoader(Path(__file__).resolve().parent.parent / 'templates'),
+    autoescape=select_autoescape(),
+    trim_blocks=True,
+    lstrip_blocks=True,
+)
+digest_template = templates.get_template('email/digest.html')
+
+digest_stats = {'runs': 0, 'last_users': 0, 'last_posts': 0, 'last_duration_seconds': 0.0,
+                'last_users_per_second': 0.0}
+register('digest', lambda: dict(digest_stats))
+
+
+def render_digest(user_posts):
+    first = user_posts[0]
+    more = first.total - len(user_posts)
+    subject = f"{first.total} new post{'s' if first.total != 1 else ''} from people you follow"
+    body = digest_template.render(first_name=first.first_name, posts=user_posts, more=more,
+                                  timeline_link=timeline_link)
+    return {'recipient': first.email, 'subject': subject, 'body': body, 'subtype': 'html',
+            'priority': BULK_PRIORITY}
+
+
+async def group_by_user(rows):
+    user_posts = []
+    async for partition in rows.partitions():
+        for row in partition:
+            if user_posts and row.user_id != user_posts[0].user_id:
+                yield user_posts
+                user_posts = []
+            user_posts.append(row)
+    if user_posts:
+        yield user_posts
+
+
+async def run_digest():
+    async with AsyncSessionLocal() as reader, AsyncSessionLocal() as writer:
+        if not await lock_digest_db(reader):
+            return None
+        run = await start_digest_run_db(writer, DIGEST_INTERVAL_SECONDS)
+        if run is None:
+            return None
+
+        started = time.perf_counter()
+        rows = await stream_digest_rows_db(reader, run.window_start, run.window_end, run.last_user_id,
+                                           DIGEST_MAX_POSTS, DIGEST_FETCH_SIZE)
+        emails, posts, last_user_id = [], 0, run.last_user_id
+        async for user_posts in group_by_user(rows):
+            emails.append(render_digest(user_posts))
+            posts += len(user_posts)
+            last_user_id = user_posts[0].user_id
+            if len(emails) >= DIGEST_CHUNK_SIZE:
+                await save_digest_chunk_db(writer, run.id, emails, last_user_id, posts)
+                emails, posts = [], 0
+        await save_digest_chunk_db(writer, run.id, emails, last_user_id, posts)
+
+        totals = await finish_digest_run_db(writer, run.id, time.perf_counter() - started)
+
+    digest_stats.update(
+        runs=digest_stats['runs'] + 1,
+        last_users=totals.users,
+        last_posts=totals.posts,
+        last_duration_seconds=round(totals.duration_seconds, 3),
+        last_users_per_second=round(totals.users / totals.duration_seconds, 1) if totals.duration_seconds else 0.0,
+    )
+    logger.info(f"Digest run {run.id} queued {totals.users} emails covering {totals.posts} posts "
+                f"in {totals.duration_seconds:.1f}s")
+    return totals
+
+
+async def run_digest_forever():
+    while True:
+        await asyncio.sleep(DIGEST_CHECK_SECONDS)
+        try:
+            await run_digest()
+        except Exception:
+            logger.exception("Digest run failed")
@@ -0,0 +1,27 @@
+import hashlib
+from fastapi import Response, status
+from repository.versions import get_table_versions_db
+
+
+def make_etag(versions, *parts):
+    digest = hashlib.blake2b(repr((sorted(versions.items()), parts)).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    opaque = etag.removeprefix('W/')
+    return any(tag.strip().removeprefix('W/') == opaque for tag in if_none_match.split(','))
+
+
+async def check_etag(db, request, tables):
+    versions = await get_table_versions_db(db, tables)
+    etag = make_etag(versions, request.url.path, sorted(request.query_params.multi_items()))
+    return etag, etag_matches(request.headers.get('if-none-match'), etag), versions
+
+
+def not_modified(etag):
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
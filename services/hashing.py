@@ -0,0 +1,63 @@
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException, status
+from config import PWD_CONTEXT, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING
+from services.metrics import register
+
+
+class HashingExecutor:
+    def __init__(self, workers, max_pending, latency_window=1000):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self._latencies = deque(maxlen=latency_window)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash') if workers else None
+
+    async def run(self, fn, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many concurrent logins, try again shortly",
+                headers={"Retry-After": "1"}
+            )
+
+        self.pending += 1
+        started = time.perf_counter()
+        try:
+            if self._executor is None:
+                return fn(*args)
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self.pending -= 1
+            self.completed += 1
+            self._latencies.append((time.perf_counter() - started) * 1000)
+
+    def stats(self):
+        latencies = sorted(self._latencies)
+        return {
+            'workers': self.workers,
+            'in_flight': min(self.pending, self.workers) if self.workers else self.pending,
+            'queue_depth': max(self.pending - self.workers, 0) if self.workers else 0,
+            'max_pending': self.max_pending,
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'latency_p50_ms': round(latencies[len(latencies) // 2], 3) if latencies else None,
+            'latency_p99_ms': round(latencies[int(len(latencies) * 0.99)], 3) if latencies else None,
+        }
+
+
+hashing_executor = HashingExecutor(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING)
+register('password_hashing', hashing_executor.stats)
+
+
+async def hash_password(password):
+    return await hashing_executor.run(PWD_CONTEXT.hash, password)
+
+
+async def verify_password(plain_password, hashed_password):
+    return await hashing_executor.run(PWD_CONTEXT.verify, plain_password, hashed_password)
@@ -1,8 +1,22 @@
-import json
+import asyncio
+import orjson
 import enum
 from dataclasses import dataclass
+from typing import Optional
 import logging
-from connection import ConnectionManager
+from config import (NOTIFICATION_SHARDS, NOTIFICATION_PAYLOAD_LIMIT, NOTIFICATION_DISPATCH_WORKERS,
+                    NOTIFICATION_DISPATCH_CHUNK_SIZE, NOTIFICATION_DISPATCH_POLL_SECONDS,
+                    NOTIFICATION_DISPATCH_LEASE_SECONDS,
+                    NOTIFICATION_REPLAY_PAGE_SIZE, NOTIFICATION_REPLAY_MAX_CONCURRENCY, NOTIFICATION_RETENTION_DAYS, NOTIFICATION_PRUNE_INTERVAL_SECONDS,
+                    NOTIFICATION_PRUNE_BATCH_SIZE)
+from connection import ConnectionManager, ClientConnection
+from db.async_db import AsyncSessionLocal
+from db.listener import PgListener
+from repository.notification import (notify_many_db, add_notifications_db, claim_notification_dispatch_db,
+                                     advance_notification_dispatch_db, finish_notification_dispatch_db,
+                                     get_notifications_page_db, prune_notifications_db)
+from repository.subscription import stream_subscriber_ids_db
+from services.metrics import register
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -17,24 +31,274 @@ class NotificationType(str, enum.Enum):
 class Notification:
     type: NotificationType
     text: str
+    id: Optional[int] = None
 
     def to_json_str(self):
-        return json.dumps({
+        return orjson.dumps({
+            "id": self.id,
             "type": self.type,
             "text": self.text
-        })
+        }).decode()
 
 
-class NotificationService:
-    def __init__(self, conn_manager: ConnectionManager):
+def notification_id(frame: str):
+    return orjson.loads(frame).get("id")
+
+
+def post_notification(notification_id: int, author_id: int):
+    return Notification(
+        id=notification_id,
+        type=NotificationType.new_post,
+        text=f"User with id {author_id} created new post!"
+    )
+
+
+CHANNEL_PREFIX = 'notification_'
+
+
+def chunk_user_ids(frame: str, user_ids: list[int], limit: int):
+    base = len(orjson.dumps({"frame": frame, "users": []}))
+    if base >= limit:
+        raise ValueError(f"Notification frame of {len(frame)} chars does not fit a NOTIFY payload")
+
+    chunk, size = [], base
+    for user_id in user_ids:
+        cost = len(str(user_id)) + 1
+        if chunk and size + cost > limit:
+            yield chunk
+            chunk, size = [], base
+        chunk.append(user_id)
+        size += cost
+    if chunk:
+        yield chunk
+
+
+class NotificationBus:
+    """Fans notifications out to every worker over Postgres LISTEN/NOTIFY.
+
+    Users are sharded over NOTIFICATION_SHARDS channels and each worker only
+    LISTENs on the shards of users it holds sockets for. NOTIFY is
+    transactional, so frames published in a session go out when it commits."""
+
+    def __init__(self, conn_manager: ConnectionManager, shards: int = NOTIFICATION_SHARDS,
+                 payload_limit: int = NOTIFICATION_PAYLOAD_LIMIT):
         self.conn_manager = conn_manager
+        self.shards = shards
+        self.payload_limit = payload_limit
+        self.listener = PgListener([], self.on_notify)
+        self.subscribers = {}
+        self.pending = set()
+        self.published = 0
+        self.received = 0
+
+    def channel(self, user_id: int):
+        return f'{CHANNEL_PREFIX}{user_id % self.shards}'
+
+    async def subscribe(self, user_id: int):
+        channel = self.channel(user_id)
+        self.subscribers[channel] = self.subscribers.get(channel, 0) + 1
+        if self.subscribers[channel] == 1:
+            await self.listener.listen(channel)
+
+    def unsubscribe(self, user_id: int):
+        channel = self.channel(user_id)
+        self.subscribers[channel] -= 1
+        if not self.subscribers[channel]:
+            del self.subscribers[channel]
+            task = asyncio.create_task(self._unlisten(channel))
+            self.pending.add(task)
+            task.add_done_callback(self.pending.discard)
+
+    async def _unlisten(self, channel: str):
+        try:
+            if channel not in self.subscribers:
+                await self.listener.unlisten(channel)
+        except Exception:
+            logger.warning(f"Failed to stop listening on {channel}")
+
+    def on_notify(self, channel: str, payload: str):
+        message = orjson.loads(payload)
+        self.received += 1
+        self.conn_manager.send_multiple(message["users"], message["frame"])
+
+    async def publish(self, db, users: list[int], frame: str):
+        shards = {}
+        for user_id in users:
+            shards.setdefault(self.channel(user_id), []).append(user_id)
+
+        channels, payloads = [], []
+        for channel, user_ids in shards.items():
+            for chunk in chunk_user_ids(frame, user_ids, self.payload_limit):
+                channels.append(channel)
+                payloads.append(orjson.dumps({"frame": frame, "users": chunk}).decode())
+
+        await notify_many_db(db, channels, payloads)
+        self.published += len(payloads)
+        return len(payloads)
+
+    async def run(self):
+        await self.listener.run()
+
+    def stats(self):
+        return {'channels': len(self.subscribers), 'published': self.published, 'received': self.received}
+
+
+class NotificationService:
+    """Stores notifications in the per-user inbox and replays them to reconnecting sockets.
+
+    Replay reads the inbox in keyset pages, each in its own short session that is released
+    before the page is sent, so a slow socket never holds a pooled connection. At most
+    replay_concurrency pages are read at once."""
+
+    def __init__(self, bus: NotificationBus, page_size: int = NOTIFICATION_REPLAY_PAGE_SIZE,
+                 replay_concurrency: int = NOTIFICATION_REPLAY_MAX_CONCURRENCY):
+        self.bus = bus
+        self.page_size = page_size
+        self.replay_slots = asyncio.Semaphore(replay_concurrency)
+        self.replays = 0
+        self.replayed = 0
+        self.pruned = 0
+
+    async def deliver(self, db, users: list[int], notification_id: int, frame: str):
+        await add_notifications_db(db, users, notification_id, frame)
+        return await self.bus.publish(db, users, frame)
+
+    async def replay_page(self, user_id: int, after: int):
+        async with self.replay_slots:
+            async with AsyncSessionLocal() as db:
+                return await get_notifications_page_db(db, user_id, after, self.page_size)
+
+    async def replay(self, connection: ClientConnection, since: int):
+        last_id = since
+        while True:
+            connection.missed = False
+            while True:
+                page = await self.replay_page(connection.user_id, last_id)
+                for notification in page:
+                    await connection.websocket.send_text(notification.payload)
+                connection.manager.touch(connection)
+                if page:
+                    last_id = page[-1].id
+                    self.replayed += len(page)
+                if len(page) < self.page_size:
+                    break
+            if not connection.missed:
+                break
+
+        def is_new(frame):
+            frame_id = notification_id(frame)
+            return frame_id is None or frame_id > last_id
+
+        connection.resume(is_new)
+        self.replays += 1
+        return last_id
+
+    async def prune(self):
+        pruned = 0
+        async with AsyncSessionLocal() as db:
+            while True:
+                deleted = await prune_notifications_db(db, NOTIFICATION_RETENTION_DAYS, NOTIFICATION_PRUNE_BATCH_SIZE)
+                pruned += deleted
+                if deleted < NOTIFICATION_PRUNE_BATCH_SIZE:
+                    self.pruned += pruned
+                    return pruned
+
+    async def prune_forever(self):
+        while True:
+            await asyncio.sleep(NOTIFICATION_PRUNE_INTERVAL_SECONDS)
+            try:
+                pruned = await self.prune()
+                if pruned:
+                    logger.info(f"Pruned {pruned} notifications")
+            except Exception:
+                logger.exception("Notification prune failed")
+
+    def stats(self):
+        return {'replays': self.replays, 'replayed': self.replayed, 'pruned': self.pruned}
+
+
+class PostNotificationDispatcher:
+    """Notifies an author's followers about a new post once it has committed, off the request path.
+
+    The post's transaction also inserts a notification_dispatch row, so a full worker or a crash
+    cannot lose the notification. Workers claim due rows under a lease, stream follower ids past
+    the row's last_subscriber_id from a server-side cursor, and store and publish each chunk in a
+    transaction that also advances last_subscriber_id, so a retry resumes where the last one
+    stopped. submit() only wakes the workers; anything it misses is found on the next poll."""
+
+    def __init__(self, service: NotificationService, workers: int = NOTIFICATION_DISPATCH_WORKERS,
+                 chunk_size: int = NOTIFICATION_DISPATCH_CHUNK_SIZE,
+                 poll_seconds: float = NOTIFICATION_DISPATCH_POLL_SECONDS,
+                 lease_seconds: int = NOTIFICATION_DISPATCH_LEASE_SECONDS):
+        self.service = service
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self.wakeup = asyncio.Event()
+        self.dispatched = 0
+        self.notified = 0
+        self.failed = 0
+
+    def submit(self):
+        self.wakeup.set()
+
+    async def dispatch(self, pending):
+        notified = 0
+        frame = post_notification(pending.id, pending.author_id).to_json_str()
+        async with AsyncSessionLocal() as reader, AsyncSessionLocal() as writer:
+            subscriber_ids = await stream_subscriber_ids_db(reader, pending.author_id, self.chunk_size,
+                                                            pending.last_subscriber_id)
+            async for chunk in subscriber_ids.partitions():
+                await self.service.deliver(writer, chunk, pending.id, frame)
+                await advance_notification_dispatch_db(writer, pending.id, chunk[-1], self.lease_seconds)
+                await writer.commit()
+                notified += len(chunk)
+            await finish_notification_dispatch_db(writer, pending.id)
+        return notified
+
+    async def dispatch_next(self):
+        async with AsyncSessionLocal() as db:
+            pending = await claim_notification_dispatch_db(db, self.lease_seconds)
+        if pending is None:
+            return False
+        try:
+            self.notified += await self.dispatch(pending)
+            self.dispatched += 1
+        except Exception:
+            self.failed += 1
+            logger.exception(f"Failed to dispatch notification {pending.id} of author {pending.author_id} "
+                             f"(attempt {pending.attempts}), retrying in {self.lease_seconds}s")
+        return True
+
+    async def drain(self):
+        while await self.dispatch_next():
+            pass
+
+    async def _work(self):
+        while True:
+            self.wakeup.clear()
+            try:
+                await self.drain()
+            except Exception:
+                logger.exception("Failed to claim new post notifications")
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run(self):
+        await asyncio.gather(*(self._work() for _ in range(self.workers)))
 
-    async def send_new_post_notification(self, users: list[int], author_id: int):
-        await self.conn_manager.send_multiple(users, Notification(
-            type=NotificationType.new_post,
-            text=f"User with id {author_id} created new post!"
-        ).to_json_str())
+    def stats(self):
+        return {'dispatched': self.dispatched, 'notified': self.notified, 'failed': self.failed}
 
 
 manager = ConnectionManager()
-notification_service = NotificationService(manager)
\ No newline at end of file
+notification_bus = NotificationBus(manager)
+notification_service = NotificationService(notification_bus)
+post_dispatcher = PostNotificationDispatcher(notification_service)
+register('websocket', manager.stats)
+register('notification_bus', notification_bus.stats)
+register('post_notifications', post_dispatcher.stats)
+register('notification_inbox', notification_service.stats)
\ No newline at end of file
@@ -0,0 +1,164 @@
+import asyncio
+import logging
+import time
+from email.message import EmailMessage
+from email.utils import formataddr
+import aiosmtplib
+from config import (Envs, EMAIL_OUTBOX_BATCH_SIZE, EMAIL_OUTBOX_POLL_SECONDS, EMAIL_OUTBOX_LEASE_SECONDS,
+                    EMAIL_OUTBOX_MAX_ATTEMPTS, EMAIL_OUTBOX_RETRY_BASE_SECONDS, EMAIL_OUTBOX_RETRY_MAX_SECONDS,
+                    EMAIL_SMTP_TIMEOUT_SECONDS, EMAIL_SMTP_IDLE_SECONDS)
+from db.async_db import AsyncSessionLocal
+from repository.outbox import claim_outbox_batch_db, mark_outbox_sent_db, mark_outbox_failed_db
+from services.metrics import register
+
+
+logger = logging.getLogger(__name__)
+
+
+class SMTPMailer:
+    def __init__(self, hostname, port, sender, username=None, password=None, start_tls=True, use_tls=False,
+                 timeout=EMAIL_SMTP_TIMEOUT_SECONDS, idle_seconds=EMAIL_SMTP_IDLE_SECONDS):
+        self.hostname = hostname
+        self.port = port
+        self.sender = sender
+        self.username = username
+        self.password = password
+        self.start_tls = start_tls
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self.idle_seconds = idle_seconds
+        self._smtp = None
+        self._last_used = 0.0
+        self.connections = 0
+        self.sent = 0
+
+    async def _connect(self):
+        smtp = aiosmtplib.SMTP(hostname=self.hostname, port=self.port, timeout=self.timeout,
+                               use_tls=self.use_tls, start_tls=self.start_tls)
+        await smtp.connect()
+        if self.username:
+            await smtp.login(self.username, self.password)
+        self.connections += 1
+        return smtp
+
+    def message(self, recipient, subject, body, subtype='html'):
+        message = EmailMessage()
+        message['From'] = self.sender
+        message['To'] = recipient
+        message['Subject'] = subject
+        message.set_content(body, subtype=subtype)
+        return message
+
+    async def send(self, recipient, subject, body, subtype='html'):
+        message = self.message(recipient, subject, body, subtype)
+        reused = self._smtp is not None
+        if not reused:
+            self._smtp = await self._connect()
+        try:
+            await self._smtp.send_message(message)
+        except aiosmtplib.SMTPServerDisconnected:
+            self._smtp = None
+            if not reused:
+                raise
+            self._smtp = await self._connect()
+            await self._smtp.send_message(message)
+        except (aiosmtplib.SMTPConnectError, aiosmtplib.SMTPTimeoutError):
+            await self.close()
+            raise
+        self._last_used = time.monotonic()
+        self.sent += 1
+
+    async def close_idle(self):
+        if self._smtp is not None and time.monotonic() - self._last_used > self.idle_seconds:
+            await self.close()
+
+    async def close(self):
+        smtp, self._smtp = self._smtp, None
+        if smtp is None:
+            return
+        try:
+            await smtp.quit()
+        except aiosmtplib.SMTPException:
+            smtp.close()
+
+    def stats(self):
+        return {'connected': self._smtp is not None, 'connections': self.connections, 'sent': self.sent}
+
+
+class OutboxWorker:
+    def __init__(self, mailer, batch_size=EMAIL_OUTBOX_BATCH_SIZE, poll_seconds=EMAIL_OUTBOX_POLL_SECONDS,
+                 lease_seconds=EMAIL_OUTBOX_LEASE_SECONDS, max_attempts=EMAIL_OUTBOX_MAX_ATTEMPTS,
+                 retry_base_seconds=EMAIL_OUTBOX_RETRY_BASE_SECONDS,
+                 retry_max_seconds=EMAIL_OUTBOX_RETRY_MAX_SECONDS):
+        self.mailer = mailer
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.batches = 0
+        self.retried = 0
+        self.failed = 0
+
+    def retry_in(self, attempts):
+        if attempts >= self.max_attempts:
+            return None
+        return min(self.retry_base_seconds * 2 ** (attempts - 1), self.retry_max_seconds)
+
+    async def deliver_batch(self):
+        async with AsyncSessionLocal() as db:
+            batch = await claim_outbox_batch_db(db, self.batch_size, self.lease_seconds)
+        if not batch:
+            return 0
+
+        sent, failures = [], []
+        for email in batch:
+            try:
+                await self.mailer.send(email.recipient, email.subject, email.body, email.subtype)
+                sent.append(email.id)
+            except Exception as e:
+                retry_in = self.retry_in(email.attempts)
+                failures.append((email.id, f"{type(e).__name__}: {e}"[:1000], retry_in))
+                if retry_in is None:
+                    self.failed += 1
+                    logger.error(f"Giving up on outbox email {email.id} after {email.attempts} attempts: {e}")
+                else:
+                    self.retried += 1
+                    logger.warning(f"Outbox email {email.id} failed, retrying in {retry_in}s: {e}")
+
+        async with AsyncSessionLocal() as db:
+            await mark_outbox_sent_db(db, sent)
+            await mark_outbox_failed_db(db, failures)
+        self.batches += 1
+        return len(batch)
+
+    async def run(self):
+        try:
+            while True:
+                try:
+                    claimed = await self.deliver_batch()
+                except Exception:
+                    logger.exception("Email outbox delivery failed")
+                    claimed = 0
+                if claimed < self.batch_size:
+                    await self.mailer.close_idle()
+                    await asyncio.sleep(self.poll_seconds)
+        finally:
+            await self.mailer.close()
+
+    def stats(self):
+        return {'batches': self.batches, 'retried': self.retried, 'failed': self.failed, **self.mailer.stats()}
+
+
+mailer = SMTPMailer(
+    Envs.MAIL_SERVER,
+    Envs.MAIL_PORT,
+    formataddr((Envs.MAIL_FROM_NAME, Envs.MAIL_FROM)) if Envs.MAIL_FROM_NAME else Envs.MAIL_FROM,
+    username=Envs.MAIL_USERNAME,
+    password=Envs.MAIL_PASSWORD,
+    start_tls=Envs.MAIL_STARTTLS,
+    use_tls=Envs.MAIL_SSL_TLS,
+)
+outbox_worker = OutboxWorker(mailer)
+register('email_outbox', outbox_worker.stats)
@@ -0,0 +1,39 @@
+import base64
+import json
+from datetime import datetime
+from fastapi import status, HTTPException
+
+
+def encode_cursor(*values):
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list):
+            raise ValueError
+        return values
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def decode_post_cursor(cursor: str):
+    values = decode_cursor(cursor)
+    try:
+        created_at, post_id = values
+        return datetime.fromisoformat(created_at), int(post_id)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def decode_score_cursor(cursor: str):
+    values = decode_cursor(cursor)
+    try:
+        score, row_id = values
+        return float(score), int(row_id)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
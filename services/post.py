@@ -1,11 +1,20 @@
-from repository.post import get_post_db, delete_post_db, update_post_db, create_post_db, get_all_posts_db
+import hashlib
+from datetime import datetime
+from repository.post import (get_post_db, delete_post_db, update_post_db, create_post_db, get_all_posts_db,
+                             response_cache)
 from repository.topic import get_topic_db
-from services.subscription import get_user_sub_in
-from services.notification import notification_service
+from repository.notification import add_notification_dispatch_db
+from services.notification import post_dispatcher
 from services.files import file_manager
+from services.pagination import decode_post_cursor
+from services.timeline import fan_out_post
+from services.metrics import register
 from fastapi import status, HTTPException
 
 
+register('response_cache', response_cache.stats)
+
+
 async def delete_posts(db, post_id, user):
     try:
         post = await get_post_db(db, post_id)
@@ -66,17 +75,44 @@ async def update_post_serv(db, post_id, title, topic_id, content, file, user):
 
 
 async def create_post_with_notification(db, title, topic_id, content, file, current_user):
-    subscriptions = await get_user_sub_in(db, current_user)
-    subscription_user_ids = [sub.subscriber_id for sub in subscriptions]
-    await notification_service.send_new_post_notification(subscription_user_ids, current_user.id)
     file_path = None
     if file:
         file_path = f'static/posts/{file.filename}'
         await file_manager.save_file(file, file_path)
+    add_notification_dispatch_db(db, current_user.id)
     post = await create_post_db(db, title, topic_id, content, file_path, current_user)
+    await fan_out_post(db, post)
+    post_dispatcher.submit()
     return post
 
 
-async def get_all_posts(db, topic_ids, start_date, end_date,content, last_viewed_at, page, current_user):
-    all_posts = await get_all_posts_db(db, topic_ids, start_date, end_date,content, last_viewed_at, page, current_user)
-    return all_posts
\ No newline at end of file
+async def get_all_posts(db, topic_ids, start_date, end_date,content, last_viewed_at, page, current_user, cursor=None,
+                        include_total=True, q=None):
+    after = decode_post_cursor(cursor) if cursor else None
+    all_posts, total_count = await get_all_posts_db(db, topic_ids, start_date, end_date,content, last_viewed_at, page,
+                                                    current_user, after, include_total, q)
+    return all_posts, total_count
+
+
+def posts_page_cache_key(versions, topic_ids, start_date, end_date, content, q, last_viewed_at, page, cursor,
+                         include_total):
+    try:
+        topic_id_list = sorted({int(topic_id.strip()) for topic_id in topic_ids.split(',')}) if topic_ids else []
+        dates = tuple(datetime.fromisoformat(value).isoformat() if value is not None else None
+                      for value in (start_date, end_date, last_viewed_at))
+    except ValueError:
+        return None
+
+    content = content.lower() if content else None
+    q = q.strip() if q else None
+    params = (sorted(versions.items()), topic_id_list, dates, content, q or None, None if cursor else page, cursor,
+              include_total)
+    return 'posts:' + hashlib.blake2b(repr(params).encode(), digest_size=16).hexdigest()
+
+
+async def get_cached_posts_page(cache_key):
+    return await response_cache.get(cache_key)
+
+
+async def cache_posts_page(cache_key, body):
+    await response_cache.set(cache_key, body)
@@ -0,0 +1,191 @@
+import asyncio
+import logging
+import math
+import time
+from fastapi import HTTPException, Request, status
+from cache import RedisClient, RedisError
+from config import (RATE_LIMIT_URL, AUTH_RATE_LIMIT_IP_PER_MINUTE, AUTH_RATE_LIMIT_IP_BURST,
+                    AUTH_RATE_LIMIT_ACCOUNT_PER_MINUTE, AUTH_RATE_LIMIT_ACCOUNT_BURST,
+                    AUTH_RATE_LIMIT_ACCOUNT_TOTAL_PER_MINUTE, AUTH_RATE_LIMIT_ACCOUNT_TOTAL_BURST,
+                    AUTH_MAX_CONCURRENCY, RATE_LIMIT_SWEEP_INTERVAL_SECONDS)
+from services.metrics import register
+
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucketLimiter:
+    """Per-key token buckets stored as [tokens, last_refill] pairs in a dict."""
+
+    def __init__(self, per_minute: float, burst: int):
+        self.rate = per_minute / 60
+        self.burst = burst
+        self.limited = 0
+        self._buckets: dict = {}
+
+    def take(self, key, now):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            self._buckets[key] = [self.burst - 1, now]
+            return 0.0
+
+        tokens = bucket[0] + (now - bucket[1]) * self.rate
+        if tokens > self.burst:
+            tokens = self.burst
+        bucket[1] = now
+        if tokens >= 1:
+            bucket[0] = tokens - 1
+            return 0.0
+
+        bucket[0] = tokens
+        self.limited += 1
+        return (1 - tokens) / self.rate
+
+    async def hit(self, key):
+        return self.take(key, time.monotonic())
+
+    def sweep(self, now):
+        full_after = self.burst / self.rate
+        stale = [key for key, (tokens, refilled) in self._buckets.items() if now - refilled >= full_after]
+        for key in stale:
+            del self._buckets[key]
+        return len(stale)
+
+    def stats(self):
+        return {'backend': 'memory', 'keys': len(self._buckets), 'limited': self.limited}
+
+
+TOKEN_BUCKET_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local bucket = redis.call('HMGET', KEYS[1], 't', 's')
+local tokens = tonumber(bucket[1]) or burst
+local refilled = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + (now - refilled) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 't', tokens, 's', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000))
+return tostring(wait)
+"""
+
+
+class RedisTokenBucketLimiter:
+    """Token buckets shared by all workers; falls back to the local limiter if Redis is unreachable."""
+
+    def __init__(self, client, name, per_minute: float, burst: int):
+        self.client = client
+        self.prefix = f'ratelimit:{name}:'
+        self.fallback = TokenBucketLimiter(per_minute, burst)
+        self.rate = self.fallback.rate
+        self.burst = burst
+        self.limited = 0
+        self.errors = 0
+
+    async def hit(self, key):
+        try:
+            wait = float(await self.client.execute('EVAL', TOKEN_BUCKET_SCRIPT, 1, self.prefix + key,
+                                                   self.rate, self.burst))
+        except (OSError, asyncio.TimeoutError, RedisError):
+            logger.warning("Shared rate limiter unavailable, using the local one", exc_info=True)
+            self.errors += 1
+            return await self.fallback.hit(key)
+        if wait:
+            self.limited += 1
+        return wait
+
+    def sweep(self, now):
+        return self.fallback.sweep(now)
+
+    def stats(self):
+        return {'backend': 'redis', 'limited': self.limited, 'errors': self.errors}
+
+
+class ConcurrencyLimiter:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_flight = 0
+        self.rejected = 0
+
+    async def __call__(self):
+        if self.in_flight >= self.limit:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, try again shortly",
+                headers={"Retry-After": "1"}
+            )
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+
+    def stats(self):
+        return {'limit': self.limit, 'in_flight': self.in_flight, 'rejected': self.rejected}
+
+
+def create_limiter(name, per_minute, burst):
+    if RATE_LIMIT_URL:
+        return RedisTokenBucketLimiter(shared_client, name, per_minute, burst)
+    return TokenBucketLimiter(per_minute, burst)
+
+
+shared_client = RedisClient(RATE_LIMIT_URL) if RATE_LIMIT_URL else None
+auth_ip_limiter = create_limiter('auth-ip', AUTH_RATE_LIMIT_IP_PER_MINUTE, AUTH_RATE_LIMIT_IP_BURST)
+auth_account_limiter = create_limiter('auth-account', AUTH_RATE_LIMIT_ACCOUNT_PER_MINUTE,
+                                      AUTH_RATE_LIMIT_ACCOUNT_BURST)
+auth_account_total_limiter = create_limiter('auth-account-total', AUTH_RATE_LIMIT_ACCOUNT_TOTAL_PER_MINUTE,
+                                            AUTH_RATE_LIMIT_ACCOUNT_TOTAL_BURST)
+auth_concurrency = ConcurrencyLimiter(AUTH_MAX_CONCURRENCY)
+
+register('auth_rate_limit', lambda: {
+    'ip': auth_ip_limiter.stats(),
+    'account': auth_account_limiter.stats(),
+    'account_total': auth_account_total_limiter.stats(),
+    'concurrency': auth_concurrency.stats(),
+})
+
+
+def too_many_requests(wait):
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many requests, try again later",
+        headers={"Retry-After": str(math.ceil(wait))}
+    )
+
+
+def client_host(request: Request):
+    return request.client.host if request.client else 'unknown'
+
+
+async def limit_auth_by_ip(request: Request):
+    wait = await auth_ip_limiter.hit(client_host(request))
+    if wait:
+        raise too_many_requests(wait)
+
+
+async def limit_auth_by_account(request: Request, account: str):
+    """Tight buckets per (account, client IP) so one client cannot lock the owner out, plus a
+    much looser bucket per account that only many IPs together can drain."""
+    account = account.strip().lower()
+    wait = max(await auth_account_limiter.hit(f'{account}|{client_host(request)}'),
+               await auth_account_total_limiter.hit(account))
+    if wait:
+        raise too_many_requests(wait)
+
+
+async def sweep_rate_limits_forever():
+    while True:
+        await asyncio.sleep(RATE_LIMIT_SWEEP_INTERVAL_SECONDS)
+        now = time.monotonic()
+        swept = (auth_ip_limiter.sweep(now) + auth_account_limiter.sweep(now)
+                 + auth_account_total_limiter.sweep(now))
+        if swept:
+            logger.info(f"Swept {swept} idle rate limit buckets")
@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import time
+from datetime import timezone
+from cache import RevocationFilter
+from config import (REFRESH_REVOCATION_CAPACITY, REFRESH_REVOCATION_ERROR_RATE,
+                    REFRESH_REVOCATION_PRUNE_INTERVAL_SECONDS, REFRESH_REVOCATION_PURGE_BATCH_SIZE,
+                    REFRESH_REVOCATION_FLUSH_INTERVAL_SECONDS, REFRESH_REVOCATION_FLUSH_BATCH_SIZE,
+                    REFRESH_REVOCATION_FLUSH_MAX_ATTEMPTS)
+from db.async_db import AsyncSessionLocal
+from db.listener import PgListener
+from repository.auth import (REVOKED_TOKENS_CHANNEL, revoke_refresh_tokens_db, get_live_revocations_db,
+                             purge_revocations_db)
+from services.metrics import register
+
+
+logger = logging.getLogger(__name__)
+
+revoked_refresh_tokens = RevocationFilter(REFRESH_REVOCATION_CAPACITY, REFRESH_REVOCATION_ERROR_RATE)
+pending_revocations = []
+dropped_revocations = 0
+register('refresh_revocations', lambda: {**revoked_refresh_tokens.stats(), 'pending': len(pending_revocations),
+                                         'dropped': dropped_revocations})
+
+
+def is_refresh_token_revoked(jti):
+    return jti in revoked_refresh_tokens
+
+
+def revoke_refresh_token(payload):
+    """Revoke a refresh token in memory; the row and the NOTIFY follow in the next flush.
+
+    Returns False if the token was already revoked."""
+    if payload["jti"] in revoked_refresh_tokens:
+        return False
+    revoked_refresh_tokens.add(payload["jti"], payload["exp"])
+    pending_revocations.append((payload["jti"], payload["user_id"], payload["exp"], 0))
+    return True
+
+
+def next_revocation_batch():
+    """Fresh revocations are written together; ones that already failed go one at a time, so a bad
+    row cannot keep failing the batch of everything queued after it."""
+    if pending_revocations[0][3]:
+        return pending_revocations[:1]
+    batch = pending_revocations[:REFRESH_REVOCATION_FLUSH_BATCH_SIZE]
+    return batch[:next((index for index, entry in enumerate(batch) if entry[3]), len(batch))]
+
+
+async def flush_revocations():
+    global dropped_revocations
+    while pending_revocations:
+        batch = next_revocation_batch()
+        del pending_revocations[:len(batch)]
+        try:
+            async with AsyncSessionLocal() as db:
+                inserted = await revoke_refresh_tokens_db(db, [entry[:3] for entry in batch])
+        except Exception:
+            retry, dropped = [], []
+            for jti, user_id, expires_at, attempts in batch:
+                if attempts + 1 < REFRESH_REVOCATION_FLUSH_MAX_ATTEMPTS:
+                    retry.append((jti, user_id, expires_at, attempts + 1))
+                else:
+                    dropped.append(jti)
+            if dropped:
+                dropped_revocations += len(dropped)
+                logger.error(f"Dropping refresh token revocations {', '.join(dropped)} after "
+                             f"{REFRESH_REVOCATION_FLUSH_MAX_ATTEMPTS} failed writes")
+            pending_revocations.extend(retry)
+            raise
+        except BaseException:
+            pending_revocations[:0] = batch
+            raise
+        for jti, user_id, _, _ in batch:
+            if jti not in inserted:
+                logger.warning(f"Refresh token {jti} of user {user_id} was also used on another worker")
+
+
+async def flush_revocations_forever():
+    try:
+        while True:
+            await asyncio.sleep(REFRESH_REVOCATION_FLUSH_INTERVAL_SECONDS)
+            try:
+                await flush_revocations()
+            except Exception:
+                logger.exception("Refresh token revocation flush failed")
+    except asyncio.CancelledError:
+        try:
+            await flush_revocations()
+        except Exception:
+            logger.exception("Final refresh token revocation flush failed")
+        raise
+
+
+def on_revocation(channel, payload):
+    jti, expires_at = payload.rsplit(':', 1)
+    revoked_refresh_tokens.add(jti, float(expires_at))
+
+
+async def load_revocations():
+    async with AsyncSessionLocal() as db:
+        revocations = await get_live_revocations_db(db)
+    for jti, expires_at in revocations:
+        revoked_refresh_tokens.add(jti, expires_at.replace(tzinfo=timezone.utc).timestamp())
+    logger.info(f"Loaded {len(revocations)} refresh token revocations")
+
+
+revocation_listener = PgListener([REVOKED_TOKENS_CHANNEL], on_revocation, on_connect=load_revocations)
+
+
+async def purge_revocations():
+    purged = 0
+    async with AsyncSessionLocal() as db:
+        while True:
+            deleted = await purge_revocations_db(db, REFRESH_REVOCATION_PURGE_BATCH_SIZE)
+            purged += deleted
+            if deleted < REFRESH_REVOCATION_PURGE_BATCH_SIZE:
+                return purged
+
+
+async def prune_revocations_forever():
+    while True:
+        await asyncio.sleep(REFRESH_REVOCATION_PRUNE_INTERVAL_SECONDS)
+        try:
+            revoked_refresh_tokens.prune(time.time())
+            purged = await purge_revocations()
+            if purged:
+                logger.info(f"Purged {purged} expired refresh token revocations")
+        except Exception:
+            logger.exception("Refresh token revocation purge failed")
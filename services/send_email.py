@@ -1,12 +1,13 @@
-from fastapi_mail import FastMail, MessageSchema
-from config import conf, reset_link
+from config import reset_link
+from repository.outbox import add_outbox_email_db
 
 
-async def send_password_reset_email(email: str, reset_token: str):
+def queue_password_reset_email(db, email: str, reset_token: str):
 
-    message = MessageSchema(
+    return add_outbox_email_db(
+        db,
+        recipient=email,
         subject="Password Reset Request",
-        recipients=[email],
         body=f"""
         Dear user,
 
@@ -22,6 +23,3 @@ async def send_password_reset_email(email: str, reset_token: str):
         """,
         subtype="html"
     )
-
-    fm = FastMail(conf)
-    await fm.send_message(message)
\ No newline at end of file
@@ -0,0 +1,24 @@
+import orjson
+from fastapi import Response
+from pydantic import TypeAdapter
+
+
+def rows_adapter(model):
+    return TypeAdapter(list[model])
+
+
+def serialize_rows(adapter, rows):
+    return adapter.dump_python(adapter.validate_python(rows, from_attributes=True))
+
+
+def json_response(content, status_code=200, headers=None):
+    return Response(
+        content=orjson.dumps(content),
+        status_code=status_code,
+        headers=headers,
+        media_type='application/json'
+    )
+
+
+def raw_json_response(body, status_code=200, headers=None):
+    return Response(content=body, status_code=status_code, headers=headers, media_type='application/json')
@@ -1,6 +1,7 @@
 from repository.subscription import (search_subscriptions_db,  get_user_subscriptions_on_db, delete_subscription_db,
                                      get_subscribed_db, check_existing_subscription_db, create_new_subscription_db,
                                      get_subscription_db)
+from repository.timeline import remove_author_from_timeline_db
 from fastapi import status, HTTPException
 
 
@@ -59,6 +60,7 @@ async def delete_sub(db, subscribed_id, current_user):
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
                                 detail="Forbidden: Cannot unsubscribe from a banned user")
 
+        await remove_author_from_timeline_db(db, current_user.id, subscribed_id)
         subscriptions = await delete_subscription_db(db, subscription)
 
         return subscriptions
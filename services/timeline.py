@@ -0,0 +1,56 @@
+import asyncio
+import logging
+from fastapi import status, HTTPException
+from config import (TIMELINE_FANOUT_MAX_FOLLOWERS, TIMELINE_MAX_LENGTH, TIMELINE_TRIM_INTERVAL_SECONDS,
+                    TIMELINE_TRIM_USER_BATCH_SIZE)
+from db.async_db import AsyncSessionLocal
+from repository.timeline import (is_popular_author_db, fan_out_post_db, get_pushed_timeline_db,
+                                 get_pulled_timeline_db, get_overfull_timelines_db, trim_timelines_db)
+from services.pagination import decode_post_cursor
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TIMELINE_PAGE_SIZE = 10
+
+
+async def fan_out_post(db, post):
+    if await is_popular_author_db(db, post.user_id, TIMELINE_FANOUT_MAX_FOLLOWERS):
+        return False
+    await fan_out_post_db(db, post)
+    return True
+
+
+async def get_timeline(db, cursor, current_user):
+    if current_user.banned_is:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+
+    after = decode_post_cursor(cursor) if cursor else None
+    pushed = await get_pushed_timeline_db(db, current_user.id, after, TIMELINE_PAGE_SIZE)
+    pulled = await get_pulled_timeline_db(db, current_user.id, after, TIMELINE_PAGE_SIZE)
+
+    merged = {post.id: post for post in [*pushed, *pulled]}
+    timeline = sorted(merged.values(), key=lambda post: (post.posted_at, post.id), reverse=True)
+    return timeline[:TIMELINE_PAGE_SIZE]
+
+
+async def trim_timelines():
+    trimmed = 0
+    async with AsyncSessionLocal() as db:
+        user_ids = await get_overfull_timelines_db(db, TIMELINE_MAX_LENGTH)
+        for start in range(0, len(user_ids), TIMELINE_TRIM_USER_BATCH_SIZE):
+            trimmed += await trim_timelines_db(db, user_ids[start:start + TIMELINE_TRIM_USER_BATCH_SIZE],
+                                               TIMELINE_MAX_LENGTH)
+    return trimmed
+
+
+async def trim_timelines_forever():
+    while True:
+        await asyncio.sleep(TIMELINE_TRIM_INTERVAL_SECONDS)
+        try:
+            trimmed = await trim_timelines()
+            if trimmed:
+                logger.info(f"Trimmed {trimmed} timeline entries")
+        except Exception:
+            logger.exception("Timeline trim failed")
@@ -1,16 +1,9 @@
-from repository.user import ban_user_db, get_all_users_db, search_users_db, get_user_role_db, get_user_by_id_db
-from fastapi import status, HTTPException
+from repository.user import ban_user_db, get_all_users_db, search_users_db, get_user_by_id_db
+from fastapi import HTTPException
+from services.pagination import decode_score_cursor
 
 
-async def user_ban(db, user_id, ban, current_user,):
-    try:
-        user_role = await get_user_role_db(db, current_user)
-
-        if user_role.name not in ['admin', 'superadmin']:
-            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only admins can access this endpoint.")
-    except Exception as e:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
-
+async def user_ban(db, user_id, ban):
     user = await get_user_by_id_db(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -25,22 +18,15 @@ async def user_ban(db, user_id, ban, current_user,):
     return user
 
 
-async def get_all_users(db, sex_id, country_id, name, order_by, sort_direction, page, current_user):
-    try:
-        user_role = await get_user_role_db(db, current_user)
-
-        if not user_role.name in ['admin', 'superadmin']:
-            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only admins can access this endpoint.")
-    except Exception as e:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
-
+async def get_all_users(db, sex_id, country_id, name, order_by, sort_direction, page):
     user_list = await get_all_users_db(db, sex_id, country_id, name, order_by, sort_direction, page)
     return user_list
 
 
-async def search(db, name):
-    user_list = await search_users_db(db, name)
-    return user_list
+async def search(db, name, page, cursor=None):
+    after = decode_score_cursor(cursor) if cursor else None
+    user_list, last_key = await search_users_db(db, name, page, after)
+    return user_list, last_key
 
 
 
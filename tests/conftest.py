@@ -0,0 +1,40 @@
+import asyncio
+import os
+import pytest
+from tests.fake_redis import FakeRedis
+
+
+@pytest.fixture(scope='session')
+def anyio_backend():
+    return 'asyncio'
+
+
+@pytest.fixture(scope='session')
+def database_url():
+    """Modules that import db.async_db build the engine at import time and need the URL."""
+    url = os.getenv('SQLALCHEMY_DATABASE_URL')
+    if not url:
+        pytest.skip("SQLALCHEMY_DATABASE_URL is not set")
+    return url
+
+
+@pytest.fixture(scope='session')
+async def engine(anyio_backend, database_url):
+    from sqlalchemy import text
+    from db.async_db import engine
+
+    try:
+        async with engine.connect() as conn:
+            await asyncio.wait_for(conn.execute(text("SELECT 1")), 5)
+    except Exception as error:
+        pytest.skip(f"Postgres is not reachable: {error}")
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+async def fake_redis():
+    server = FakeRedis()
+    url = await server.start()
+    yield server, url
+    await server.stop()
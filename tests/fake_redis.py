@@ -0,0 +1,63 @@
+"""In-process stand-in for a Redis server, shared by the cache and rate limiter tests."""
+import asyncio
+
+
+class FakeRedis:
+    """Just enough of a Redis server for RedisCache: GET and SET ... PX.
+
+    While stalled it answers with half a bulk reply and then hangs, like a
+    server that dies mid-reply.
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.stalled = 0
+        self.commands = 0
+        self.release = asyncio.Event()
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, '127.0.0.1', 0)
+        return f"redis://127.0.0.1:{self.server.sockets[0].getsockname()[1]}/0"
+
+    async def stop(self):
+        self.release.set()
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                args = await self.read_command(reader)
+                self.commands += 1
+                if self.stalled:
+                    self.stalled -= 1
+                    writer.write(b'$5\r\nhe')
+                    await writer.drain()
+                    await self.release.wait()
+                    return
+                writer.write(self.reply(args))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def read_command(reader):
+        count = int((await reader.readuntil(b'\r\n'))[1:-2])
+        args = []
+        for _ in range(count):
+            length = int((await reader.readuntil(b'\r\n'))[1:-2])
+            args.append((await reader.readexactly(length + 2))[:-2])
+        return args
+
+    def reply(self, args):
+        command = args[0].upper()
+        if command == b'GET':
+            value = self.data.get(args[1])
+            return b'$-1\r\n' if value is None else b'$%d\r\n%s\r\n' % (len(value), value)
+        if command == b'SET':
+            self.data[args[1]] = args[2]
+            return b'+OK\r\n'
+        return b'-ERR unknown command\r\n'
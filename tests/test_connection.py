@@ -0,0 +1,53 @@
+"""WebSocket registry: the opt-in application heartbeat."""
+import pytest
+
+
+pytestmark = pytest.mark.anyio
+
+
+class SilentSocket:
+    def __init__(self):
+        self.received = 0
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        self.received += 1
+
+    async def close(self, code=1000):
+        pass
+
+
+def silent_for(connection, seconds):
+    connection.last_seen -= seconds
+
+
+async def test_silent_sockets_stay_without_the_app_heartbeat():
+    from connection import ConnectionManager
+
+    manager = ConnectionManager(app_heartbeat=False, ping_interval=1, idle_timeout=2, tick=1)
+    connection = await manager.connect(1, SilentSocket())
+    silent_for(connection, 10)
+    for _ in range(len(manager.wheel) * 2):
+        manager.sweep()
+
+    assert manager.connections == 1
+    assert (manager.pings, manager.evicted_connections) == (0, 0)
+    assert connection.websocket.received == 0
+
+
+async def test_app_heartbeat_pings_then_evicts_silent_sockets():
+    from connection import ConnectionManager
+
+    manager = ConnectionManager(app_heartbeat=True, ping_interval=1, idle_timeout=2, tick=1)
+    connection = await manager.connect(1, SilentSocket())
+    silent_for(connection, 1.5)
+    manager.sweep()
+    assert manager.pings == 1
+
+    silent_for(connection, 10)
+    for _ in range(len(manager.wheel)):
+        manager.sweep()
+    assert manager.connections == 0
+    assert manager.evicted_connections == 1
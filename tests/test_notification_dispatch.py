@@ -0,0 +1,99 @@
+"""New post notifications: the dispatch row committed with the post and the
+dispatcher working through it in chunks, resuming after the last follower."""
+import uuid
+from types import SimpleNamespace
+import pytest
+from sqlalchemy import delete, func, select, text
+
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def author(engine):
+    import models
+    from db.async_db import AsyncSessionLocal
+    from benchmarks.common import seed_user
+
+    async with AsyncSessionLocal() as db:
+        if await db.scalar(select(func.count()).select_from(models.NotificationDispatch)):
+            pytest.skip("notification_dispatch already holds rows that the dispatcher would claim")
+        prefix = f'dispatch_{uuid.uuid4().hex[:8]}'
+        author_id = await seed_user(db, nickname=f'{prefix}_author')
+        follower_ids = [await seed_user(db, nickname=f'{prefix}_{n}') for n in range(3)]
+        db.add_all(models.Subscription(subscriber_id=follower_id, subscribed_id=author_id)
+                   for follower_id in follower_ids)
+        await db.commit()
+
+    yield SimpleNamespace(id=author_id), sorted(follower_ids)
+
+    async with AsyncSessionLocal() as db:
+        users = [author_id, *follower_ids]
+        await db.execute(delete(models.Subscription).where(models.Subscription.subscribed_id == author_id))
+        await db.execute(delete(models.Post).where(models.Post.user_id == author_id))
+        await db.execute(delete(models.User).where(models.User.id.in_(users)))
+        await db.commit()
+
+
+async def inbox(user_ids):
+    import models
+    from db.async_db import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(models.Notification.user_id, models.Notification.id)
+            .where(models.Notification.user_id.in_(user_ids))
+            .order_by(models.Notification.user_id)
+        )
+        return result.all()
+
+
+async def pending_dispatches(author_id):
+    import models
+    from db.async_db import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(models.NotificationDispatch.id).where(models.NotificationDispatch.author_id == author_id)
+        )
+        return result.scalars().all()
+
+
+def dispatcher():
+    from services.notification import notification_service, PostNotificationDispatcher
+
+    return PostNotificationDispatcher(notification_service, chunk_size=2)
+
+
+async def test_post_commits_a_dispatch_that_notifies_every_follower(author):
+    from db.async_db import AsyncSessionLocal
+    from services.post import create_post_with_notification
+
+    current_user, follower_ids = author
+    async with AsyncSessionLocal() as db:
+        await create_post_with_notification(db, 'Dispatch test', None, 'body', None, current_user)
+    [notification_id] = await pending_dispatches(current_user.id)
+
+    worker = dispatcher()
+    await worker.drain()
+
+    assert await inbox(follower_ids) == [(follower_id, notification_id) for follower_id in follower_ids]
+    assert await pending_dispatches(current_user.id) == []
+    assert (worker.dispatched, worker.notified, worker.failed) == (1, 3, 0)
+
+
+async def test_dispatch_resumes_after_the_last_notified_follower(author):
+    from db.async_db import AsyncSessionLocal
+
+    current_user, follower_ids = author
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(text(
+            "INSERT INTO notification_dispatch (author_id, last_subscriber_id) VALUES (:author, :last) RETURNING id"
+        ), {"author": current_user.id, "last": follower_ids[0]})
+        notification_id = result.scalar()
+        await db.commit()
+
+    await dispatcher().drain()
+
+    assert await inbox(follower_ids) == [(follower_id, notification_id) for follower_id in follower_ids[1:]]
+    assert await pending_dispatches(current_user.id) == []
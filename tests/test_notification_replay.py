@@ -0,0 +1,110 @@
+"""Notification feed: replay on reconnect in keyset pages read without
+holding a pooled connection while sending, and every socket gated on the
+caller's own access token."""
+import uuid
+import pytest
+from sqlalchemy import delete
+from starlette.websockets import WebSocketDisconnect
+
+
+pytestmark = pytest.mark.anyio
+
+
+class RecordingSocket:
+    def __init__(self, engine):
+        self.engine = engine
+        self.frames = []
+        self.checked_out = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        self.checked_out.append(self.engine.pool.checkedout())
+        self.frames.append(text)
+
+    async def close(self, code=1000):
+        pass
+
+
+@pytest.fixture
+async def inbox_user(engine):
+    import models
+    from db.async_db import AsyncSessionLocal
+    from benchmarks.common import seed_user
+    from repository.notification import add_notifications_db, next_notification_id_db
+
+    async with AsyncSessionLocal() as db:
+        user_id = await seed_user(db, nickname=f'replay_{uuid.uuid4().hex[:8]}')
+        ids = []
+        for n in range(5):
+            notification_id = await next_notification_id_db(db)
+            await add_notifications_db(db, [user_id], notification_id, f'{{"id":{notification_id},"n":{n}}}')
+            ids.append(notification_id)
+        await db.commit()
+
+    yield user_id, ids
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(models.User).where(models.User.id == user_id))
+        await db.commit()
+
+
+async def test_replay_pages_through_the_inbox_without_holding_a_connection(engine, inbox_user):
+    from connection import ConnectionManager
+    from services.notification import NotificationService, notification_bus
+
+    user_id, ids = inbox_user
+    service = NotificationService(notification_bus, page_size=2)
+    socket = RecordingSocket(engine)
+    connection = ConnectionManager().register(user_id, socket, replaying=True)
+    connection.last_seen = 0.0
+
+    assert await service.replay(connection, since=ids[0]) == ids[-1]
+
+    assert socket.frames == [f'{{"id":{notification_id},"n":{n}}}' for n, notification_id in enumerate(ids)][1:]
+    assert set(socket.checked_out) == {0}
+    assert not connection.replaying
+    assert connection.last_seen > 0
+    assert service.replayed == 4
+
+
+def access_cookie(user_id):
+    from services.auth import create_access_token
+
+    return create_access_token({"sub": str(user_id), "role_id": None, "role": None, "banned": False, "ver": 0})
+
+
+def closed_with(cookies, path):
+    from fastapi.testclient import TestClient
+    from main import app
+
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with TestClient(app, cookies=cookies).websocket_connect(path):
+            pass
+    return closed.value.code
+
+
+FEED_PATHS = ['/notification/1', '/notification/1?since=0']
+
+
+@pytest.mark.parametrize('path', FEED_PATHS)
+@pytest.mark.parametrize('cookies', [{}, {'access_token': 'garbage'}], ids=['no token', 'invalid token'])
+def test_feed_requires_an_access_token(database_url, cookies, path):
+    assert closed_with(cookies, path) == 1008
+
+
+@pytest.mark.parametrize('path', FEED_PATHS)
+def test_feed_rejects_another_users_access_token(database_url, path):
+    assert closed_with({'access_token': access_cookie(2)}, path) == 1008
+
+
+def test_feed_accepts_the_users_own_access_token(database_url):
+    from fastapi.testclient import TestClient
+    from main import app
+    from services.notification import manager
+
+    with TestClient(app, cookies={'access_token': access_cookie(1)}).websocket_connect('/notification/1') as feed:
+        feed.send_text('hello')
+    assert 1 not in manager.active_connections
+    assert manager.rejected_connections == 0
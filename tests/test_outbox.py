@@ -0,0 +1,158 @@
+"""Email outbox delivery: OutboxWorker sending queued rows through SMTPMailer
+to an in-process aiosmtpd server, including retries with backoff and
+transactional mail claimed ahead of bulk mail."""
+import socket
+import uuid
+import pytest
+from aiosmtpd.controller import Controller
+from sqlalchemy import delete, func, select, update
+
+
+pytestmark = pytest.mark.anyio
+
+RETRY_BASE_SECONDS = 30
+
+
+class RecordingHandler:
+    def __init__(self):
+        self.messages = []
+        self.failing = False
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.failing:
+            return '451 Requested action aborted: local error in processing'
+        self.messages.append(envelope)
+        return '250 Message accepted for delivery'
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server():
+    handler = RecordingHandler()
+    controller = Controller(handler, hostname='127.0.0.1', port=free_port())
+    controller.start()
+    yield handler, controller.port
+    controller.stop()
+
+
+@pytest.fixture
+async def outbox(engine, smtp_server):
+    import models
+    from db.async_db import AsyncSessionLocal
+    from services.outbox import SMTPMailer, OutboxWorker
+
+    async with AsyncSessionLocal() as db:
+        foreign = await db.scalar(
+            select(func.count()).select_from(models.EmailOutbox).where(models.EmailOutbox.status == 'pending')
+        )
+    if foreign:
+        pytest.skip("email_outbox already holds pending mail that the worker would claim")
+
+    handler, port = smtp_server
+    domain = f'{uuid.uuid4().hex}.example.com'
+    mailer = SMTPMailer('127.0.0.1', port, 'blog@example.com', start_tls=False)
+    worker = OutboxWorker(mailer, batch_size=10, max_attempts=2, retry_base_seconds=RETRY_BASE_SECONDS)
+    yield worker, handler, domain
+    await mailer.close()
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(models.EmailOutbox).where(models.EmailOutbox.recipient.like(f'%@{domain}')))
+        await db.commit()
+
+
+async def queue(domain, *names, **options):
+    from db.async_db import AsyncSessionLocal
+    from repository.outbox import add_outbox_email_db
+
+    async with AsyncSessionLocal() as db:
+        emails = [add_outbox_email_db(db, f'{name}@{domain}', f'Hello {name}', f'<p>Hi {name}</p>', **options)
+                  for name in names]
+        await db.flush()
+        ids = [email.id for email in emails]
+        await db.commit()
+    return ids
+
+
+async def outbox_rows(ids):
+    import models
+    from db.async_db import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(models.EmailOutbox.status, models.EmailOutbox.attempts, models.EmailOutbox.last_error,
+                   func.extract('epoch', models.EmailOutbox.next_attempt_at - func.now()))
+            .where(models.EmailOutbox.id.in_(ids))
+        )
+        return result.all()
+
+
+async def test_delivers_queued_mail_and_deletes_the_rows(outbox):
+    worker, handler, domain = outbox
+    ids = await queue(domain, 'ann', 'bob')
+
+    assert await worker.deliver_batch() == 2
+
+    assert sorted(envelope.rcpt_tos[0] for envelope in handler.messages) == [f'ann@{domain}', f'bob@{domain}']
+    assert b'Subject: Hello ann' in handler.messages[0].content
+    assert await outbox_rows(ids) == []
+    assert worker.mailer.connections == 1
+    assert worker.stats()['sent'] == 2
+
+
+async def test_retries_with_backoff_then_gives_up(outbox):
+    import models
+    from db.async_db import AsyncSessionLocal
+
+    worker, handler, domain = outbox
+    handler.failing = True
+    ids = await queue(domain, 'carl')
+
+    assert await worker.deliver_batch() == 1
+    [(status, attempts, error, retry_in)] = await outbox_rows(ids)
+    assert (status, attempts) == ('pending', 1)
+    assert '451' in error
+    assert RETRY_BASE_SECONDS - 5 < retry_in <= RETRY_BASE_SECONDS
+    assert await worker.deliver_batch() == 0
+    assert worker.retried == 1
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(models.EmailOutbox).where(models.EmailOutbox.id.in_(ids))
+                         .values(next_attempt_at=func.now()))
+        await db.commit()
+    assert await worker.deliver_batch() == 1
+    [(status, attempts, error, _)] = await outbox_rows(ids)
+    assert (status, attempts) == ('failed', 2)
+    assert worker.failed == 1
+    assert handler.messages == []
+
+
+async def test_claims_no_more_than_the_batch_size(outbox):
+    worker, handler, domain = outbox
+    worker.batch_size = 2
+    await queue(domain, 'dan', 'eve', 'fay')
+
+    assert await worker.deliver_batch() == 2
+    assert await worker.deliver_batch() == 1
+
+
+async def test_transactional_mail_is_claimed_before_queued_bulk_mail(outbox):
+    from repository.outbox import BULK_PRIORITY
+
+    worker, handler, domain = outbox
+    worker.batch_size = 2
+    await queue(domain, 'digest1', 'digest2', 'digest3', priority=BULK_PRIORITY)
+    await queue(domain, 'reset')
+
+    assert await worker.deliver_batch() == 2
+    assert {envelope.rcpt_tos[0] for envelope in handler.messages} == {f'reset@{domain}', f'digest1@{domain}'}
+
+
+def test_backoff_doubles_up_to_the_cap(database_url):
+    from services.outbox import OutboxWorker
+
+    worker = OutboxWorker(mailer=None, max_attempts=8, retry_base_seconds=30, retry_max_seconds=600)
+    assert [worker.retry_in(attempts) for attempts in range(1, 9)] == [30, 60, 120, 240, 480, 600, 600, None]
@@ -0,0 +1,62 @@
+"""EXPLAIN-based plan regression suite for the repository read queries.
+
+Runs every case from benchmarks.explain_plans against the database in
+SQLALCHEMY_DATABASE_URL (migrated to head; the cases seed their own rows)
+and fails when a query stops using its index or scans a large table.
+"""
+import pytest
+from sqlalchemy import text
+
+
+pytestmark = pytest.mark.anyio
+
+EXPECTED_INDEXES = {
+    "get_post_db": {"post_pkey"},
+    "get_all_posts_db": {"ix_post_visible_created_at"},
+    "get_all_posts_db cursor": {"ix_post_visible_created_at"},
+    "get_all_posts_db topics": {"ix_post_topic_id_created_at"},
+    "get_all_posts_db dates": {"ix_post_visible_created_at"},
+    "get_all_posts_db q": {"ix_post_search_vector"},
+    "search_subscriptions_db": {"ix_subscription_subscribed_id"},
+    "get_user_subscriptions_on_db": {"subscription_pkey"},
+    "get_token_db": {"ix_tokens_reset_token_digest"},
+    "get_all_users_db": {"ix_user_created_at"},
+    "search_users_db": {"ix_user_first_name_trgm", "ix_user_second_name_trgm", "ix_user_email_trgm",
+                        "ix_user_nickname_trgm"},
+    "is_popular_author_db": {"ix_subscription_subscribed_id"},
+    "get_pushed_timeline_db": {"ix_timeline_user_id_created_at"},
+    "get_pulled_timeline_db": {"ix_post_pulled_user_id_created_at"},
+}
+NEEDS_TRIGRAMS = {"search_users_db"}
+
+
+@pytest.fixture(scope='module')
+async def plans(engine):
+    from benchmarks.explain_plans import explain_cases, sequential_scans, index_names
+
+    return {
+        name: ([scan for plan in case_plans for scan in sequential_scans(plan)],
+               set().union(*(index_names(plan) for plan in case_plans)))
+        for name, case_plans in await explain_cases()
+    }
+
+
+@pytest.fixture(scope='module')
+async def has_trigrams(engine):
+    async with engine.connect() as conn:
+        result = await conn.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'"))
+        return result.scalar() is not None
+
+
+async def test_every_case_is_checked(plans):
+    assert set(plans) == set(EXPECTED_INDEXES)
+
+
+@pytest.mark.parametrize('case', sorted(EXPECTED_INDEXES))
+async def test_query_uses_expected_indexes(case, plans, has_trigrams):
+    if case in NEEDS_TRIGRAMS and not has_trigrams:
+        pytest.skip("pg_trgm is not installed")
+
+    scans, used = plans[case]
+    assert scans == []
+    assert EXPECTED_INDEXES[case] <= used
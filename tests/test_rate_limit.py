@@ -0,0 +1,46 @@
+"""Auth rate limiting: account buckets scoped per client and the shared Redis
+limiter falling back to local buckets when Redis hangs."""
+import time
+import uuid
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+
+pytestmark = pytest.mark.anyio
+
+
+def client_request(host):
+    return Request({'type': 'http', 'client': (host, 4000), 'headers': []})
+
+
+async def test_one_client_cannot_lock_an_account_out_for_others():
+    from config import AUTH_RATE_LIMIT_ACCOUNT_BURST
+    from services.rate_limit import limit_auth_by_account
+
+    account = f'{uuid.uuid4().hex}@example.com'
+    attacker = client_request('203.0.113.7')
+    for _ in range(AUTH_RATE_LIMIT_ACCOUNT_BURST):
+        await limit_auth_by_account(attacker, account)
+    with pytest.raises(HTTPException) as error:
+        await limit_auth_by_account(attacker, account)
+    assert error.value.status_code == 429
+
+    await limit_auth_by_account(client_request('198.51.100.20'), account.upper())
+
+
+async def test_redis_limiter_falls_back_to_local_buckets_when_redis_hangs(fake_redis):
+    from cache import RedisClient
+    from services.rate_limit import RedisTokenBucketLimiter
+
+    server, url = fake_redis
+    client = RedisClient(url)
+    limiter = RedisTokenBucketLimiter(client, 'test', per_minute=60, burst=1)
+
+    server.stalled = 1
+    started = time.monotonic()
+    assert await limiter.hit('key') == 0.0
+    assert time.monotonic() - started < client.timeout + 0.5
+    assert await limiter.hit('key') > 0
+    assert limiter.errors == 2
+    assert client.timeouts == 1
@@ -0,0 +1,73 @@
+"""Response cache backends: the byte-bounded LRU and the Redis-protocol backend
+against an in-process fake Redis server."""
+import asyncio
+import time
+import pytest
+from cache import LRUByteCache, RedisCache
+
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_lru_evicts_least_recently_used_within_byte_budget():
+    cache = LRUByteCache(max_bytes=100, ttl=60)
+    await cache.set('a', b'x' * 40)
+    await cache.set('b', b'x' * 40)
+    assert await cache.get('a') is not None
+    await cache.set('c', b'x' * 40)
+
+    assert await cache.get('b') is None
+    assert await cache.get('a') is not None
+    assert await cache.get('c') is not None
+    stats = cache.stats()
+    assert stats['evictions'] == 1
+    assert stats['bytes'] <= 100
+    assert (stats['hits'], stats['misses']) == (3, 1)
+
+
+async def test_lru_expires_entries():
+    cache = LRUByteCache(max_bytes=100, ttl=60)
+    await cache.set('a', b'body', ttl=0)
+    assert await cache.get('a') is None
+    assert cache.stats()['bytes'] == 0
+
+
+async def test_redis_cache_round_trip(fake_redis):
+    server, url = fake_redis
+    cache = RedisCache(url, ttl=60)
+
+    await cache.set('page', b'{"posts": []}')
+    assert await cache.get('page') == b'{"posts": []}'
+    assert await cache.get('missing') is None
+    assert server.data == {b'cache:page': b'{"posts": []}'}
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['errors']) == (1, 1, 0)
+
+
+async def test_redis_cache_fails_open_when_redis_hangs_mid_reply(fake_redis):
+    server, url = fake_redis
+    cache = RedisCache(url, ttl=60)
+    await cache.set('page', b'body')
+
+    server.stalled = 1
+    started = time.monotonic()
+    assert await cache.get('page') is None
+    assert time.monotonic() - started < cache.client.timeout + 0.5
+    assert cache.stats()['errors'] == 1
+    assert cache.stats()['timeouts'] == 1
+
+    assert await cache.get('page') == b'body'
+
+
+async def test_redis_commands_do_not_queue_behind_a_hung_one(fake_redis):
+    server, url = fake_redis
+    cache = RedisCache(url, ttl=60)
+    await cache.set('page', b'body')
+
+    server.stalled = 1
+    hung = asyncio.ensure_future(cache.get('page'))
+    await asyncio.sleep(0.05)
+    started = time.monotonic()
+    assert await cache.get('page') == b'body'
+    assert time.monotonic() - started < 0.2
+    assert await hung is None
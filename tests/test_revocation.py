@@ -0,0 +1,112 @@
+"""Refresh token revocations: the generational in-memory filter and the
+batched write-behind to Postgres, where a failing row is retried alone and
+eventually dropped rather than holding up the queue."""
+import time
+import uuid
+import pytest
+from sqlalchemy import delete, select
+from cache import RevocationFilter
+
+
+pytestmark = pytest.mark.anyio
+
+
+def test_filter_sheds_a_generation_once_it_has_expired():
+    revoked = RevocationFilter(capacity=1000, error_rate=0.01)
+    revoked.add('old', expires_at=100)
+    revoked.prune(now=50)
+    revoked.add('new', expires_at=300)
+
+    revoked.prune(now=90)
+    assert 'old' in revoked and 'new' in revoked
+    assert revoked.stats()['generations'] == 2
+
+    revoked.prune(now=200)
+    assert 'old' not in revoked
+    assert 'new' in revoked
+    assert len(revoked) == 1
+    assert 'missing' not in revoked
+    assert revoked.stats()['rotations'] == 2
+
+
+def test_filter_does_not_duplicate_ids_across_generations():
+    revoked = RevocationFilter(capacity=1000, error_rate=0.01)
+    revoked.add('jti', expires_at=100)
+    revoked.prune(now=0)
+    revoked.add('jti', expires_at=100)
+    assert len(revoked) == 1
+
+
+async def test_flush_persists_pending_revocations(engine):
+    import models
+    from db.async_db import AsyncSessionLocal
+    from services.revocation import (revoke_refresh_token, flush_revocations, is_refresh_token_revoked,
+                                     pending_revocations)
+
+    jtis = [uuid.uuid4().hex for _ in range(3)]
+    expires_at = time.time() + 60
+    try:
+        for jti in jtis:
+            revoke_refresh_token({'jti': jti, 'user_id': None, 'exp': expires_at})
+        assert all(is_refresh_token_revoked(jti) for jti in jtis)
+        assert len(pending_revocations) == 3
+
+        await flush_revocations()
+        assert not pending_revocations
+        async with AsyncSessionLocal() as db:
+            stored = await db.scalars(select(models.RevokedToken.jti).where(models.RevokedToken.jti.in_(jtis)))
+            assert set(stored) == set(jtis)
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(models.RevokedToken).where(models.RevokedToken.jti.in_(jtis)))
+            await db.commit()
+
+
+async def test_revocation_for_a_deleted_user_is_kept_without_the_user(engine):
+    import models
+    from db.async_db import AsyncSessionLocal
+    from services.revocation import revoke_refresh_token, flush_revocations
+
+    jti = uuid.uuid4().hex
+    try:
+        revoke_refresh_token({'jti': jti, 'user_id': 2 ** 31 - 1, 'exp': time.time() + 60})
+        await flush_revocations()
+        async with AsyncSessionLocal() as db:
+            stored = await db.get(models.RevokedToken, jti)
+            assert stored is not None and stored.user_id is None
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(models.RevokedToken).where(models.RevokedToken.jti == jti))
+            await db.commit()
+
+
+async def test_failing_revocation_is_retried_alone_then_dropped(engine, monkeypatch):
+    import services.revocation as revocation
+    from config import REFRESH_REVOCATION_FLUSH_MAX_ATTEMPTS
+
+    poisoned, healthy = uuid.uuid4().hex, uuid.uuid4().hex
+    written = []
+
+    async def revoke_refresh_tokens_db(db, revocations):
+        if any(jti == poisoned for jti, _, _ in revocations):
+            raise RuntimeError('poisoned row')
+        written.extend(jti for jti, _, _ in revocations)
+        return {jti for jti, _, _ in revocations}
+
+    monkeypatch.setattr(revocation, 'revoke_refresh_tokens_db', revoke_refresh_tokens_db)
+    monkeypatch.setattr(revocation, 'pending_revocations', [])
+    expires_at = time.time() + 60
+
+    assert revocation.revoke_refresh_token({'jti': poisoned, 'user_id': None, 'exp': expires_at})
+    assert not revocation.revoke_refresh_token({'jti': poisoned, 'user_id': None, 'exp': expires_at})
+    with pytest.raises(RuntimeError):
+        await revocation.flush_revocations()
+    revocation.revoke_refresh_token({'jti': healthy, 'user_id': None, 'exp': expires_at})
+
+    dropped = revocation.dropped_revocations
+    for _ in range(REFRESH_REVOCATION_FLUSH_MAX_ATTEMPTS - 1):
+        with pytest.raises(RuntimeError):
+            await revocation.flush_revocations()
+    assert written == [healthy]
+    assert revocation.pending_revocations == []
+    assert revocation.dropped_revocations == dropped + 1